@@ -1,104 +1,534 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context, g
 from flask_cors import CORS
 import os
 import json
+import shutil
+import logging
 import tempfile
+import time
+import zipfile
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
-from pdf_analyzer import PDFAnalyzer
+# pdf_analyzer（OpenCV、PyMuPDF、numpy）和 fetch_scheduler（requests）导入较慢，在第一次使用时
+# （或由 warm_up 预先）导入，服务启动后 /health 等轻量接口可以立即响应
+from article_extractor import parse_fields
+from cache import ArticleCache, ResultCache, DEFAULT_CACHE_PATH
+from compression import compress_response, DEFAULT_MIN_SIZE
+from jobs import JobManager, QueueFullError
+from instrumentation import configure_logging, format_gauges, metrics
+from uploads import UploadRequest, DEFAULT_MEMORY_LIMIT, extract_pdfs
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# 上传文件边接收边计算哈希，小文件保存在内存中
+app.request_class = UploadRequest
 CORS(app)
 
 # 配置
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_SIZE_MB', 200)) * 1024 * 1024  # 上传文件大小上限
+# 不超过该大小的上传文件直接在内存中打开，更大的文件分块转存到上传目录
+app.config['UPLOAD_MEMORY_LIMIT'] = int(os.environ.get('UPLOAD_MEMORY_LIMIT_MB', DEFAULT_MEMORY_LIMIT // (1024 * 1024))) * 1024 * 1024
 app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()  # 使用系统临时目录
 app.config['ALLOWED_EXTENSIONS'] = {'pdf'}
+app.config['CACHE_PATH'] = os.environ.get('CACHE_PATH', DEFAULT_CACHE_PATH)
+app.config['ARTICLE_CACHE_TTL'] = int(os.environ.get('ARTICLE_CACHE_TTL', 24 * 3600))  # 文章缓存有效期（秒）
+app.config['ARTICLE_CACHE_MAX_ENTRIES'] = int(os.environ.get('ARTICLE_CACHE_MAX_ENTRIES', 5000))
+app.config['RESULT_CACHE_TTL'] = int(os.environ.get('RESULT_CACHE_TTL', 7 * 24 * 3600))  # 分析结果缓存有效期（秒）
+app.config['RESULT_CACHE_MAX_ENTRIES'] = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 1000))
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))  # 同时执行的分析任务数
+app.config['JOB_QUEUE_SIZE'] = int(os.environ.get('JOB_QUEUE_SIZE', 20))  # 等待中的任务上限
+app.config['JOB_TTL'] = int(os.environ.get('JOB_TTL', 3600))  # 已完成任务的保留时间（秒）
+app.config['BATCH_MAX_FILES'] = int(os.environ.get('BATCH_MAX_FILES', 500))  # 单次批量分析的文件数上限
+app.config['BATCH_MAX_EXTRACTED_SIZE'] = int(os.environ.get('BATCH_MAX_EXTRACTED_MB', 1024)) * 1024 * 1024  # 单次批量分析中压缩包解压后的总大小上限
+app.config['SSE_KEEPALIVE'] = 15  # 事件流保活间隔（秒）
+# 按 Accept-Encoding 压缩JSON和页面响应（由前置代理负责压缩时可关闭）
+app.config['RESPONSE_COMPRESSION'] = os.environ.get('RESPONSE_COMPRESSION', '1').lower() not in ('0', 'false', 'no', 'off')
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE))  # 小于该大小（字节）的响应不压缩
 
 # 确保上传目录存在
 try:
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 except Exception as e:
-    print(f"Warning: Could not create upload folder: {e}")
+    logger.warning("Could not create upload folder: %s", e)
     app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
 
+# 文章缓存（SQLite文件，所有工作进程共享）
+try:
+    article_cache = ArticleCache(
+        app.config['CACHE_PATH'],
+        ttl=app.config['ARTICLE_CACHE_TTL'],
+        max_entries=app.config['ARTICLE_CACHE_MAX_ENTRIES']
+    )
+except Exception as e:
+    logger.warning("Could not open article cache: %s", e)
+    article_cache = None
+
+# 分析结果缓存（以文件内容哈希为键）
+try:
+    result_cache = ResultCache(
+        app.config['CACHE_PATH'],
+        ttl=app.config['RESULT_CACHE_TTL'],
+        max_entries=app.config['RESULT_CACHE_MAX_ENTRIES']
+    )
+except Exception as e:
+    logger.warning("Could not open result cache: %s", e)
+    result_cache = None
+
+# 后台分析任务
+job_manager = JobManager(
+    max_workers=app.config['JOB_WORKERS'],
+    max_queued=app.config['JOB_QUEUE_SIZE'],
+    job_ttl=app.config['JOB_TTL']
+)
+
+def create_analyzer(**options):
+    """创建使用共享缓存的分析器，第一次调用时导入 pdf_analyzer"""
+    from pdf_analyzer import PDFAnalyzer
+    return PDFAnalyzer(article_cache=article_cache, result_cache=result_cache, **options)
+
+def warm_up():
+    """预先导入分析模块，初始化解码器、OpenCV/PyMuPDF 的内部状态、页面处理进程池和文章抓取的连接池
+
+    由 gunicorn 的 post_worker_init 钩子在工作进程的后台线程中调用（见 gunicorn.conf.py），
+    这些开销不再由第一个分析请求承担，也不阻塞 /health 等接口。
+    """
+    started = time.perf_counter()
+    try:
+        import pdf_analyzer
+        from fetch_scheduler import get_fetch_scheduler
+        pdf_analyzer.warm_up()
+        # 启动页面处理进程池的全部子进程（子进程在初始化时各自预热），第一个多页文档无需等待子进程启动
+        pdf_analyzer.warm_up_process_pool(create_analyzer().configured_workers())
+        # 抓取调度器（requests 会话和连接池）在工作进程中创建，不与其他进程共用连接
+        get_fetch_scheduler()
+    except Exception as e:
+        logger.warning("预热失败: %s", e)
+        return
+    logger.info("预热完成", extra={'elapsed': round(time.perf_counter() - started, 3)})
+
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+def is_truthy(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+def request_options():
+    """读取请求中的分析选项，返回 (refresh_articles, include_timings, article_fields)
+
+    article_fields 来自 fields 参数（逗号分隔的文章字段），字段名无效时抛出 ValueError。
+    """
+    return (is_truthy(request.values.get('refresh_articles', '')),
+            is_truthy(request.values.get('timings', '')),
+            parse_fields(request.values.get('fields')))
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', max_upload_size=app.config['MAX_CONTENT_LENGTH'])
+
+def release_upload(upload):
+    """释放上传文件占用的内存或临时文件"""
+    if upload is not None:
+        try:
+            upload.release()
+        except Exception as cleanup_error:
+            logger.warning("清理上传文件失败: %s", cleanup_error)
+
+def run_analysis(pdf_source, content_hash, refresh_articles=False, include_timings=False,
+                 article_fields=None, progress_callback=None):
+    """分析上传的PDF（文件路径或内存数据）并返回可JSON序列化的结果
+
+    include_timings 为 True 时在结果中附加本次分析的各阶段耗时（timings 字段）；
+    article_fields 为微信文章结果中保留的字段，None 表示全部字段。
+    """
+    # 分析PDF（内容相同的文件直接返回缓存结果）
+    logger.info("开始分析PDF", extra={'content_hash': content_hash})
+    analyzer = create_analyzer(progress_callback=progress_callback, article_fields=article_fields)
+    results = analyzer.analyze_pdf(pdf_source, content_hash=content_hash,
+                                   refresh_articles=refresh_articles)
+    if include_timings:
+        results['timings'] = analyzer.timings.to_dict()
+    
+    # 确保结果可以JSON序列化
+    try:
+        json.dumps(results)
+    except (TypeError, ValueError) as json_error:
+        logger.error("JSON序列化错误: %s", json_error)
+        # 创建安全的结果
+        safe_results = {
+            'total_qr_codes': results.get('total_qr_codes', 0),
+            'wechat_articles': [],
+            'other_qr_codes': [],
+            'analysis_time': results.get('analysis_time', ''),
+            'error': 'JSON序列化错误，返回简化结果'
+        }
+        results = safe_results
+    
+    return results
+
+def run_stream_analysis(pdf_source, content_hash, refresh_articles=False, include_timings=False,
+                        article_fields=None, progress_callback=None):
+    """逐步分析PDF，把 iter_analyze_pdf 的每个事件（包括最后的 complete）交给 progress_callback
+
+    用于流式任务：不汇总结果，progress_callback 抛出异常（如客户端断开）时停止分析。
+    """
+    logger.info("开始流式分析PDF", extra={'content_hash': content_hash})
+    analyzer = create_analyzer(article_fields=article_fields)
+    events = analyzer.iter_analyze_pdf(pdf_source, content_hash, refresh_articles)
+    try:
+        for event, data in events:
+            if event == 'complete' and include_timings:
+                data = dict(data, timings=analyzer.timings.to_dict())
+            progress_callback(event, data)
+    finally:
+        # 提前结束时取消尚未开始的页面区间和文章抓取
+        events.close()
+
+def run_batch(documents, refresh_articles=False, include_timings=False, article_fields=None,
+              progress_callback=None):
+    """批量分析多份PDF，返回每份文档的结果和整批汇总"""
+    logger.info("开始批量分析", extra={'documents': len(documents)})
+    analyzer = create_analyzer(progress_callback=progress_callback, article_fields=article_fields)
+    results = analyzer.analyze_batch(documents, refresh_articles=refresh_articles)
+    if include_timings:
+        results['summary']['timings'] = analyzer.timings.to_dict()
+    return results
+
+@app.errorhandler(413)
+def file_too_large(error):
+    limit_mb = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    return jsonify({'error': f'文件大小不能超过{limit_mb}MB'}), 413
+
+def receive_upload():
+    """校验请求中的PDF文件
+
+    文件在请求解析时已写入 SpooledUpload（同时计算了哈希），
+    返回 (filename, upload, None)，校验失败时返回 (None, None, 错误响应)。
+    """
+    try:
+        files = request.files
+    except RequestEntityTooLarge as e:
+        return None, None, file_too_large(e)
+    
+    if 'file' not in files:
+        return None, None, (jsonify({'error': '没有选择文件'}), 400)
+    
+    file = files['file']
+    if file.filename == '':
+        return None, None, (jsonify({'error': '没有选择文件'}), 400)
+    
+    if not (file and allowed_file(file.filename)):
+        return None, None, (jsonify({'error': '不支持的文件格式，请上传PDF文件'}), 400)
+    
+    upload = file.stream
+    logger.debug("已接收上传文件", extra={
+        'upload_bytes': upload.size,
+        'in_memory': upload.in_memory
+    })
+    return secure_filename(file.filename), upload, None
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    filepath = None
+    upload = None
     try:
-        print("开始处理文件上传请求", flush=True)
-        
-        if 'file' not in request.files:
-            return jsonify({'error': '没有选择文件'}), 400
+        filename, upload, error_response = receive_upload()
+        if error_response:
+            return error_response
         
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({'error': '没有选择文件'}), 400
+        try:
+            refresh_articles, include_timings, article_fields = request_options()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        results = run_analysis(upload.source(), upload.content_hash, refresh_articles, include_timings,
+                               article_fields)
         
-        if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            # 使用临时文件确保唯一性
-            import uuid
-            unique_filename = f"{uuid.uuid4()}_{filename}"
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            
-            print(f"保存文件到: {filepath}", flush=True)
-            file.save(filepath)
-            
-            # 分析PDF
-            print("开始分析PDF", flush=True)
-            analyzer = PDFAnalyzer()
-            results = analyzer.analyze_pdf(filepath)
-            
-            # 确保结果可以JSON序列化
-            try:
-                json.dumps(results)
-            except (TypeError, ValueError) as json_error:
-                print(f"JSON序列化错误: {json_error}", flush=True)
-                # 创建安全的结果
-                safe_results = {
-                    'total_qr_codes': results.get('total_qr_codes', 0),
-                    'wechat_articles': [],
-                    'other_qr_codes': [],
-                    'analysis_time': results.get('analysis_time', ''),
-                    'error': 'JSON序列化错误，返回简化结果'
-                }
-                results = safe_results
-            
-            print("PDF分析完成", flush=True)
-            
-            return jsonify({
-                'success': True,
-                'results': results
-            })
-        else:
-            return jsonify({'error': '不支持的文件格式，请上传PDF文件'}), 400
+        return jsonify({
+            'success': True,
+            'results': results
+        })
             
     except Exception as e:
-        print(f"处理文件时发生错误: {str(e)}", flush=True)
-        import traceback
-        traceback.print_exc()
+        logger.exception("处理文件时发生错误")
         return jsonify({'error': f'处理文件时发生错误: {str(e)}'}), 500
     finally:
-        # 清理临时文件
-        if filepath and os.path.exists(filepath):
-            try:
-                os.remove(filepath)
-                print(f"已清理临时文件: {filepath}", flush=True)
-            except Exception as cleanup_error:
-                print(f"清理临时文件失败: {cleanup_error}", flush=True)
+        # 释放上传文件
+        release_upload(upload)
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """提交后台分析任务，立即返回任务ID"""
+    upload = None
+    try:
+        filename, upload, error_response = receive_upload()
+        if error_response:
+            return error_response
+        
+        try:
+            refresh_articles, include_timings, article_fields = request_options()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        # 请求结束后上传数据仍需保留，由任务在结束后释放
+        upload.retain()
+        job = job_manager.submit(
+            filename, run_analysis, upload.source(), upload.content_hash, refresh_articles, include_timings,
+            article_fields, cleanup=upload.release
+        )
+        upload = None
+        
+        logger.info("任务已提交", extra={'job_id': job.id})
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f'/jobs/{job.id}',
+            'events_url': f'/jobs/{job.id}/events'
+        }), 202
+    
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        logger.exception("提交任务时发生错误")
+        return jsonify({'error': f'处理文件时发生错误: {str(e)}'}), 500
+    finally:
+        release_upload(upload)
+
+@app.route('/batch', methods=['POST'])
+def create_batch_job():
+    """批量分析：上传多个PDF文件（file 字段可重复）或ZIP压缩包，作为一个后台任务执行"""
+    uploads = []
+    extract_dir = None
+    
+    def cleanup():
+        for upload in uploads:
+            release_upload(upload)
+        if extract_dir:
+            shutil.rmtree(extract_dir, ignore_errors=True)
+    
+    try:
+        try:
+            files = [file for file in request.files.getlist('file') if file.filename]
+        except RequestEntityTooLarge as e:
+            return file_too_large(e)
+        if not files:
+            return jsonify({'error': '没有选择文件'}), 400
+        
+        documents = []
+        # 本次请求中各压缩包解压后的总字节数
+        extracted_size = 0
+        for file in files:
+            name = secure_filename(file.filename) or 'upload'
+            if file.filename.lower().endswith('.zip'):
+                # 压缩包中的PDF解压到临时目录，任务结束后删除
+                if extract_dir is None:
+                    extract_dir = tempfile.mkdtemp(prefix='batch-', dir=app.config['UPLOAD_FOLDER'])
+                archive_dir = tempfile.mkdtemp(dir=extract_dir)
+                # 文件数和解压后的总大小按本次请求剩余的额度限制，超出时不再继续解压
+                for filename, path, content_hash in extract_pdfs(
+                        file.stream, archive_dir, app.config['BATCH_MAX_FILES'] - len(documents),
+                        app.config['MAX_CONTENT_LENGTH'], app.config['BATCH_MAX_EXTRACTED_SIZE'] - extracted_size):
+                    documents.append((filename, path, content_hash))
+                    extracted_size += os.path.getsize(path)
+            elif allowed_file(file.filename):
+                upload = file.stream
+                upload.retain()
+                uploads.append(upload)
+                documents.append((name, upload.source(), upload.content_hash))
+            else:
+                cleanup()
+                return jsonify({'error': f'不支持的文件格式: {name}，请上传PDF文件或ZIP压缩包'}), 400
+            if len(documents) > app.config['BATCH_MAX_FILES']:
+                cleanup()
+                return jsonify({'error': f'单次批量分析的文件数不能超过{app.config["BATCH_MAX_FILES"]}个'}), 400
+        
+        if not documents:
+            cleanup()
+            return jsonify({'error': '压缩包中没有PDF文件'}), 400
+        
+        refresh_articles, include_timings, article_fields = request_options()
+        label = files[0].filename if len(files) == 1 else f'{len(documents)} 个文件'
+        job = job_manager.submit(label, run_batch, documents, refresh_articles, include_timings, article_fields,
+                                 cleanup=cleanup)
+        
+        logger.info("批量任务已提交", extra={'job_id': job.id, 'documents': len(documents)})
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'documents': len(documents),
+            'status': job.status,
+            'status_url': f'/jobs/{job.id}',
+            'events_url': f'/jobs/{job.id}/events'
+        }), 202
+    
+    except (ValueError, zipfile.BadZipFile) as e:
+        cleanup()
+        message = str(e) if isinstance(e, ValueError) else '压缩包已损坏或格式不正确'
+        return jsonify({'error': message}), 400
+    except QueueFullError as e:
+        cleanup()
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        logger.exception("提交批量任务时发生错误")
+        cleanup()
+        return jsonify({'error': f'处理文件时发生错误: {str(e)}'}), 500
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    """查询任务状态、进度和（部分）结果"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """以Server-Sent Events推送任务的逐页进度和结果"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    
+    # 断线重连时从上次收到的事件之后继续
+    start = request.headers.get('Last-Event-ID', request.args.get('last_event_id', -1))
+    try:
+        start = int(start) + 1
+    except (TypeError, ValueError):
+        start = 0
+    
+    def generate():
+        position = start
+        while True:
+            events, finished = job.wait_for_events(position, app.config['SSE_KEEPALIVE'])
+            if not events and not finished:
+                # 保持连接
+                yield ': keepalive\n\n'
+                continue
+            for event, data in events:
+                yield f"id: {position}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                position += 1
+            if finished and position >= len(job.events):
+                break
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_stream():
+    """上传并分析PDF，以NDJSON（每行一个JSON事件）逐步返回页面检测结果和文章结果
+
+    分析作为流式任务提交到 job_manager，与 /jobs 共用有界的任务队列（队列已满时返回503）。
+    事件只在有界缓冲区中暂存，发送后即丢弃，不保留结果；客户端断开后停止分析。
+    """
+    filename, upload, error_response = receive_upload()
+    if error_response:
+        return error_response
+
+    try:
+        refresh_articles, include_timings, article_fields = request_options()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # 请求结束后上传数据仍需保留，由任务在结束后释放
+    upload.retain()
+    try:
+        job = job_manager.submit(
+            filename, run_stream_analysis, upload.source(), upload.content_hash, refresh_articles,
+            include_timings, article_fields, cleanup=upload.release, stream=True
+        )
+    except QueueFullError as e:
+        release_upload(upload)
+        return jsonify({'error': str(e)}), 503
+
+    def generate():
+        try:
+            while True:
+                events, finished = job.take_events(app.config['SSE_KEEPALIVE'])
+                for event, data in events:
+                    if event == 'status':
+                        continue
+                    if event == 'failed':
+                        event = 'error'
+                    yield json.dumps({'event': event, 'data': data}, ensure_ascii=False, default=str) + '\n'
+                if finished:
+                    break
+        finally:
+            # 客户端断开（或输出结束）后停止分析并丢弃未发送的事件
+            job.cancel()
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 @app.route('/health')
 def health_check():
     return jsonify({'status': 'healthy'})
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus 文本格式的运行指标"""
+    text = metrics.render()
+    
+    # 缓存统计保存在SQLite中，为所有工作进程共享的累计值
+    cache_samples = {'hits': [], 'misses': [], 'evictions': [], 'entries': []}
+    for name, cache in (('articles', article_cache), ('results', result_cache)):
+        if cache is None:
+            continue
+        try:
+            stats = cache.stats()
+        except Exception as e:
+            logger.warning("读取缓存统计失败: %s", e)
+            continue
+        for key, samples in cache_samples.items():
+            samples.append(({'cache': name}, stats.get(key, 0)))
+    for key, samples in cache_samples.items():
+        if samples:
+            text += format_gauges(f'cache_{key}', samples)
+    
+    # 文章抓取的限速和熔断状态（按主机）
+    from fetch_scheduler import get_fetch_scheduler
+    fetch_stats = sorted(get_fetch_scheduler().stats().items())
+    if fetch_stats:
+        text += format_gauges('fetch_rate_limit', [({'host': host}, stats['rate']) for host, stats in fetch_stats],
+                              '各主机当前的文章抓取速率上限（次/秒），收到429后自动降低')
+        text += format_gauges('fetch_circuit_open',
+                              [({'host': host}, int(stats['circuit_open'])) for host, stats in fetch_stats],
+                              '各主机是否处于熔断状态')
+    
+    job_stats = job_manager.stats()
+    text += format_gauges('jobs_pending', [({}, job_stats['pending'])], '排队和执行中的任务数')
+    text += format_gauges('jobs', [({'status': status}, count) for status, count in sorted(job_stats['jobs'].items())],
+                          '保留中的任务数（按状态）')
+    return Response(text, mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """按路由统计请求数和耗时（事件流只统计到响应开始）"""
+    started = g.pop('request_started', None)
+    endpoint = request.endpoint or 'unknown'
+    metrics.inc('http_requests', endpoint=endpoint, status=response.status_code)
+    if started is not None:
+        metrics.observe('http_request', time.perf_counter() - started, endpoint=endpoint)
+    return response
+
+@app.after_request
+def compress_body(response):
+    """按 Accept-Encoding 压缩响应（流式响应不压缩，以免缓冲整个输出）"""
+    if not app.config['RESPONSE_COMPRESSION']:
+        return response
+    compressed = compress_response(response, request.headers.get('Accept-Encoding'),
+                                   app.config['COMPRESS_MIN_SIZE'])
+    if compressed is not None:
+        encoding, original_size, compressed_size = compressed
+        metrics.inc('response_bytes_uncompressed', original_size, encoding=encoding)
+        metrics.inc('response_bytes_compressed', compressed_size, encoding=encoding)
+    return response
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') != 'production'
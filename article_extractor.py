@@ -0,0 +1,440 @@
+import re
+import time
+
+# bs4 和 lxml 导入较慢，在第一次解析文章时才导入（只用到 parse_fields 等函数时不必导入）
+
+# 优先使用lxml解析器，未安装时退回Python内置解析器
+DEFAULT_PARSER = 'lxml'
+
+# 页面脚本中的文章变量，如 var msg_title = '标题'.html(false);
+SCRIPT_PATTERNS = (
+    ('title', re.compile(r"var\s+msg_title\s*=\s*['\"]([^'\"]*)['\"](?:\.html\(false\))?")),
+    ('publish_time', re.compile(r"var\s+createTime\s*=\s*['\"]([^'\"]*)['\"];")),
+    ('article_link', re.compile(r"var\s+msg_link\s*=\s*['\"]([^'\"]*)['\"];")),
+)
+TIME_PATTERN = re.compile(r'\d{4}[-年]\d{1,2}[-月]\d{1,2}[日]?')
+
+# 版权相关属性
+COPYRIGHT_ATTRS = ('copyright', 'data-copyright', 'powered-by', 'data-powered-by')
+# 作者相关属性
+AUTHOR_ATTRS = ('name', 'author', 'label', 'data-author', 'data-name')
+# 关键词
+COPYRIGHT_KEYWORDS = ('版权', 'copyright', '©')
+META_ATTRS = ('name', 'content', 'property', 'http-equiv')
+SEO_META_NAMES = ('description', 'keywords', 'viewport')
+
+# 备用选择器（按优先级排列），与 PDFAnalyzer.extract_* 中的选择器一一对应
+TITLE_SELECTORS = ('h1.rich_media_title', 'h2.rich_media_title', '.rich_media_title', 'h1', 'title')
+PUBLISH_TIME_SELECTORS = ('em.rich_media_meta_text', '.rich_media_meta_text',
+                          '[id*="publish_time"]', '.publish_time')
+ACCOUNT_SELECTORS = ('.wx_follow_info .wx_follow_nickname', 'a.rich_media_meta_link',
+                     '.rich_media_meta_link', '[id*="account"]', '.account_name',
+                     '#js_wx_follow_nickname')
+COPYRIGHT_TEXT_SELECTORS = ('[class*="copyright"]', '[id*="copyright"]', 'footer', '.footer')
+
+# 文章结果的全部字段（按输出顺序），url 总是包含在结果中
+ARTICLE_FIELDS = ('url', 'title', 'publish_time', 'account_name', 'author', 'article_link',
+                  'copyright', 'meta_tags', 'scripts', 'labels', 'seo_info')
+# 需要在页面脚本中查找变量的字段
+SCRIPT_FIELDS = {'title', 'publish_time', 'article_link'}
+# 需要匹配备用选择器的字段
+SELECTOR_FIELDS = {'title', 'publish_time', 'account_name', 'copyright'}
+# 需要按 name 查找 meta 标签的字段
+NAMED_META_FIELDS = {'author', 'copyright', 'seo_info'}
+# 不必读完整页即可确定的字段：脚本变量和按 name 查找的 meta 标签都取文档中第一次出现的值，找到后不会再变
+STREAMABLE_FIELDS = frozenset({'url', 'title', 'publish_time', 'article_link', 'author', 'seo_info'})
+# 边下载边解析时每次读取的字节数
+STREAM_CHUNK_SIZE = 16 * 1024
+# 边下载边解析时，读到该长度后再从页面开头查找声明的编码（与 BeautifulSoup 查找的范围一致）
+ENCODING_SNIFF_SIZE = 2048
+
+
+def parse_fields(value):
+    """解析逗号分隔的文章字段列表（如 "title,publish_time"），返回字段集合
+
+    空值或 "all" 返回 None，表示全部字段；包含未知字段时抛出 ValueError。
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    fields = {field.strip() for field in value if field.strip()}
+    if not fields or 'all' in fields:
+        return None
+    unknown = sorted(fields - set(ARTICLE_FIELDS))
+    if unknown:
+        raise ValueError(f'未知的文章字段: {", ".join(unknown)}')
+    return frozenset(fields | {'url'})
+
+
+def project_fields(article_info, fields):
+    """只保留 fields 中的字段（fields 为 None 时原样返回）"""
+    if fields is None:
+        return article_info
+    return {key: value for key, value in article_info.items() if key in fields}
+
+
+def can_stream(fields):
+    """fields 中的字段是否都能在读完整页之前确定（全部字段时需要读完整页）"""
+    if fields is None or not fields <= STREAMABLE_FIELDS:
+        return False
+    try:
+        import lxml.etree  # noqa: F401
+    except ImportError:
+        # 未安装lxml时不支持边下载边解析，总是读取完整页面
+        return False
+    return True
+
+
+def _selector_matches(element, classes, class_text, element_id):
+    """返回该元素命中的备用选择器"""
+    name = element.name
+    matches = []
+
+    if 'rich_media_title' in classes:
+        if name == 'h1':
+            matches.append('h1.rich_media_title')
+        elif name == 'h2':
+            matches.append('h2.rich_media_title')
+        matches.append('.rich_media_title')
+    if name == 'h1':
+        matches.append('h1')
+    elif name == 'title':
+        matches.append('title')
+
+    if 'rich_media_meta_text' in classes:
+        if name == 'em':
+            matches.append('em.rich_media_meta_text')
+        matches.append('.rich_media_meta_text')
+    if 'publish_time' in element_id:
+        matches.append('[id*="publish_time"]')
+    if 'publish_time' in classes:
+        matches.append('.publish_time')
+
+    if 'wx_follow_nickname' in classes and any(
+            'wx_follow_info' in parent.get('class', ()) for parent in element.parents):
+        matches.append('.wx_follow_info .wx_follow_nickname')
+    if 'rich_media_meta_link' in classes:
+        if name == 'a':
+            matches.append('a.rich_media_meta_link')
+        matches.append('.rich_media_meta_link')
+    if 'account' in element_id:
+        matches.append('[id*="account"]')
+    if 'account_name' in classes:
+        matches.append('.account_name')
+    if element_id == 'js_wx_follow_nickname':
+        matches.append('#js_wx_follow_nickname')
+
+    if 'copyright' in class_text:
+        matches.append('[class*="copyright"]')
+    if 'copyright' in element_id:
+        matches.append('[id*="copyright"]')
+    if name == 'footer':
+        matches.append('footer')
+    if 'footer' in classes:
+        matches.append('.footer')
+
+    return matches
+
+
+class ArticleExtractor:
+    """单次遍历的微信文章信息提取器
+
+    一次遍历文档树即收集脚本变量、meta标签、label以及版权/作者属性，
+    对同一棵文档树的输出与 PDFAnalyzer.extract_* 系列方法逐项相同。
+    默认的 lxml 解析器与旧实现使用的 html.parser 只在结构良好的页面上构建相同的树；标签未正确闭合时
+    两者的修复方式不同（如 <h1 class=rich_media_title>Hello<p>world</h1> 的标题分别为 "Hello" 和
+    "Helloworld"），需要与旧实现完全一致时使用 ArticleExtractor('html.parser')。
+    指定 fields（见 parse_fields）时只提取这些字段，其余字段的收集工作不会执行。
+    """
+
+    def __init__(self, parser=DEFAULT_PARSER):
+        self.parser = parser
+
+    def parse(self, content):
+        """解析HTML，指定的解析器不可用时退回 html.parser"""
+        from bs4 import BeautifulSoup, FeatureNotFound
+        try:
+            return BeautifulSoup(content, self.parser)
+        except FeatureNotFound:
+            return BeautifulSoup(content, 'html.parser')
+
+    def extract(self, content, url, fields=None):
+        """解析HTML并提取文章信息，fields 为 None 时提取全部字段"""
+        if fields is not None and fields <= {'url'}:
+            return {'url': url}
+        return self.extract_from_soup(self.parse(content), url, fields)
+
+    def extract_stream(self, chunks, url, fields):
+        """边读取边解析HTML，fields（须满足 can_stream）中的字段都找到后停止读取
+
+        chunks 为字节串的迭代器（如 response.iter_content()）。返回 (文章信息, 统计)，统计包含
+        已读取的字节数 bytes、解析耗时 parse_seconds 和是否提前停止读取 stopped_early。
+        读完整页仍有字段未找到时，按完整页面提取（与 extract 的结果相同）。
+        """
+        from bs4.dammit import EncodingDetector
+        from lxml import etree
+
+        wanted = fields - {'url'}
+        body = bytearray()
+        parse_seconds = 0.0
+        parser = None
+        script_values = {}
+        named_metas = {}
+
+        for chunk in chunks:
+            if not chunk:
+                continue
+            body += chunk
+            if parser is None and len(body) < ENCODING_SNIFF_SIZE:
+                continue
+            start = time.perf_counter()
+            if parser is None:
+                # 与 BeautifulSoup 一致：按页面开头声明的编码解析，未声明时按 UTF-8
+                encoding = EncodingDetector.find_declared_encoding(bytes(body), is_html=True) or 'utf-8'
+                parser = etree.HTMLPullParser(events=('end',), encoding=encoding)
+                chunk = body
+            parser.feed(bytes(chunk))
+            for _, element in parser.read_events():
+                self._collect_stream_element(element, script_values, named_metas)
+            done = self._stream_resolved(wanted, script_values, named_metas)
+            parse_seconds += time.perf_counter() - start
+            if done:
+                result = self._stream_result(url, wanted, script_values, named_metas)
+                return result, {'bytes': len(body), 'parse_seconds': parse_seconds, 'stopped_early': True}
+
+        start = time.perf_counter()
+        result = self.extract(bytes(body), url, fields)
+        parse_seconds += time.perf_counter() - start
+        return result, {'bytes': len(body), 'parse_seconds': parse_seconds, 'stopped_early': False}
+
+    def _collect_stream_element(self, element, script_values, named_metas):
+        """记录解析完成的 script 中的文章变量和带 name 的 meta 标签（均只取第一次出现的值）"""
+        if element.tag == 'script':
+            text = element.text
+            if text:
+                for field, pattern in SCRIPT_PATTERNS:
+                    if field not in script_values:
+                        match = pattern.search(text)
+                        if match:
+                            script_values[field] = match.group(1).strip()
+        elif element.tag == 'meta':
+            meta_name = element.get('name')
+            if meta_name is not None and meta_name not in named_metas:
+                named_metas[meta_name] = element.get('content')
+
+    def _stream_resolved(self, wanted, script_values, named_metas):
+        for field in wanted:
+            if field == 'author':
+                if 'author' not in named_metas:
+                    return False
+            elif field == 'seo_info':
+                if not all(meta_name in named_metas for meta_name in SEO_META_NAMES):
+                    return False
+            elif field not in script_values:
+                return False
+        return True
+
+    def _stream_result(self, url, wanted, script_values, named_metas):
+        """按 extract_from_soup 的字段顺序生成结果"""
+        result = {'url': url}
+        for field in ('title', 'publish_time'):
+            if field in wanted:
+                result[field] = script_values[field]
+        if 'author' in wanted:
+            result['author'] = named_metas['author']
+        if 'article_link' in wanted:
+            result['article_link'] = script_values['article_link']
+        if 'seo_info' in wanted:
+            result['seo_info'] = {meta_name: named_metas[meta_name] for meta_name in SEO_META_NAMES}
+        return result
+
+    def extract_from_soup(self, soup, url, fields=None):
+        wanted = set(ARTICLE_FIELDS) if fields is None else fields
+        want_copyright = 'copyright' in wanted
+        want_script_values = bool(wanted & SCRIPT_FIELDS)
+        want_scripts = 'scripts' in wanted
+        want_meta_tags = 'meta_tags' in wanted
+        want_named_metas = bool(wanted & NAMED_META_FIELDS)
+        want_labels = 'labels' in wanted
+        want_selectors = bool(wanted & SELECTOR_FIELDS)
+
+        script_values = {}
+        first_matches = {}
+        copyright_texts = {selector: [] for selector in COPYRIGHT_TEXT_SELECTORS}
+        copyright_info = {
+            'copyright_attributes': [],
+            'author_attributes': [],
+            'keyword_matches': []
+        }
+        meta_tags = []
+        named_metas = {}
+        scripts = []
+        labels = []
+        canonical = None
+
+        for element in soup.find_all():
+            name = element.name
+            attrs = element.attrs
+
+            if want_copyright:
+                self._collect_copyright_attrs(name, attrs, copyright_info)
+
+            if name == 'script':
+                if want_scripts:
+                    script_info = {}
+                    if attrs.get('src'):
+                        script_info['src'] = attrs.get('src')
+                text = element.string
+                if text:
+                    if want_scripts:
+                        script_info['inline'] = True
+                        script_info['length'] = len(text)
+                    if want_script_values:
+                        for field, pattern in SCRIPT_PATTERNS:
+                            if field not in script_values:
+                                match = pattern.search(text)
+                                if match:
+                                    script_values[field] = match.group(1).strip()
+                if want_scripts:
+                    scripts.append(script_info)
+            elif name == 'meta':
+                if want_meta_tags:
+                    tag_info = {}
+                    for attr in META_ATTRS:
+                        if attrs.get(attr):
+                            tag_info[attr] = attrs.get(attr)
+                    if tag_info:
+                        meta_tags.append(tag_info)
+                meta_name = attrs.get('name')
+                if want_named_metas and isinstance(meta_name, str) and meta_name not in named_metas:
+                    named_metas[meta_name] = element
+            elif name == 'label':
+                if want_labels:
+                    labels.append({
+                        'text': element.get_text().strip(),
+                        'for': attrs.get('for')
+                    })
+            elif name == 'link' and canonical is None and 'canonical' in attrs.get('rel', ()):
+                canonical = element
+
+            # 备用选择器
+            if want_selectors:
+                classes = attrs.get('class') or ()
+                if isinstance(classes, str):
+                    classes = classes.split()
+                element_id = attrs.get('id') or ''
+                for selector in _selector_matches(element, classes, ' '.join(classes), element_id):
+                    if selector in copyright_texts:
+                        if want_copyright:
+                            copyright_texts[selector].append(element)
+                    elif selector not in first_matches:
+                        first_matches[selector] = element
+
+        # meta版权信息
+        copyright_meta = named_metas.get('copyright')
+        if copyright_meta is not None:
+            copyright_info['copyright_attributes'].append({
+                'attribute': 'meta[name="copyright"]',
+                'value': copyright_meta.get('content', ''),
+                'tag': 'meta'
+            })
+
+        # 版权相关的文本内容
+        for selector in COPYRIGHT_TEXT_SELECTORS:
+            for element in copyright_texts[selector]:
+                text = element.get_text().strip()
+                if text and ('©' in text or 'copyright' in text.lower() or '版权' in text):
+                    copyright_info['keyword_matches'].append({
+                        'attribute': 'text_content',
+                        'value': text,
+                        'keyword': '版权相关文本',
+                        'tag': element.name
+                    })
+
+        article_link = script_values.get('article_link')
+        if article_link is None and canonical is not None and canonical.get('href'):
+            article_link = canonical.get('href')
+
+        author_meta = named_metas.get('author')
+        result = {'url': url}
+        if 'title' in wanted:
+            result['title'] = self._title(script_values, first_matches)
+        if 'publish_time' in wanted:
+            result['publish_time'] = self._publish_time(script_values, first_matches)
+        if 'account_name' in wanted:
+            result['account_name'] = self._first_text(first_matches, ACCOUNT_SELECTORS)
+        if 'author' in wanted:
+            result['author'] = author_meta.get('content') if author_meta is not None else None
+        if 'article_link' in wanted:
+            result['article_link'] = article_link
+        if want_copyright:
+            result['copyright'] = copyright_info
+        if want_meta_tags:
+            result['meta_tags'] = meta_tags
+        if want_scripts:
+            result['scripts'] = scripts
+        if want_labels:
+            result['labels'] = labels
+        if 'seo_info' in wanted:
+            result['seo_info'] = {meta_name: named_metas[meta_name].get('content')
+                                  for meta_name in SEO_META_NAMES if meta_name in named_metas}
+        return result
+
+    def _collect_copyright_attrs(self, name, attrs, copyright_info):
+        """收集元素的版权和作者相关属性，以及属性值中的版权关键词"""
+        for attr in COPYRIGHT_ATTRS:
+            value = attrs.get(attr)
+            if value:
+                copyright_info['copyright_attributes'].append({
+                    'attribute': attr,
+                    'value': value,
+                    'tag': name
+                })
+        for attr in AUTHOR_ATTRS:
+            value = attrs.get(attr)
+            if value:
+                copyright_info['author_attributes'].append({
+                    'attribute': attr,
+                    'value': value,
+                    'tag': name
+                })
+
+        # 属性值中的关键词
+        for attr_name, attr_value in attrs.items():
+            if isinstance(attr_value, str):
+                lowered = attr_value.lower()
+                for keyword in COPYRIGHT_KEYWORDS:
+                    if keyword in lowered:
+                        copyright_info['keyword_matches'].append({
+                            'attribute': attr_name,
+                            'value': attr_value,
+                            'keyword': keyword,
+                            'tag': name
+                        })
+
+    def _title(self, script_values, first_matches):
+        if 'title' in script_values:
+            return script_values['title']
+        return self._first_text(first_matches, TITLE_SELECTORS)
+
+    def _publish_time(self, script_values, first_matches):
+        if 'publish_time' in script_values:
+            return script_values['publish_time']
+        for selector in PUBLISH_TIME_SELECTORS:
+            element = first_matches.get(selector)
+            if element is not None:
+                text = element.get_text().strip()
+                # 尝试提取时间信息
+                match = TIME_PATTERN.search(text)
+                if match:
+                    return match.group()
+                return text
+        return None
+
+    def _first_text(self, first_matches, selectors):
+        for selector in selectors:
+            element = first_matches.get(selector)
+            if element is not None:
+                return element.get_text().strip()
+        return None
@@ -0,0 +1,134 @@
+"""微信文章解析基准测试：对比多次遍历的 extract_* 实现与单次遍历的 ArticleExtractor
+
+用法:
+    python benchmarks/bench_article_extractor.py page1.html page2.html ...
+    python benchmarks/bench_article_extractor.py --url https://mp.weixin.qq.com/s/xxxx
+    python benchmarks/bench_article_extractor.py --repeat 20 --json saved_pages/*.html
+    python benchmarks/bench_article_extractor.py --fields title,publish_time saved_pages/*.html
+
+每篇文章都会校验两种实现的输出完全一致，不一致时退出码为1。旧实现使用 html.parser，新实现默认使用 lxml，
+两者只在结构良好的页面上构建相同的文档树；标签未正确闭合的页面可能不一致（见 ArticleExtractor 的说明）。
+指定 --fields 时同时统计只提取这些字段的耗时，并校验其输出与完整结果中的对应字段一致；
+这些字段都能提前确定时（见 article_extractor.can_stream），还统计边读取边解析（按 STREAM_CHUNK_SIZE 分块）
+需要读取的字节数和耗时。
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from article_extractor import (STREAM_CHUNK_SIZE, ArticleExtractor, can_stream, parse_fields,  # noqa: E402
+                               project_fields)
+from fetch_scheduler import get_fetch_scheduler  # noqa: E402
+from pdf_analyzer import PDFAnalyzer  # noqa: E402
+
+
+def legacy_extract(analyzer, content, url):
+    """优化前的解析方式：html.parser + 每个字段单独遍历"""
+    soup = BeautifulSoup(content, 'html.parser')
+    return analyzer.extract_article_info(soup, url)
+
+
+def time_call(func, repeat):
+    """返回多次调用的耗时中位数（毫秒）和最后一次的结果"""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations), result
+
+
+def iter_chunks(content):
+    """模拟 response.iter_content(STREAM_CHUNK_SIZE)"""
+    for start in range(0, len(content), STREAM_CHUNK_SIZE):
+        yield content[start:start + STREAM_CHUNK_SIZE]
+
+
+def load_pages(args, analyzer):
+    pages = []
+    for path in args.files:
+        with open(path, 'rb') as f:
+            pages.append((path, f.read()))
+    for url in args.url:
+        response = get_fetch_scheduler().get(url)
+        pages.append((url, response.content))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='微信文章解析耗时对比')
+    parser.add_argument('files', nargs='*', help='保存到本地的文章HTML文件')
+    parser.add_argument('--url', action='append', default=[], help='在线抓取的文章链接，可重复指定')
+    parser.add_argument('--repeat', type=int, default=10, help='每篇文章重复解析次数')
+    parser.add_argument('--fields', help='同时测试只提取部分字段（如 "title,publish_time"）的耗时')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+    try:
+        fields = parse_fields(args.fields)
+    except ValueError as e:
+        parser.error(str(e))
+
+    analyzer = PDFAnalyzer(max_workers=1)
+    extractor = ArticleExtractor()
+    pages = load_pages(args, analyzer)
+    if not pages:
+        parser.error('请指定至少一个HTML文件或 --url')
+
+    report = []
+    mismatches = 0
+    for name, content in pages:
+        legacy_ms, legacy_result = time_call(lambda: legacy_extract(analyzer, content, name), args.repeat)
+        single_ms, single_result = time_call(lambda: extractor.extract(content, name), args.repeat)
+        identical = legacy_result == single_result
+        row = {
+            'page': name,
+            'bytes': len(content),
+            'legacy_ms': round(legacy_ms, 2),
+            'single_pass_ms': round(single_ms, 2),
+            'speedup': round(legacy_ms / single_ms, 2) if single_ms else None
+        }
+        if fields is not None:
+            fields_ms, fields_result = time_call(lambda: extractor.extract(content, name, fields), args.repeat)
+            row['fields_ms'] = round(fields_ms, 2)
+            identical = identical and fields_result == project_fields(single_result, fields)
+        if can_stream(fields):
+            stream_ms, (stream_result, stats) = time_call(
+                lambda: extractor.extract_stream(iter_chunks(content), name, fields), args.repeat)
+            row['stream_ms'] = round(stream_ms, 2)
+            row['stream_bytes'] = stats['bytes']
+            identical = identical and stream_result == project_fields(single_result, fields)
+        row['identical'] = identical
+        mismatches += not identical
+        report.append(row)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        fields_header = f" {'fields ms':>10}" if fields is not None else ''
+        if can_stream(fields):
+            fields_header += f" {'stream ms':>10} {'stream KB':>10}"
+        print(f"{'page':<40} {'KB':>8} {'legacy ms':>10} {'single ms':>10}{fields_header} {'speedup':>8} identical")
+        for row in report:
+            fields_column = f" {row['fields_ms']:>10.2f}" if fields is not None else ''
+            if can_stream(fields):
+                fields_column += f" {row['stream_ms']:>10.2f} {row['stream_bytes'] / 1024:>10.1f}"
+            print(f"{row['page'][-40:]:<40} {row['bytes'] / 1024:>8.1f} {row['legacy_ms']:>10.2f} "
+                  f"{row['single_pass_ms']:>10.2f}{fields_column} {row['speedup']:>7.2f}x {row['identical']}")
+        total_legacy = sum(row['legacy_ms'] for row in report)
+        total_single = sum(row['single_pass_ms'] for row in report)
+        print(f"\n平均每篇: legacy {total_legacy / len(report):.2f} ms, "
+              f"single-pass {total_single / len(report):.2f} ms")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""二维码解码后端基准测试：在带标注的本地样本集上比较各后端的识别率和每页耗时
+
+样本目录中需要有 labels.json，为每个图片或PDF页面标注期望解出的内容:
+    {
+        "poster.png": ["https://mp.weixin.qq.com/s/xxxx"],
+        "catalogue.pdf": {"1": ["https://example.com/a"], "2": []}
+    }
+PDF的页码从1开始，未标注的页面不参与统计。
+
+用法:
+    python benchmarks/bench_decoders.py corpus_dir
+    python benchmarks/bench_decoders.py corpus_dir --decoder opencv --decoder cascade:zbar,opencv
+    python benchmarks/bench_decoders.py corpus_dir --target-recall 0.95 --json
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2  # noqa: E402
+import fitz  # noqa: E402
+
+from pdf_analyzer import RENDER_ZOOM, pixmap_to_array  # noqa: E402
+from qr_decoders import available_backends, get_decoder  # noqa: E402
+
+
+def load_samples(corpus_dir, zoom):
+    """读取样本，返回 [(样本名, 灰度图像, 期望内容集合), ...]"""
+    with open(os.path.join(corpus_dir, 'labels.json'), encoding='utf-8') as f:
+        labels = json.load(f)
+
+    samples = []
+    for filename, expected in sorted(labels.items()):
+        path = os.path.join(corpus_dir, filename)
+        if filename.lower().endswith('.pdf'):
+            document = fitz.open(path)
+            for page_number, page_expected in sorted(expected.items(), key=lambda item: int(item[0])):
+                pix = document[int(page_number) - 1].get_pixmap(
+                    matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY)
+                # 复制一份，避免依赖 pixmap 的生命周期
+                samples.append((f'{filename}#{page_number}', pixmap_to_array(pix).copy(), set(page_expected)))
+            document.close()
+        else:
+            image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                print(f"无法读取样本: {path}", file=sys.stderr)
+                continue
+            samples.append((filename, image, set(expected)))
+    return samples
+
+
+def run_decoder(spec, samples):
+    decoder = get_decoder(spec)
+    # 预热：首次调用时创建检测器
+    decoder.decode(samples[0][1])
+
+    durations = []
+    expected_total = found = false_positives = 0
+    missed = []
+    for name, image, expected in samples:
+        start = time.perf_counter()
+        decoded = set(decoder.decode(image))
+        durations.append((time.perf_counter() - start) * 1000)
+
+        expected_total += len(expected)
+        found += len(expected & decoded)
+        false_positives += len(decoded - expected)
+        if expected - decoded:
+            missed.append(name)
+
+    durations.sort()
+    return {
+        'decoder': spec,
+        'samples': len(samples),
+        'expected_codes': expected_total,
+        'decoded_codes': found,
+        'decode_rate': round(found / expected_total, 4) if expected_total else None,
+        'false_positives': false_positives,
+        'ms_per_page': round(statistics.mean(durations), 2),
+        'p95_ms': round(durations[max(0, math.ceil(len(durations) * 0.95) - 1)], 2),
+        'missed_samples': missed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='二维码解码后端识别率和耗时对比')
+    parser.add_argument('corpus', help='包含 labels.json 的样本目录')
+    parser.add_argument('--decoder', action='append', default=[],
+                        help='要测试的解码器配置，可重复指定；默认测试所有可用后端及其 cascade/race 组合')
+    parser.add_argument('--zoom', type=float, default=RENDER_ZOOM, help='PDF页面渲染倍数')
+    parser.add_argument('--target-recall', type=float, help='给出满足该识别率的最快解码器')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    samples = load_samples(args.corpus, args.zoom)
+    if not samples:
+        parser.error('样本目录中没有可用的样本')
+
+    specs = args.decoder
+    if not specs:
+        backends = available_backends()
+        specs = list(backends)
+        if len(backends) > 1:
+            specs += ['cascade:' + ','.join(backends), 'race:' + ','.join(backends)]
+
+    report = [run_decoder(spec, samples) for spec in specs]
+
+    recommended = None
+    if args.target_recall is not None:
+        qualified = [row for row in report
+                     if row['decode_rate'] is not None and row['decode_rate'] >= args.target_recall]
+        if qualified:
+            recommended = min(qualified, key=lambda row: row['ms_per_page'])['decoder']
+
+    if args.json:
+        print(json.dumps({'results': report, 'recommended': recommended}, ensure_ascii=False, indent=2))
+    else:
+        print(f"{'decoder':<32} {'decode rate':>11} {'found':>9} {'false +':>8} {'ms/page':>8} {'p95 ms':>8}")
+        for row in report:
+            rate = f"{row['decode_rate'] * 100:.1f}%" if row['decode_rate'] is not None else '-'
+            print(f"{row['decoder']:<32} {rate:>11} {row['decoded_codes']:>4}/{row['expected_codes']:<4} "
+                  f"{row['false_positives']:>8} {row['ms_per_page']:>8.2f} {row['p95_ms']:>8.2f}")
+        if args.target_recall is not None:
+            print(f"\n满足识别率 {args.target_recall:.0%} 的最快解码器: {recommended or '无'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""页面渲染到二维码检测的热路径对比：旧的 RGB/PPM/PIL 多次拷贝路径与灰度零拷贝路径
+
+用法:
+    python benchmarks/bench_render_path.py document.pdf [--pages 20] [--repeat 3] [--json]
+
+对每页分别测量两种路径的耗时中位数、像素缓冲区大小以及 Python 侧（numpy/PIL）的峰值内存分配。
+旧路径需要 Pillow（服务本身不再使用，不在 requirements.txt 中）：pip install Pillow
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2  # noqa: E402
+import fitz  # noqa: E402
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from pdf_analyzer import RENDER_ZOOM, get_qr_detector, pixmap_to_array  # noqa: E402
+
+
+def legacy_path(page):
+    """优化前：RGB渲染 -> PPM编码 -> PIL解析 -> np.array -> BGR转换 -> 新建检测器"""
+    pix = page.get_pixmap(matrix=fitz.Matrix(RENDER_ZOOM, RENDER_ZOOM))
+    image = Image.open(io.BytesIO(pix.tobytes("ppm")))
+    opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+    detector = cv2.QRCodeDetector()
+    detector.detectAndDecodeMulti(opencv_image)
+    return len(pix.samples_mv)
+
+
+def gray_path(page):
+    """优化后：灰度渲染 -> 零拷贝包装 -> 复用检测器"""
+    pix = page.get_pixmap(matrix=fitz.Matrix(RENDER_ZOOM, RENDER_ZOOM), colorspace=fitz.csGRAY)
+    get_qr_detector().detectAndDecodeMulti(pixmap_to_array(pix))
+    return len(pix.samples_mv)
+
+
+def measure(func, page, repeat):
+    """返回 (耗时中位数ms, 像素缓冲区字节数, Python侧峰值分配字节数)"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        buffer_bytes = func(page)
+        durations.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    func(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(durations), buffer_bytes, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='页面渲染热路径的耗时和内存对比')
+    parser.add_argument('pdf', help='用于测试的PDF文件')
+    parser.add_argument('--pages', type=int, default=20, help='最多测试的页数')
+    parser.add_argument('--repeat', type=int, default=3, help='每页重复次数')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    document = fitz.open(args.pdf)
+    # 预热：首次创建检测器和加载字体的开销不计入
+    gray_path(document[0])
+
+    report = []
+    for page_num in range(min(args.pages, len(document))):
+        page = document[page_num]
+        legacy_ms, legacy_buffer, legacy_peak = measure(legacy_path, page, args.repeat)
+        gray_ms, gray_buffer, gray_peak = measure(gray_path, page, args.repeat)
+        report.append({
+            'page_number': page_num + 1,
+            'legacy_ms': round(legacy_ms, 2),
+            'gray_ms': round(gray_ms, 2),
+            'legacy_pixmap_bytes': legacy_buffer,
+            'gray_pixmap_bytes': gray_buffer,
+            'legacy_python_peak_bytes': legacy_peak,
+            'gray_python_peak_bytes': gray_peak
+        })
+    document.close()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'page':>4} {'legacy ms':>10} {'gray ms':>8} {'legacy pix MB':>14} {'gray pix MB':>12} "
+          f"{'legacy py MB':>13} {'gray py MB':>11}")
+    for row in report:
+        print(f"{row['page_number']:>4} {row['legacy_ms']:>10.2f} {row['gray_ms']:>8.2f} "
+              f"{row['legacy_pixmap_bytes'] / 2**20:>14.2f} {row['gray_pixmap_bytes'] / 2**20:>12.2f} "
+              f"{row['legacy_python_peak_bytes'] / 2**20:>13.2f} {row['gray_python_peak_bytes'] / 2**20:>11.2f}")
+    legacy_total = sum(row['legacy_ms'] for row in report)
+    gray_total = sum(row['gray_ms'] for row in report)
+    print(f"\n平均每页: legacy {legacy_total / len(report):.2f} ms, gray {gray_total / len(report):.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""服务冷启动基准测试：测量导入耗时和第一个请求的延迟，并检查是否超出预算
+
+用法:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 5 --import-budget 150 --upload-budget 1500
+    python benchmarks/bench_startup.py --server                # 启动 gunicorn 测量端到端冷启动
+    python benchmarks/bench_startup.py --server --no-warm-up   # 对比关闭工作进程预热时的第一个请求
+
+每次测量都在新的Python进程中进行：
+- import: 导入 app 的耗时。导入后不应加载 cv2、fitz 等重量级模块（它们延迟到第一次分析时导入）
+- health: 导入后第一个 /health 请求的耗时
+- upload: 第一个 /upload 请求的耗时（分析 STARTUP_PAGES 页、每页一个二维码的PDF，包括延迟导入的开销）
+--server 时按 gunicorn.conf.py 启动 gunicorn，测量从启动进程到 /health 返回200的时间（ready），
+以及随后第一个 /upload 请求的耗时。工作进程在后台预热，--gap 指定 /health 可用后等待多久再发送 /upload，
+可以观察预热完成后第一个请求的耗时。
+上传的PDF页数不少于 PARALLEL_MIN_PAGES，分析时使用进程池（PDF_ANALYZER_WORKERS 未设置时至少2个进程，
+单核机器上同样走并行路径），第一个请求的耗时包括启动子进程的开销（预热时已启动的除外）。
+
+任何一项的中位数超出预算，或导入 app 时加载了重量级模块，退出码为1。
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from generate_pdfs import generate_pdf  # noqa: E402
+# 各项测量都在新进程中进行，本进程导入 pdf_analyzer 不影响结果
+from pdf_analyzer import PARALLEL_MIN_PAGES  # noqa: E402
+
+# 上传的PDF页数：页数少于 PARALLEL_MIN_PAGES 时串行处理，测不到启动进程池的开销
+STARTUP_PAGES = PARALLEL_MIN_PAGES
+
+# 导入 app 时不应加载的模块
+HEAVY_MODULES = ('cv2', 'fitz', 'numpy', 'requests', 'bs4', 'lxml', 'PIL')
+# 默认预算（毫秒），按开发机测得的耗时留出余量；性能较弱的实例上可用命令行参数放宽
+DEFAULT_BUDGETS = {
+    'import': 250,
+    'health': 50,
+    'upload': 2000,
+    'ready': 3000
+}
+SERVER_START_TIMEOUT = 60
+
+# 在新进程中导入 app 并依次发送 /health 和 /upload 请求，输出各步耗时（秒）
+PROBE = r'''
+import io, json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+heavy = [name for name in json.loads(sys.argv[2]) if name in sys.modules]
+client = app.app.test_client()
+start = time.perf_counter()
+client.get('/health')
+health = time.perf_counter() - start
+with open(sys.argv[1], 'rb') as f:
+    data = f.read()
+start = time.perf_counter()
+response = client.post('/upload', data={'file': (io.BytesIO(data), 'startup.pdf')},
+                       content_type='multipart/form-data')
+upload = time.perf_counter() - start
+print(json.dumps({'import': imported - started, 'health': health, 'upload': upload, 'heavy_modules': heavy,
+                  'status': response.status_code, 'qr_codes': response.get_json()['results']['total_qr_codes']}))
+'''
+
+
+def probe_env(work_dir):
+    """每次测量使用新的缓存文件，避免命中之前的分析结果"""
+    env = dict(os.environ)
+    env['CACHE_PATH'] = os.path.join(work_dir, f'cache-{uuid.uuid4().hex}.sqlite3')
+    env['PYTHONPATH'] = ROOT_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    env.setdefault('LOG_LEVEL', 'WARNING')
+    env.setdefault('PDF_ANALYZER_WORKERS', str(max(2, os.cpu_count() or 1)))
+    return env
+
+
+def run_probe(pdf_path, work_dir):
+    output = subprocess.run([sys.executable, '-c', PROBE, pdf_path, json.dumps(HEAVY_MODULES)],
+                            cwd=ROOT_DIR, env=probe_env(work_dir), capture_output=True, text=True, check=True)
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    if result['status'] != 200 or result['qr_codes'] != STARTUP_PAGES:
+        raise RuntimeError(f'/upload 结果异常: {result}')
+    return result
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def post_pdf(url, pdf_path):
+    """以 multipart/form-data 上传PDF"""
+    boundary = uuid.uuid4().hex
+    with open(pdf_path, 'rb') as f:
+        data = f.read()
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="startup.pdf"\r\n'
+            f'Content-Type: application/pdf\r\n\r\n').encode() + data + f'\r\n--{boundary}--\r\n'.encode()
+    request = urllib.request.Request(url, data=body, headers={
+        'Content-Type': f'multipart/form-data; boundary={boundary}'
+    })
+    with urllib.request.urlopen(request, timeout=SERVER_START_TIMEOUT) as response:
+        return json.loads(response.read())
+
+
+def run_server(pdf_path, work_dir, warm_up=True, gap=0.0):
+    """启动 gunicorn，返回从启动到 /health 可用的时间和第一个 /upload 的耗时（秒）
+
+    gap 为 /health 可用后到发送 /upload 的间隔（秒）。
+    """
+    port = free_port()
+    env = probe_env(work_dir)
+    env['PORT'] = str(port)
+    env['WARM_UP'] = '1' if warm_up else '0'
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                               cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError('gunicorn 启动失败')
+            if time.perf_counter() - started > SERVER_START_TIMEOUT:
+                raise RuntimeError('等待 /health 超时')
+            try:
+                with urllib.request.urlopen(base_url + '/health', timeout=1) as response:
+                    if response.status == 200:
+                        break
+            except OSError:
+                time.sleep(0.01)
+        ready = time.perf_counter() - started
+        # gap 为0时模拟唤醒实例的请求紧随健康检查之后到达（预热尚未完成）
+        time.sleep(gap)
+        start = time.perf_counter()
+        result = post_pdf(base_url + '/upload', pdf_path)
+        upload = time.perf_counter() - start
+        if result['results']['total_qr_codes'] != STARTUP_PAGES:
+            raise RuntimeError(f'/upload 结果异常: {result}')
+        return {'ready': ready, 'upload': upload}
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='服务冷启动耗时（导入、第一个请求）及预算检查')
+    parser.add_argument('--runs', type=int, default=5, help='测量次数，取中位数')
+    parser.add_argument('--server', action='store_true', help='启动 gunicorn 测量从启动到可用的时间')
+    parser.add_argument('--no-warm-up', action='store_true', help='--server 时关闭工作进程的后台预热（WARM_UP=0）')
+    parser.add_argument('--gap', type=float, default=0.0, help='--server 时 /health 可用后等待多少秒再发送 /upload')
+    for name, budget in DEFAULT_BUDGETS.items():
+        parser.add_argument(f'--{name}-budget', type=float, default=budget, help=f'{name} 的预算（毫秒，默认{budget}）')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        pdf_path = os.path.join(work_dir, 'startup.pdf')
+        generate_pdf(pdf_path, pages=STARTUP_PAGES, density=1.0, codes_per_page=1, wechat_ratio=0.0)
+        runs = []
+        heavy_modules = set()
+        for _ in range(max(1, args.runs)):
+            if args.server:
+                runs.append(run_server(pdf_path, work_dir, warm_up=not args.no_warm_up, gap=args.gap))
+            else:
+                result = run_probe(pdf_path, work_dir)
+                heavy_modules.update(result.pop('heavy_modules'))
+                runs.append(result)
+
+    metrics = ('ready', 'upload') if args.server else ('import', 'health', 'upload')
+    report = {}
+    failed = bool(heavy_modules)
+    for metric in metrics:
+        values = [run[metric] * 1000 for run in runs]
+        budget = getattr(args, f'{metric}_budget')
+        median = statistics.median(values)
+        report[metric] = {
+            'median_ms': round(median, 1),
+            'max_ms': round(max(values), 1),
+            'budget_ms': budget,
+            'ok': median <= budget
+        }
+        failed = failed or median > budget
+    if not args.server:
+        report['heavy_modules_on_import'] = sorted(heavy_modules)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"{'metric':<10} {'median ms':>10} {'max ms':>10} {'budget ms':>10} ok")
+        for metric in metrics:
+            row = report[metric]
+            print(f"{metric:<10} {row['median_ms']:>10.1f} {row['max_ms']:>10.1f} {row['budget_ms']:>10.0f} {row['ok']}")
+        if heavy_modules:
+            print(f"\n导入 app 时加载了重量级模块: {', '.join(sorted(heavy_modules))}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
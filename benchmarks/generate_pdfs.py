@@ -0,0 +1,147 @@
+"""生成带二维码的合成PDF，用于离线基准测试
+
+二维码由 cv2.QRCodeEncoder 生成，以图片（或矢量方块）的形式用 PyMuPDF 插入页面。
+同时输出 labels.json（格式与 bench_decoders.py 一致），记录每页应识别出的内容。
+
+用法:
+    python benchmarks/generate_pdfs.py out_dir --documents 3 --pages 50 --density 0.5 \\
+        --codes-per-page 2 --sizes 40,80,120 --dpi 150 --wechat-ratio 0.6 --vector-ratio 0.1
+"""
+import argparse
+import json
+import os
+import random
+
+import cv2
+import fitz
+import numpy as np
+
+# 基准测试中的微信文章链接使用 http，以便通过本地桩服务器（HTTP代理）访问
+WECHAT_URL_TEMPLATE = 'http://mp.weixin.qq.com/s/bench-{id}'
+OTHER_URL_TEMPLATE = 'https://example.com/product/{id}'
+PAGE_MARGIN = 36
+
+
+def encode_qr(data):
+    """返回二维码模块矩阵（uint8，0为黑，255为白，不含静区）"""
+    encoder = cv2.QRCodeEncoder.create()
+    matrix = encoder.encode(data)
+    # 去掉 QRCodeEncoder 自带的静区，由调用方决定留白
+    rows = np.where((matrix == 0).any(axis=1))[0]
+    cols = np.where((matrix == 0).any(axis=0))[0]
+    return matrix[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+
+
+def insert_qr_image(page, rect, matrix, dpi):
+    """以指定分辨率把二维码作为PNG图片插入页面"""
+    modules = matrix.shape[0]
+    target_pixels = max(modules, int(rect.width / 72 * dpi))
+    scale = max(1, target_pixels // (modules + 8))
+    image = cv2.resize(matrix, (modules * scale, modules * scale), interpolation=cv2.INTER_NEAREST)
+    image = cv2.copyMakeBorder(image, 4 * scale, 4 * scale, 4 * scale, 4 * scale,
+                               cv2.BORDER_CONSTANT, value=255)
+    page.insert_image(rect, stream=cv2.imencode('.png', image)[1].tobytes())
+
+
+def draw_qr_vector(page, rect, matrix):
+    """用矢量方块绘制二维码（模拟设计软件导出的矢量二维码）"""
+    modules = matrix.shape[0]
+    module_size = rect.width / (modules + 8)
+    origin_x = rect.x0 + 4 * module_size
+    origin_y = rect.y0 + 4 * module_size
+    shape = page.new_shape()
+    for row in range(modules):
+        for col in range(modules):
+            if matrix[row, col] == 0:
+                x = origin_x + col * module_size
+                y = origin_y + row * module_size
+                shape.draw_rect(fitz.Rect(x, y, x + module_size, y + module_size))
+    shape.finish(color=None, fill=(0, 0, 0), width=0)
+    shape.commit()
+
+
+def generate_pdf(path, pages=20, density=0.5, codes_per_page=1, sizes=(60, 100), dpi=150,
+                 wechat_ratio=0.5, vector_ratio=0.0, article_pool=None, seed=0):
+    """生成一份PDF，返回 {页码(字符串): [期望识别的内容]}
+
+    article_pool 为微信文章编号的可选范围，多份文档共用同一范围时文章会在文档间重复出现。
+    """
+    rng = random.Random(seed)
+    document = fitz.open()
+    labels = {}
+    counter = 0
+
+    for page_index in range(pages):
+        page = document.new_page(width=595, height=842)  # A4
+        page.insert_textbox(fitz.Rect(PAGE_MARGIN, PAGE_MARGIN, 559, 300),
+                            f'Benchmark page {page_index + 1}\n' + 'Lorem ipsum dolor sit amet. ' * 20,
+                            fontsize=10)
+        expected = []
+
+        if rng.random() < density:
+            for slot in range(codes_per_page):
+                counter += 1
+                if rng.random() < wechat_ratio:
+                    article_id = rng.randrange(article_pool) if article_pool else f'{seed}-{counter}'
+                    data = WECHAT_URL_TEMPLATE.format(id=article_id)
+                else:
+                    data = OTHER_URL_TEMPLATE.format(id=f'{seed}-{counter}')
+
+                size = rng.choice(sizes)
+                # 二维码按行排列在页面下半部分，避免互相重叠
+                x0 = PAGE_MARGIN + (slot % 3) * 180
+                y0 = 320 + (slot // 3) * 170
+                rect = fitz.Rect(x0, y0, x0 + size, y0 + size)
+
+                matrix = encode_qr(data)
+                if rng.random() < vector_ratio:
+                    draw_qr_vector(page, rect, matrix)
+                else:
+                    insert_qr_image(page, rect, matrix, dpi)
+                if data not in expected:
+                    expected.append(data)
+
+        labels[str(page_index + 1)] = expected
+
+    document.save(path, deflate=True)
+    document.close()
+    return labels
+
+
+def parse_sizes(value):
+    return tuple(float(item) for item in value.split(',') if item)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成带二维码的合成PDF和标注文件')
+    parser.add_argument('output', help='输出目录')
+    parser.add_argument('--documents', type=int, default=1, help='生成的文档数')
+    parser.add_argument('--pages', type=int, default=20, help='每份文档的页数')
+    parser.add_argument('--density', type=float, default=0.5, help='包含二维码的页面比例')
+    parser.add_argument('--codes-per-page', type=int, default=1, help='每个含二维码页面上的二维码数量（最多6个）')
+    parser.add_argument('--sizes', type=parse_sizes, default=(60, 100), help='二维码边长（pt），逗号分隔')
+    parser.add_argument('--dpi', type=int, default=150, help='二维码图片的分辨率')
+    parser.add_argument('--wechat-ratio', type=float, default=0.5, help='微信文章链接所占比例')
+    parser.add_argument('--vector-ratio', type=float, default=0.0, help='以矢量方式绘制的二维码比例')
+    parser.add_argument('--article-pool', type=int, help='微信文章编号范围，设置后文章会在文档间重复')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    labels = {}
+    for index in range(args.documents):
+        filename = f'bench-{index + 1:03d}.pdf'
+        labels[filename] = generate_pdf(
+            os.path.join(args.output, filename), pages=args.pages, density=args.density,
+            codes_per_page=min(args.codes_per_page, 6), sizes=args.sizes, dpi=args.dpi,
+            wechat_ratio=args.wechat_ratio, vector_ratio=args.vector_ratio,
+            article_pool=args.article_pool, seed=args.seed + index
+        )
+        print(f"已生成 {filename}")
+
+    with open(os.path.join(args.output, 'labels.json'), 'w', encoding='utf-8') as f:
+        json.dump(labels, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,313 @@
+"""端到端基准测试：合成PDF + 本地微信桩服务器，完全离线
+
+流程：生成（或读取）带标注的合成PDF -> 启动本地桩服务器并通过 HTTP_PROXY 接管
+mp.weixin.qq.com 的请求 -> 分别通过 PDFAnalyzer.analyze_pdf 和 Flask 的 /upload 接口
+分析每份文档（batch 目标通过 analyze_batch 一次分析全部文档），统计吞吐量（页/秒）、
+单文档耗时 p50/p95、各阶段耗时（打开、渲染、解码、抓取、解析）、识别率和峰值内存（RSS）。
+
+用法:
+    python benchmarks/run_benchmark.py --documents 3 --pages 40 --latency 0.2 --repeat 3
+    python benchmarks/run_benchmark.py --corpus corpus_dir --workers 4 --output after.json --compare before.json
+
+各阶段耗时取自分析结果的 timings（包含子进程合并回来的数据），多线程抓取时为各线程耗时之和。
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import fitz  # noqa: E402
+
+from generate_pdfs import generate_pdf, parse_sizes  # noqa: E402
+from instrumentation import STAGES, configure_logging  # noqa: E402
+from pdf_analyzer import PDFAnalyzer, _shutdown_process_pool  # noqa: E402
+from wechat_stub import WeChatStubServer  # noqa: E402
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * fraction) - 1)]
+
+
+def peak_rss_mb():
+    """本进程和已结束子进程的峰值RSS（Linux 上 ru_maxrss 的单位为KB）"""
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return {
+        'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1)
+    }
+
+
+def found_codes(results):
+    """从分析结果中取出 {(页码, 内容)}，同一链接出现在多页时按 pages 展开"""
+    found = set()
+    for article in results.get('wechat_articles', []):
+        for page in article.get('pages') or [article['page_number']]:
+            found.add((page, article.get('qr_url') or article['url']))
+    for item in results.get('other_qr_codes', []):
+        for page in item.get('pages') or [item['page_number']]:
+            found.add((page, item['url']))
+    return found
+
+
+def expected_codes(labels):
+    return {(int(page), data) for page, items in labels.items() for data in items}
+
+
+def prepare_corpus(args, work_dir):
+    """返回 [(文件名, 路径, 页面标注)]"""
+    if args.corpus:
+        with open(os.path.join(args.corpus, 'labels.json'), encoding='utf-8') as f:
+            labels = json.load(f)
+        return [(name, os.path.join(args.corpus, name), page_labels)
+                for name, page_labels in sorted(labels.items()) if name.lower().endswith('.pdf')]
+
+    documents = []
+    for index in range(args.documents):
+        name = f'bench-{index + 1:03d}.pdf'
+        path = os.path.join(work_dir, name)
+        page_labels = generate_pdf(
+            path, pages=args.pages, density=args.density, codes_per_page=args.codes_per_page,
+            sizes=args.sizes, dpi=args.dpi, wechat_ratio=args.wechat_ratio,
+            vector_ratio=args.vector_ratio, article_pool=args.article_pool, seed=args.seed + index
+        )
+        documents.append((name, path, page_labels))
+    return documents
+
+
+def run_analyze(path, args):
+    """直接调用 PDFAnalyzer.analyze_pdf（不使用缓存）"""
+    analyzer = PDFAnalyzer(max_workers=args.workers, fetch_workers=args.fetch_workers,
+                           detection_mode=args.mode, decoder=args.decoder)
+    results = analyzer.analyze_pdf(path)
+    results['timings'] = analyzer.timings.to_dict()
+    return results
+
+
+def run_upload(path, args, client):
+    """通过 Flask 测试客户端调用 /upload 接口"""
+    with open(path, 'rb') as f:
+        response = client.post('/upload', data={'file': (f, os.path.basename(path)), 'timings': '1'},
+                               content_type='multipart/form-data')
+    payload = response.get_json()
+    if response.status_code != 200:
+        raise RuntimeError(payload.get('error') if payload else f'HTTP {response.status_code}')
+    return payload['results']
+
+
+def benchmark_batch(documents, args):
+    """通过 PDFAnalyzer.analyze_batch 一次分析全部文档，每次重复计为一次运行"""
+    runs = []
+    stages = {stage: {'seconds': 0.0, 'count': 0} for stage in STAGES}
+    labels = {name: page_labels for name, _, page_labels in documents}
+    for repeat in range(args.repeat):
+        analyzer = PDFAnalyzer(max_workers=args.workers, fetch_workers=args.fetch_workers,
+                               detection_mode=args.mode, decoder=args.decoder)
+        start = time.perf_counter()
+        batch = analyzer.analyze_batch([(name, path, None) for name, path, _ in documents])
+        elapsed = time.perf_counter() - start
+        for stage, value in analyzer.timings.to_dict()['stages'].items():
+            total = stages.setdefault(stage, {'seconds': 0.0, 'count': 0})
+            total['seconds'] = round(total['seconds'] + value['seconds'], 4)
+            total['count'] += value['count']
+
+        expected = set()
+        found = set()
+        for item in batch['documents']:
+            expected |= {(item['filename'], *code) for code in expected_codes(labels[item['filename']])}
+            found |= {(item['filename'], *code) for code in found_codes(item['results'])}
+        runs.append({
+            'document': 'batch',
+            'repeat': repeat,
+            'pages': batch['summary']['total_pages'],
+            'seconds': round(elapsed, 4),
+            'qr_codes': batch['summary']['total_qr_codes'],
+            'recall': round(len(expected & found) / len(expected), 4) if expected else None,
+            'false_positives': len(found - expected),
+            'article_errors': sum(1 for item in batch['documents']
+                                  for qr in item['results'].get('other_qr_codes', []) if 'error' in qr),
+            'unique_article_urls': batch['summary']['unique_article_urls'],
+            'article_references': batch['summary']['article_references']
+        })
+    return summarize_runs(runs, len(documents), stages)
+
+
+def benchmark_target(target, documents, args, client=None):
+    runs = []
+    stages = {stage: {'seconds': 0.0, 'count': 0} for stage in STAGES}
+    for repeat in range(args.repeat):
+        for name, path, page_labels in documents:
+            with fitz.open(path) as document:
+                pages = document.page_count
+            start = time.perf_counter()
+            if target == 'upload':
+                results = run_upload(path, args, client)
+            else:
+                results = run_analyze(path, args)
+            elapsed = time.perf_counter() - start
+
+            for stage, value in results.get('timings', {}).get('stages', {}).items():
+                total = stages.setdefault(stage, {'seconds': 0.0, 'count': 0})
+                total['seconds'] = round(total['seconds'] + value['seconds'], 4)
+                total['count'] += value['count']
+
+            expected = expected_codes(page_labels)
+            found = found_codes(results)
+            runs.append({
+                'document': name,
+                'repeat': repeat,
+                'pages': pages,
+                'seconds': round(elapsed, 4),
+                'qr_codes': results.get('total_qr_codes', 0),
+                'recall': round(len(expected & found) / len(expected), 4) if expected else None,
+                'false_positives': len(found - expected),
+                'article_errors': sum(1 for item in results.get('other_qr_codes', []) if 'error' in item)
+            })
+
+    return summarize_runs(runs, len(documents), stages)
+
+
+def summarize_runs(runs, documents, stages):
+    durations = [run['seconds'] for run in runs]
+    recalls = [run['recall'] for run in runs if run['recall'] is not None]
+    return {
+        'runs': runs,
+        'documents': documents,
+        'pages_per_sec': round(sum(run['pages'] for run in runs) / sum(durations), 2),
+        'p50_s': round(statistics.median(durations), 4),
+        'p95_s': round(percentile(durations, 0.95), 4),
+        'mean_recall': round(statistics.mean(recalls), 4) if recalls else None,
+        'article_errors': sum(run['article_errors'] for run in runs),
+        'stages': stages
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"{'target':<10} {'pages/s':>9} {'p50 s':>8} {'p95 s':>8} {'recall':>8} {'errors':>7}")
+    for target, summary in report['targets'].items():
+        recall = f"{summary['mean_recall'] * 100:.1f}%" if summary['mean_recall'] is not None else '-'
+        print(f"{target:<10} {summary['pages_per_sec']:>9.2f} {summary['p50_s']:>8.3f} "
+              f"{summary['p95_s']:>8.3f} {recall:>8} {summary['article_errors']:>7}")
+        base = (baseline or {}).get('targets', {}).get(target)
+        if base:
+            print(f"{'  vs base':<10} {_delta(summary['pages_per_sec'], base['pages_per_sec']):>9} "
+                  f"{_delta(summary['p50_s'], base['p50_s']):>8} {_delta(summary['p95_s'], base['p95_s']):>8}")
+
+    print('\n各阶段累计耗时（秒）:')
+    for target, summary in report['targets'].items():
+        parts = [f"{stage}={value['seconds']:.3f}" for stage, value in summary['stages'].items()]
+        print(f"  {target:<8} " + '  '.join(parts))
+
+    rss = report['peak_rss_mb']
+    print(f"\n峰值RSS: 本进程 {rss['self']} MB，子进程 {rss['children']} MB；"
+          f"桩服务器共收到 {report['stub_requests']} 个请求")
+
+
+def _delta(current, base):
+    if not base:
+        return '-'
+    return f"{(current - base) / base * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='端到端基准测试（合成PDF + 本地微信桩服务器）')
+    parser.add_argument('--corpus', help='使用已有的样本目录（含 labels.json），不指定时临时生成')
+    parser.add_argument('--documents', type=int, default=3, help='生成的文档数')
+    parser.add_argument('--pages', type=int, default=20, help='每份文档的页数')
+    parser.add_argument('--density', type=float, default=0.5, help='包含二维码的页面比例')
+    parser.add_argument('--codes-per-page', type=int, default=1, help='每个含二维码页面上的二维码数量')
+    parser.add_argument('--sizes', type=parse_sizes, default=(80, 120), help='二维码边长（pt），逗号分隔')
+    parser.add_argument('--dpi', type=int, default=150, help='二维码图片的分辨率')
+    parser.add_argument('--wechat-ratio', type=float, default=0.6, help='微信文章链接所占比例')
+    parser.add_argument('--vector-ratio', type=float, default=0.0, help='以矢量方式绘制的二维码比例')
+    parser.add_argument('--article-pool', type=int, help='微信文章编号范围，设置后文章会在文档间重复')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--latency', type=float, default=0.1, help='桩服务器每个请求的延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='桩服务器返回503的比例')
+    parser.add_argument('--repeat', type=int, default=1, help='每份文档重复分析的次数')
+    parser.add_argument('--workers', type=int, default=1, help='页面处理进程数（1 = 串行）')
+    parser.add_argument('--fetch-workers', type=int, help='文章抓取线程数')
+    parser.add_argument('--mode', help='二维码检测模式（full / adaptive）')
+    parser.add_argument('--decoder', help='二维码解码器配置')
+    parser.add_argument('--no-triage', action='store_true', help='关闭页面预判，所有页面都按原流程渲染和检测')
+    parser.add_argument('--target', action='append', choices=('analyze', 'upload', 'batch'),
+                        help='测试对象，可重复指定；默认测试 analyze 和 upload')
+    parser.add_argument('--output', help='把结果写入JSON文件')
+    parser.add_argument('--compare', help='与之前保存的JSON结果对比')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    parser.add_argument('--verbose', action='store_true', help='显示分析过程的日志')
+    args = parser.parse_args()
+    targets = args.target or ['analyze', 'upload']
+
+    with tempfile.TemporaryDirectory(prefix='pdf-bench-') as work_dir:
+        stub = WeChatStubServer(latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+        proxy = stub.start()
+        # requests 默认读取代理环境变量，子进程同样继承
+        for key in ('HTTP_PROXY', 'http_proxy'):
+            os.environ[key] = proxy
+        for key in ('NO_PROXY', 'no_proxy'):
+            os.environ.pop(key, None)
+        # Flask 应用的缓存放在临时目录，避免影响正常使用
+        os.environ['CACHE_PATH'] = os.path.join(work_dir, 'cache.sqlite3')
+        if args.no_triage:
+            os.environ['QR_PAGE_TRIAGE'] = '0'
+        # 分析过程的日志较多，默认只显示警告（子进程同样读取 LOG_LEVEL）
+        if not args.verbose:
+            os.environ['LOG_LEVEL'] = 'WARNING'
+        configure_logging()
+
+        documents = prepare_corpus(args, work_dir)
+        if not documents:
+            parser.error('没有可用的PDF样本')
+
+        report = {
+            'config': {key: value for key, value in vars(args).items()
+                       if key not in ('output', 'compare', 'json', 'verbose')},
+            'targets': {}
+        }
+        try:
+            for target in targets:
+                client = None
+                if target == 'upload':
+                    import app as app_module
+                    # 禁用缓存，每次都完整分析
+                    app_module.article_cache = None
+                    app_module.result_cache = None
+                    client = app_module.app.test_client()
+                if target == 'batch':
+                    report['targets'][target] = benchmark_batch(documents, args)
+                else:
+                    report['targets'][target] = benchmark_target(target, documents, args, client)
+        finally:
+            stub.stop()
+            # 关闭进程池，使子进程的峰值内存计入 RUSAGE_CHILDREN
+            _shutdown_process_pool(wait=True)
+
+        report['stub_requests'] = stub.requests
+        report['peak_rss_mb'] = peak_rss_mb()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report, baseline)
+
+
+if __name__ == '__main__':
+    main()
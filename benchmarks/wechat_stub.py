@@ -0,0 +1,159 @@
+"""本地微信文章桩服务器，用于离线基准测试
+
+以HTTP代理的方式运行：把 HTTP_PROXY 指向本服务器后，对 http://mp.weixin.qq.com/s/... 的请求
+都会返回根据文章编号生成的固定HTML（结构与真实文章页一致），并可模拟网络延迟和错误。
+
+用法:
+    python benchmarks/wechat_stub.py --port 8765 --latency 0.2 --error-rate 0.05
+    HTTP_PROXY=http://127.0.0.1:8765 python ...
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+ARTICLE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="description" content="基准测试文章 {id} 的摘要">
+<meta name="keywords" content="基准测试,二维码">
+<meta name="author" content="作者{id}">
+<meta name="copyright" content="© 2024 基准测试公众号">
+<meta name="viewport" content="width=device-width,initial-scale=1">
+<title>基准测试文章 {id}</title>
+<link rel="canonical" href="https://mp.weixin.qq.com/s/{id}">
+<script src="https://res.wx.qq.com/mmbizappmsg/zh_CN/appmsg.js"></script>
+<script>
+var msg_title = '基准测试文章 {id}'.html(false);
+var createTime = '2024-05-{day:02d} 10:00';
+var msg_link = "http://mp.weixin.qq.com/s/{id}";
+</script>
+</head>
+<body>
+<div id="js_article" class="rich_media">
+<h1 class="rich_media_title" id="activity-name">基准测试文章 {id}</h1>
+<div class="rich_media_meta_list">
+<em id="publish_time" class="rich_media_meta rich_media_meta_text">2024年5月{day}日</em>
+<a class="rich_media_meta_link" id="js_name" href="javascript:void(0);">基准测试公众号</a>
+</div>
+<div class="rich_media_content" id="js_content">
+{paragraphs}
+</div>
+<label for="js_like">喜欢作者</label>
+<div class="copyright_info" data-copyright="原创">本文版权归基准测试公众号所有</div>
+</div>
+<footer class="footer">Copyright © 2024 Tencent</footer>
+</body>
+</html>
+"""
+
+PARAGRAPH = '<p><span data-name="段落{n}">这是用于基准测试的正文段落，内容重复以接近真实文章的大小。</span></p>'
+
+
+def render_article(article_id, paragraphs=200):
+    """生成文章页HTML（同一编号每次内容相同）"""
+    day = sum(ord(c) for c in str(article_id)) % 28 + 1
+    body = '\n'.join(PARAGRAPH.format(n=n) for n in range(paragraphs))
+    return ARTICLE_TEMPLATE.format(id=article_id, day=day, paragraphs=body)
+
+
+class WeChatStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.record_request()
+        # 代理请求的路径是完整URL，直连请求的路径是相对路径
+        parsed = urlparse(self.path)
+        if parsed.netloc and parsed.netloc != 'mp.weixin.qq.com':
+            self._send(502, b'stub only serves mp.weixin.qq.com')
+            return
+
+        if server.latency:
+            time.sleep(server.latency)
+        if server.error_rate and server.random.random() < server.error_rate:
+            self._send(503, b'service unavailable')
+            return
+
+        if parsed.path.startswith('/s/'):
+            article_id = parsed.path[len('/s/'):] or 'index'
+            self._send(200, render_article(article_id, server.paragraphs).encode('utf-8'),
+                       'text/html; charset=utf-8')
+        else:
+            self._send(404, b'not found')
+
+    def _send(self, status, body, content_type='text/plain; charset=utf-8'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WeChatStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), latency=0.0, error_rate=0.0, paragraphs=200, seed=0):
+        super().__init__(address, WeChatStubHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.paragraphs = paragraphs
+        self.random = random.Random(seed)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def handle_error(self, request, client_address):
+        # 客户端读到所需内容后会提前断开连接（见 ARTICLE_STREAM），不必输出异常
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def start(self):
+        """在后台线程中运行，返回代理地址"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地微信文章桩服务器（HTTP代理）')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的模拟延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回503的请求比例')
+    parser.add_argument('--paragraphs', type=int, default=200, help='文章正文段落数（控制页面大小）')
+    args = parser.parse_args()
+
+    server = WeChatStubServer((args.host, args.port), latency=args.latency,
+                              error_rate=args.error_rate, paragraphs=args.paragraphs)
+    print(f"桩服务器已启动，设置 HTTP_PROXY={server.url} 即可使用")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
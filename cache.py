@@ -0,0 +1,176 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
+
+# 默认缓存文件位置（同一台机器上的所有gunicorn工作进程共享）
+DEFAULT_CACHE_PATH = os.path.join(tempfile.gettempdir(), 'pdf-analysis-cache.sqlite3')
+
+# 微信文章链接中真正标识文章的参数，其余参数（scene、chksm等）与内容无关
+WECHAT_ARTICLE_PARAMS = ('__biz', 'mid', 'idx', 'sn')
+
+
+def normalize_article_url(url):
+    """规范化文章链接，使同一篇文章的不同分享链接得到相同的缓存键"""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower() or 'https'
+    netloc = parsed.netloc.lower()
+    path = parsed.path or '/'
+    query = parse_qsl(parsed.query, keep_blank_values=True)
+
+    if netloc == 'mp.weixin.qq.com':
+        scheme = 'https'
+        if path.rstrip('/') == '/s':
+            # 长链接：只保留文章标识参数
+            query = [(k, v) for k, v in query if k in WECHAT_ARTICLE_PARAMS]
+        elif path.startswith('/s/'):
+            # 短链接：路径本身就是文章标识
+            query = []
+
+    return urlunparse((scheme, netloc, path, '', urlencode(sorted(query)), ''))
+
+
+class SQLiteCache:
+    """基于SQLite的键值缓存，支持TTL过期、按条数的LRU淘汰和命中统计
+
+    数据保存在磁盘文件中，多个进程可同时访问，重启后依然有效。
+    """
+
+    table = 'cache'
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=86400, max_entries=5000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.table} ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                'created_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            conn.execute(
+                f'CREATE INDEX IF NOT EXISTS {self.table}_accessed_at '
+                f'ON {self.table} (accessed_at)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_stats ('
+                'name TEXT PRIMARY KEY, value INTEGER NOT NULL)'
+            )
+
+    def _connection(self):
+        """获取当前线程的数据库连接（fork之后重新建立）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def make_key(self, key):
+        """将调用方的键转换为存储键，子类可覆盖"""
+        return key
+
+    def get(self, key):
+        """读取缓存，未命中或已过期时返回None"""
+        key = self.make_key(key)
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            row = conn.execute(
+                f'SELECT value, created_at FROM {self.table} WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+                row = None
+
+            if row is None:
+                self._increment(conn, 'misses')
+                return None
+
+            conn.execute(f'UPDATE {self.table} SET accessed_at = ? WHERE key = ?', (now, key))
+            self._increment(conn, 'hits')
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        """写入缓存，超过容量时淘汰最久未访问的条目"""
+        key = self.make_key(key)
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                f'INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) '
+                'VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            if self.max_entries:
+                count = conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+                if count > self.max_entries:
+                    conn.execute(
+                        f'DELETE FROM {self.table} WHERE key IN ('
+                        f'SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)',
+                        (count - self.max_entries,)
+                    )
+                    self._increment(conn, 'evictions', count - self.max_entries)
+
+    def delete(self, key):
+        """删除指定缓存条目"""
+        key = self.make_key(key)
+        conn = self._connection()
+        with conn:
+            conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+
+    def clear(self):
+        """清空缓存和统计数据"""
+        conn = self._connection()
+        with conn:
+            conn.execute(f'DELETE FROM {self.table}')
+            conn.execute('DELETE FROM cache_stats WHERE name LIKE ?', (f'{self.table}.%',))
+
+    def stats(self):
+        """返回命中、未命中、淘汰次数和当前条目数"""
+        conn = self._connection()
+        rows = conn.execute(
+            'SELECT name, value FROM cache_stats WHERE name LIKE ?', (f'{self.table}.%',)
+        ).fetchall()
+        stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        for name, value in rows:
+            stats[name.split('.', 1)[1]] = value
+        stats['entries'] = conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+        return stats
+
+    def _increment(self, conn, name, amount=1):
+        conn.execute(
+            'INSERT INTO cache_stats (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            (f'{self.table}.{name}', amount)
+        )
+
+
+class ArticleCache(SQLiteCache):
+    """微信文章解析结果缓存，以规范化后的文章链接为键"""
+
+    table = 'articles'
+
+    def make_key(self, key):
+        return normalize_article_url(key)
+
+
+class ResultCache(SQLiteCache):
+    """整份PDF的分析结果缓存，以文件内容的SHA-256为键
+
+    同时保存页面检测结果和最终结果，便于只刷新文章数据。
+    """
+
+    table = 'results'
@@ -0,0 +1,220 @@
+"""命令行批量分析：用多个进程逐份分析PDF，每份文档输出一行JSON（JSONL），可断点续跑
+
+用法:
+    python cli.py reports/ --output results.jsonl --workers 4
+    python cli.py "archive/**/*.pdf" --output results.jsonl --pages 1-3 --decoder zbar --no-fetch
+
+每份文档完成后，结果追加到输出文件，并在检查点文件（默认为 输出文件.checkpoint）中记录该文档和输出文件的长度。
+中断或崩溃后用相同的参数重新运行，会先把输出文件截断到最后一个检查点，再跳过已完成的文档继续处理。
+"""
+import argparse
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from article_extractor import parse_fields
+from cache import ArticleCache
+from instrumentation import configure_logging
+from pdf_analyzer import CODE_CACHE_MODES, PDFAnalyzer, parse_page_ranges
+
+logger = logging.getLogger('cli')
+
+# 每个工作进程同时排队的文档数，避免一次提交全部文档
+QUEUE_PER_WORKER = 2
+# 每完成多少份文档输出一次进度日志
+PROGRESS_INTERVAL = 100
+
+# 工作进程内复用的分析器
+_worker_analyzer = None
+
+
+def find_pdfs(inputs):
+    """展开输入的目录、通配符和文件，返回去重并排序后的PDF绝对路径列表"""
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.update(os.path.join(root, name) for name in files if name.lower().endswith('.pdf'))
+        elif glob.has_magic(item):
+            paths.update(path for path in glob.glob(item, recursive=True)
+                         if os.path.isfile(path) and path.lower().endswith('.pdf'))
+        elif os.path.isfile(item):
+            paths.add(item)
+        else:
+            logger.warning("输入不存在，已跳过: %s", item)
+    return sorted(os.path.abspath(path) for path in paths)
+
+
+def load_checkpoint(checkpoint_path, output_path, retry_errors=False):
+    """读取检查点，把输出文件截断到最后一个完整记录之后，返回已完成的文档路径集合
+
+    输出文件不为空但检查点中没有记录时（输出文件不是由本程序写入的，或检查点已丢失）抛出 ValueError，
+    不截断输出文件。
+    """
+    completed = {}
+    offset = None
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, 'r+b') as f:
+            data = f.read()
+            end = data.rfind(b'\n') + 1
+            if end != len(data):
+                # 写入中断的最后一行：截断到最后一个完整的行，之后追加的记录才不会和它连成一行
+                logger.info("检查点文件截断到最后一个完整记录（%d 字节）", end)
+                f.truncate(end)
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            completed[entry['path']] = entry['status']
+            offset = max(offset or 0, entry['offset'])
+
+    if offset is None:
+        if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+            raise ValueError(f'输出文件 {output_path} 已存在且没有对应的检查点，'
+                             f'请使用 --restart 清空后重新开始，或用 --output 指定其他文件')
+    elif os.path.exists(output_path) and os.path.getsize(output_path) != offset:
+        logger.info("输出文件截断到最后一个检查点（%d 字节）", offset)
+        with open(output_path, 'r+b') as f:
+            f.truncate(offset)
+    return {path for path, status in completed.items() if status == 'ok' or not retry_errors}
+
+
+def init_worker(options, cache_path=None):
+    """工作进程初始化：配置日志并创建分析器（每份文档在一个进程内串行处理）"""
+    global _worker_analyzer
+    configure_logging()
+    # 各进程共用同一个SQLite文章缓存，同一篇文章在整个批次中只抓取一次
+    article_cache = ArticleCache(cache_path) if cache_path else None
+    _worker_analyzer = PDFAnalyzer(max_workers=1, article_cache=article_cache, **options)
+
+
+def analyze_file(path):
+    """在工作进程中分析一份PDF，返回输出记录"""
+    start = time.perf_counter()
+    record = {'path': path, 'filename': os.path.basename(path)}
+    try:
+        results = _worker_analyzer.analyze_pdf(path)
+        record['status'] = 'error' if 'error' in results else 'ok'
+        record['results'] = results
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = str(e)
+    record['elapsed_seconds'] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def run(paths, output_path, checkpoint_path, workers, options, cache_path=None):
+    """用进程池分析 paths 中的文档，按完成顺序写入输出文件和检查点，返回 (成功数, 失败数)"""
+    ok = failed = 0
+    started = time.perf_counter()
+    pending = iter(paths)
+    running = set()
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=init_worker, initargs=(options, cache_path))
+    with pool, open(output_path, 'ab') as output, open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+        while True:
+            # 保持每个进程有少量排队的文档
+            while len(running) < workers * QUEUE_PER_WORKER:
+                path = next(pending, None)
+                if path is None:
+                    break
+                running.add(pool.submit(analyze_file, path))
+            if not running:
+                break
+
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                record = future.result()
+                output.write(json.dumps(record, ensure_ascii=False, default=str).encode('utf-8') + b'\n')
+                output.flush()
+                os.fsync(output.fileno())
+                # 先落盘结果再写检查点，检查点中的偏移量之前都是完整的记录
+                checkpoint.write(json.dumps({'path': record['path'], 'status': record['status'],
+                                             'offset': output.tell()}, ensure_ascii=False) + '\n')
+                checkpoint.flush()
+                os.fsync(checkpoint.fileno())
+
+                if record['status'] == 'ok':
+                    ok += 1
+                else:
+                    failed += 1
+                    logger.warning("分析失败: %s", record['path'])
+                if (ok + failed) % PROGRESS_INTERVAL == 0:
+                    logger.info("已完成 %d/%d 份文档", ok + failed, len(paths), extra={
+                        'docs_per_sec': round((ok + failed) / (time.perf_counter() - started), 2)
+                    })
+    return ok, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='批量分析PDF中的二维码，结果以JSONL格式输出')
+    parser.add_argument('inputs', nargs='+', help='PDF文件、目录（递归查找）或通配符（如 "data/**/*.pdf"）')
+    parser.add_argument('-o', '--output', required=True, help='输出的JSONL文件，每份文档一行')
+    parser.add_argument('--checkpoint', help='检查点文件，默认为 输出文件.checkpoint')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='工作进程数（默认等于CPU核数），每个进程一次分析一份文档')
+    parser.add_argument('--pages', help='只检测指定页面，如 "1-3,10"（1基，"5-" 表示第5页到最后一页）')
+    parser.add_argument('--decoder', help='二维码解码器配置，同 QR_DECODER 环境变量')
+    parser.add_argument('--mode', choices=('full', 'adaptive'), help='二维码检测模式，同 QR_DETECTION_MODE')
+    parser.add_argument('--no-triage', action='store_true', help='关闭页面预判，所有页面都渲染检测，同 QR_PAGE_TRIAGE=0')
+    parser.add_argument('--code-cache', choices=CODE_CACHE_MODES,
+                        help='重复二维码的结果缓存范围，同 QR_CODE_CACHE（shared 在同一进程分析的文档间复用）')
+    parser.add_argument('--no-fetch', action='store_true', help='不抓取微信文章，只记录检测到的链接')
+    parser.add_argument('--fields', help='微信文章结果中保留的字段，如 "title,publish_time,account_name"（默认全部字段）')
+    parser.add_argument('--cache', help='微信文章缓存（SQLite）文件路径，各进程共用，重复出现的文章只抓取一次')
+    parser.add_argument('--restart', action='store_true', help='忽略已有的检查点，清空输出文件重新开始')
+    parser.add_argument('--retry-errors', action='store_true',
+                        help='续跑时重新分析之前失败的文档（新记录追加在输出文件末尾，以最后一条为准）')
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    try:
+        if args.pages:
+            parse_page_ranges(args.pages)
+        parse_fields(args.fields)
+    except ValueError as e:
+        parser.error(str(e))
+
+    checkpoint_path = args.checkpoint or args.output + '.checkpoint'
+    if args.restart:
+        for path in (args.output, checkpoint_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    try:
+        completed = load_checkpoint(checkpoint_path, args.output, args.retry_errors)
+    except ValueError as e:
+        parser.error(str(e))
+    paths = find_pdfs(args.inputs)
+    remaining = [path for path in paths if path not in completed]
+    logger.info("共 %d 份PDF，已完成 %d 份，待处理 %d 份", len(paths), len(paths) - len(remaining), len(remaining))
+    if not remaining:
+        return 0
+
+    options = {
+        'pages': args.pages,
+        'decoder': args.decoder,
+        'detection_mode': args.mode,
+        'page_triage': False if args.no_triage else None,
+        'code_cache': args.code_cache,
+        'article_fetch': not args.no_fetch,
+        'article_fields': args.fields
+    }
+    started = time.perf_counter()
+    try:
+        ok, failed = run(remaining, args.output, checkpoint_path, max(1, args.workers), options, args.cache)
+    except KeyboardInterrupt:
+        logger.warning("已中断，重新运行相同的命令即可从检查点继续")
+        return 130
+    logger.info("处理完成：成功 %d 份，失败 %d 份，耗时 %.1f 秒", ok, failed, time.perf_counter() - started)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    # brotli 为可选依赖，未安装时只使用 gzip
+    brotli = None
+
+# 需要压缩的响应类型（PDF、图片等已压缩的内容不再压缩）
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/javascript',
+    'text/html',
+    'text/css',
+    'text/plain'
+}
+# 小于该大小（字节）的响应不压缩，压缩收益抵不上开销
+DEFAULT_MIN_SIZE = 1024
+# 压缩级别：兼顾压缩率和CPU耗时
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def parse_accept_encoding(header):
+    """解析 Accept-Encoding 请求头，返回 {编码: q值}"""
+    encodings = {}
+    for item in (header or '').split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        encodings[name] = quality
+    return encodings
+
+
+def choose_encoding(accept_encoding):
+    """按客户端支持的编码选择压缩方式：优先 brotli（已安装时），其次 gzip，都不支持时返回 None"""
+    encodings = parse_accept_encoding(accept_encoding)
+    candidates = ('br', 'gzip') if brotli is not None else ('gzip',)
+    for encoding in candidates:
+        # 未列出的编码按 * 的q值处理
+        quality = encodings[encoding] if encoding in encodings else encodings.get('*', 0.0)
+        if quality > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def compress_response(response, accept_encoding, min_size=DEFAULT_MIN_SIZE):
+    """按 Accept-Encoding 压缩 Flask 响应，返回 (编码, 原始大小, 压缩后大小)，未压缩时返回 None
+
+    流式响应（NDJSON、事件流）和文件响应原样返回：压缩需要缓冲完整内容，会破坏逐步输出。
+    """
+    if (response.direct_passthrough or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers
+            or not 200 <= response.status_code < 300 or response.status_code == 204):
+        return None
+
+    # 同一URL的响应随 Accept-Encoding 不同，缓存代理需要区分
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return None
+    data = response.get_data()
+    if len(data) < min_size:
+        return None
+
+    compressed = compress(data, encoding)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return encoding, len(data), len(compressed)
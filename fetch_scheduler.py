@@ -0,0 +1,251 @@
+import logging
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# 每个主机的默认请求速率（次/秒）和突发容量
+DEFAULT_RATE_LIMIT = 10.0
+DEFAULT_RATE_BURST = 10
+# 收到429后速率减半，最低降到配置速率的该比例；之后每次成功恢复配置速率的该比例
+MIN_RATE_FRACTION = 0.1
+RATE_RECOVERY_STEP = 0.1
+# 单次请求超时（秒）
+DEFAULT_TIMEOUT = 5.0
+# 429和5xx响应、连接错误的重试次数，以及指数退避的基准间隔（秒）
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.5
+# 连续失败多少次后暂停向该主机发请求，以及暂停多久（秒）后放行一个试探请求
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_COOLDOWN = 30.0
+# 默认的连接池大小（每个主机），与文章抓取线程数一致
+DEFAULT_POOL_SIZE = 8
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# 进程内共用的抓取调度器，所有分析器和任务共享速率限制、熔断状态和连接池
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+class BudgetExhausted(Exception):
+    """本次分析的抓取时间预算已用完"""
+
+
+class CircuitOpenError(Exception):
+    """主机连续失败，暂停抓取"""
+
+    def __init__(self, host):
+        super().__init__(f'主机 {host} 连续请求失败，暂停抓取')
+        self.host = host
+
+
+class TokenBucket:
+    """令牌桶限速：平均速率 rate 次/秒，最多积累 burst 个令牌
+
+    收到429时调用 slow_down() 降低速率，请求成功时调用 recover() 逐步恢复。
+    """
+
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        """取得一个令牌，必要时等待；在 deadline（time.monotonic 时间）之前取不到时返回 False"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def slow_down(self):
+        with self._lock:
+            self.rate = max(self.max_rate * MIN_RATE_FRACTION, self.rate / 2)
+
+    def recover(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * RATE_RECOVERY_STEP)
+
+
+class CircuitBreaker:
+    """熔断器：连续失败 threshold 次后打开，cooldown 秒后只放行一个试探请求，成功则关闭"""
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.threshold:
+                if self.opened_at is None or self.probing:
+                    logger.warning("连续请求失败 %d 次，暂停抓取 %.0f 秒", self.failures, self.cooldown)
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+
+class FetchScheduler:
+    """文章抓取调度：按主机限速和熔断，对429和5xx响应按指数退避重试，并遵守调用方的截止时间"""
+
+    def __init__(self, rate=DEFAULT_RATE_LIMIT, burst=DEFAULT_RATE_BURST, timeout=DEFAULT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, breaker_threshold=DEFAULT_BREAKER_THRESHOLD,
+                 breaker_cooldown=DEFAULT_BREAKER_COOLDOWN, pool_size=DEFAULT_POOL_SIZE):
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        # 连接池与并发抓取线程数一致，避免连接被反复建立和丢弃
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._buckets = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def _host_state(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+                self._breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+            return bucket, self._breakers[host]
+
+    def get(self, url, deadline=None, timings=None, stream=False):
+        """发送GET请求并返回响应
+
+        deadline 为 time.monotonic 时间，到期前无法完成时抛出 BudgetExhausted；
+        主机处于熔断状态时抛出 CircuitOpenError；其他失败抛出 requests 的异常。
+        timings（instrumentation.Timings）用于记录重试次数。
+        stream 为 True 时只读取响应头，响应体由调用方读取，读完或不再需要时须关闭响应。
+        """
+        host = urlparse(url).netloc.lower()
+        bucket, breaker = self._host_state(host)
+
+        for attempt in range(self.retries + 1):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise BudgetExhausted()
+            if not bucket.acquire(deadline):
+                raise BudgetExhausted()
+            timeout = self.timeout
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    raise BudgetExhausted()
+            # 放行后一定会发出请求，熔断器的试探状态由请求结果结束
+            if not breaker.allow():
+                raise CircuitOpenError(host)
+
+            retry_after = None
+            try:
+                response = self.session.get(url, timeout=timeout, stream=stream)
+            except requests.RequestException as e:
+                breaker.record_failure()
+                error = e
+            except BaseException:
+                # 其他异常（如中断）也要结束试探状态，否则该主机会一直被拒绝
+                breaker.record_failure()
+                raise
+            else:
+                if response.status_code != 429 and response.status_code < 500:
+                    # 其他4xx说明主机正常，不计入熔断
+                    breaker.record_success()
+                    bucket.recover()
+                    if not response.ok:
+                        response.close()
+                    response.raise_for_status()
+                    return response
+                breaker.record_failure()
+                if response.status_code == 429:
+                    bucket.slow_down()
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                error = requests.HTTPError(f'{response.status_code} Server Error for url: {url}', response=response)
+                response.close()
+
+            if attempt == self.retries:
+                raise error
+            # 指数退避加随机抖动，429带有 Retry-After 时以其为准
+            delay = retry_after if retry_after is not None else self.backoff * 2 ** attempt * (0.5 + random.random())
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise BudgetExhausted()
+            if timings is not None:
+                timings.inc('fetch_retries')
+            logger.debug("请求失败，%.2f 秒后重试: %s, 错误: %s", delay, url, error)
+            time.sleep(delay)
+
+    def stats(self):
+        """各主机的当前速率和熔断状态"""
+        with self._lock:
+            return {host: {'rate': round(self._buckets[host].rate, 3), 'circuit_open': self._breakers[host].is_open}
+                    for host in self._buckets}
+
+
+def parse_retry_after(value):
+    """解析以秒为单位的 Retry-After，无法解析时返回 None"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def get_fetch_scheduler():
+    """获取（必要时创建）进程内共用的抓取调度器，配置读取环境变量"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FetchScheduler(
+                rate=float(os.environ.get('ARTICLE_RATE_LIMIT', DEFAULT_RATE_LIMIT)),
+                burst=int(os.environ.get('ARTICLE_RATE_BURST', DEFAULT_RATE_BURST)),
+                timeout=float(os.environ.get('ARTICLE_FETCH_TIMEOUT', DEFAULT_TIMEOUT)),
+                retries=int(os.environ.get('ARTICLE_FETCH_RETRIES', DEFAULT_RETRIES)),
+                breaker_threshold=int(os.environ.get('ARTICLE_BREAKER_THRESHOLD', DEFAULT_BREAKER_THRESHOLD)),
+                breaker_cooldown=float(os.environ.get('ARTICLE_BREAKER_COOLDOWN', DEFAULT_BREAKER_COOLDOWN)),
+                pool_size=int(os.environ.get('ARTICLE_FETCH_WORKERS', 0)) or DEFAULT_POOL_SIZE
+            )
+        return _scheduler
@@ -1,11 +1,53 @@
 # Gunicorn configuration file
+import math
+import os
+import threading
+
+
+def available_cpus():
+    """容器实际可用的CPU数：考虑CPU亲和性和 cgroup 配额（os.cpu_count() 返回的是宿主机的核数）"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = None
+    try:
+        # cgroup v2: "配额 周期" 或 "max 周期"
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            limit, period = f.read().split()
+        if limit != 'max':
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: 配额为 -1 表示不限制
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                limit = int(f.read())
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+cpus = available_cpus()
 
 # Server socket
-bind = "0.0.0.0:5000"
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
 
 # Worker processes
+# 任务状态（JobManager 中的任务、事件和保留的上传文件）保存在进程内存中，因此只使用一个长期运行的进程，
+# 并且不按请求数重启（见下方 max_requests）；用线程处理并发请求和事件流，
+# 页面渲染和二维码检测由分析器的进程池并行执行
 workers = 1
-worker_class = "sync"
+worker_class = "gthread"
+# 请求线程大多在等待上传、事件流和文章抓取，按CPU数适当多开；可用 GUNICORN_THREADS 指定
+threads = int(os.environ.get('GUNICORN_THREADS', 0)) or min(32, cpus * 4 + 4)
+# 分析器的页面处理进程数默认等于CPU核数，按容器的CPU配额设置，避免在只有一两个核的实例上开过多进程
+os.environ.setdefault('PDF_ANALYZER_WORKERS', str(cpus))
 
 # Timeout settings
 timeout = 300  # 增加到300秒（5分钟）以处理大文件和多个二维码
@@ -23,8 +65,21 @@ proc_name = "pdf-analysis"
 worker_connections = 1000
 
 # Max requests per worker
-max_requests = 1000
-max_requests_jitter = 50
+# 不按请求数重启工作进程：前端每秒轮询 /jobs/<id>，事件流重连也计为请求，重启会中断执行中的分析，
+# 之后查询任务返回404
+max_requests = 0
 
 # Preload app
-preload_app = True
\ No newline at end of file
+# 主进程只导入轻量模块（分析模块延迟导入），端口很快开始监听
+preload_app = True
+
+
+def post_worker_init(worker):
+    """工作进程启动后在后台线程中预热（导入分析模块、初始化解码器和连接池），不阻塞请求处理
+
+    设置 WARM_UP=0 可关闭，此时由第一个分析请求承担这些开销。
+    """
+    if os.environ.get('WARM_UP', '1').lower() in ('0', 'false', 'no', 'off'):
+        return
+    from app import warm_up
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 指标名前缀
+METRIC_PREFIX = 'pdf_analysis'
+# 分析过程的各个阶段：打开文档、页面预判、渲染页面/解码图片、识别二维码、抓取文章、解析文章
+STAGES = ('open', 'triage', 'render', 'decode', 'fetch', 'parse')
+
+# 计数器说明（未列出的计数器也可以使用，只是没有 HELP 行）
+COUNTER_HELP = {
+    'documents': '已分析的PDF文档数',
+    'pages': '已处理的页面数',
+    'pages_skipped': '预判为不可能包含二维码而跳过的页面数',
+    'pages_image_only': '预判为只需解码嵌入图片（不渲染整页）的页面数',
+    'qr_codes': '识别出的二维码数',
+    'qr_cache_hits': '二维码结果缓存命中次数（重复的图片或区域不再解码）',
+    'qr_cache_misses': '二维码结果缓存未命中次数',
+    'articles_fetched': '实际发起抓取的微信文章数',
+    'article_bytes': '下载的微信文章页面字节数（解压后）',
+    'articles_stopped_early': '所需字段找到后提前停止下载的微信文章数',
+    'fetch_errors': '抓取或解析失败的微信文章数',
+    'fetch_retries': '文章抓取的重试次数（429、5xx和连接错误）',
+    'fetch_skipped': '超出抓取时间预算而跳过的微信文章数',
+    'fetch_rejected': '因主机熔断而未抓取的微信文章数',
+    'article_cache_hits': '文章缓存命中次数',
+    'article_cache_misses': '文章缓存未命中次数',
+    'result_cache_hits': '结果缓存命中次数',
+    'result_cache_misses': '结果缓存未命中次数',
+    'http_requests': 'HTTP请求数',
+    'response_bytes_uncompressed': '已压缩响应的原始字节数',
+    'response_bytes_compressed': '已压缩响应压缩后的字节数',
+}
+
+# LogRecord 的标准属性，其余属性视为调用方通过 extra 传入的结构化字段
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """每条日志输出为一行JSON，extra 传入的字段原样保留"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'process': record.process,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class KeyValueFormatter(logging.Formatter):
+    """文本日志，extra 传入的字段以 key=value 形式附在消息后面"""
+
+    def format(self, record):
+        line = super().format(record)
+        fields = [f'{key}={value}' for key, value in vars(record).items()
+                  if key not in _RECORD_ATTRS and not key.startswith('_')]
+        if fields:
+            head, sep, tail = line.partition('\n')
+            line = f"{head} {' '.join(fields)}{sep}{tail}"
+        return line
+
+
+def configure_logging(level=None, fmt=None):
+    """配置根日志：级别取 LOG_LEVEL（默认 INFO），格式取 LOG_FORMAT（text 或 json）"""
+    level = (level or os.environ.get('LOG_LEVEL') or 'INFO').upper()
+    fmt = (fmt or os.environ.get('LOG_FORMAT') or 'text').lower()
+
+    handler = logging.StreamHandler()
+    if fmt == 'json':
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(KeyValueFormatter('%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s'))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+
+
+class MetricsRegistry:
+    """进程内的计数器和阶段耗时汇总，可输出 Prometheus 文本格式"""
+
+    def __init__(self, prefix=METRIC_PREFIX):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._summaries = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, count=1, **labels):
+        """累计耗时，count 为本次汇入的调用次数（合并子进程数据时大于1）"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            total = self._summaries.setdefault(key, [0.0, 0])
+            total[0] += seconds
+            total[1] += count
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            summaries = sorted(self._summaries.items())
+
+        lines = []
+        seen = set()
+        for (name, labels), value in counters:
+            metric = f'{self.prefix}_{name}_total'
+            if metric not in seen:
+                seen.add(metric)
+                if name in COUNTER_HELP:
+                    lines.append(f'# HELP {metric} {COUNTER_HELP[name]}')
+                lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{format_labels(labels)} {value}')
+        for (name, labels), (seconds, count) in summaries:
+            metric = f'{self.prefix}_{name}_seconds'
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f'# TYPE {metric} summary')
+            lines.append(f'{metric}_sum{format_labels(labels)} {seconds:.6f}')
+            lines.append(f'{metric}_count{format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    if isinstance(labels, dict):
+        labels = sorted(labels.items())
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def format_gauges(name, samples, help_text=None, prefix=METRIC_PREFIX):
+    """把 [(labels, value), ...] 格式化为 Prometheus gauge"""
+    metric = f'{prefix}_{name}'
+    lines = []
+    if help_text:
+        lines.append(f'# HELP {metric} {help_text}')
+    lines.append(f'# TYPE {metric} gauge')
+    lines.extend(f'{metric}{format_labels(labels)} {value}' for labels, value in samples)
+    return '\n'.join(lines) + '\n'
+
+
+# 进程级的全局指标
+metrics = MetricsRegistry()
+
+
+class Timings:
+    """单次分析的各阶段耗时和计数，同时汇总到进程级的 metrics
+
+    线程安全，文章抓取线程可以共用同一个实例；子进程的数据通过 to_dict()/merge() 带回主进程。
+    """
+
+    def __init__(self, registry=metrics):
+        self.registry = registry
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def span(self, stage):
+        """统计 with 代码块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def add(self, stage, seconds, count=1):
+        with self._lock:
+            total = self._stages.setdefault(stage, [0.0, 0])
+            total[0] += seconds
+            total[1] += count
+        if self.registry is not None:
+            self.registry.observe('stage', seconds, count, stage=stage)
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+        if self.registry is not None:
+            self.registry.inc(name, amount)
+
+    def merge(self, data):
+        """合并 to_dict() 的输出（如子进程返回的页面处理耗时）"""
+        for stage, value in data.get('stages', {}).items():
+            self.add(stage, value['seconds'], value['count'])
+        for name, amount in data.get('counters', {}).items():
+            self.inc(name, amount)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'elapsed_seconds': round(time.perf_counter() - self._started, 4),
+                'stages': {stage: {'seconds': round(seconds, 4), 'count': count}
+                           for stage, (seconds, count) in self._stages.items()},
+                'counters': dict(self._counters)
+            }
@@ -0,0 +1,241 @@
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# 流式任务缓冲区中最多暂存的事件数，超出后分析线程等待客户端读取
+STREAM_BUFFER_SIZE = 256
+
+
+class QueueFullError(Exception):
+    """任务队列已满"""
+
+
+class JobCancelled(Exception):
+    """流式任务的客户端已断开"""
+
+
+class Job:
+    """后台分析任务，记录状态、进度、部分结果和事件流"""
+
+    def __init__(self, filename):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = 'queued'
+        self.created_at = datetime.now().isoformat()
+        self.finished_at = None
+        self.total_pages = None
+        self.pages_done = 0
+        self.articles_done = 0
+        self.articles_total = 0
+        self.pages = []
+        self.articles = []
+        self.results = None
+        self.error = None
+        self.events = []
+        self._finished_ts = None
+        self._condition = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed')
+
+    def add_event(self, event, data):
+        """记录事件并唤醒等待中的事件流"""
+        with self._condition:
+            if event == 'start':
+                self.total_pages = data['total_pages']
+            elif event == 'page':
+                self.pages_done += 1
+                self.pages.append(data)
+            elif event == 'article':
+                self.articles_done = data['done']
+                self.articles_total = data['total']
+                self.articles.append(data)
+            elif event == 'status':
+                self.status = data['status']
+            self.events.append((event, data))
+            self._condition.notify_all()
+
+    def finish(self, results=None, error=None):
+        """标记任务结束"""
+        with self._condition:
+            self.results = results
+            self.error = error
+            self.status = 'failed' if error else 'completed'
+            self.finished_at = datetime.now().isoformat()
+            self._finished_ts = time.time()
+            if error:
+                self.events.append(('failed', {'error': error}))
+            else:
+                self.events.append(('completed', {'results': results}))
+            self._condition.notify_all()
+
+    def wait_for_events(self, start, timeout):
+        """等待 start 之后的新事件，返回 (新事件列表, 是否已结束)"""
+        with self._condition:
+            if len(self.events) <= start and not self.finished:
+                self._condition.wait(timeout)
+            return self.events[start:], self.finished
+
+    def to_dict(self):
+        with self._condition:
+            data = {
+                'job_id': self.id,
+                'filename': self.filename,
+                'status': self.status,
+                'created_at': self.created_at,
+                'finished_at': self.finished_at,
+                'progress': {
+                    'total_pages': self.total_pages,
+                    'pages_done': self.pages_done,
+                    'articles_total': self.articles_total,
+                    'articles_done': self.articles_done
+                },
+                'partial_results': {
+                    'pages': list(self.pages),
+                    'articles': list(self.articles)
+                }
+            }
+            if self.results is not None:
+                data['results'] = self.results
+            if self.error:
+                data['error'] = self.error
+            return data
+
+
+class StreamJob:
+    """流式分析任务：事件只在有界缓冲区中暂存，由响应取走后即丢弃，不保留事件和结果
+
+    缓冲区满时分析线程等待客户端读取；客户端断开（cancel）后，分析线程在产生下一个事件时抛出 JobCancelled。
+    """
+
+    def __init__(self, filename, max_buffered=STREAM_BUFFER_SIZE):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = 'queued'
+        self.max_buffered = max_buffered
+        self._buffer = deque()
+        self._cancelled = False
+        self._condition = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed')
+
+    def add_event(self, event, data):
+        """暂存事件，缓冲区满时等待客户端读取"""
+        with self._condition:
+            if event == 'status':
+                self.status = data['status']
+            while len(self._buffer) >= self.max_buffered and not self._cancelled:
+                self._condition.wait()
+            if self._cancelled:
+                raise JobCancelled('客户端已断开')
+            self._buffer.append((event, data))
+            self._condition.notify_all()
+
+    def finish(self, results=None, error=None):
+        """标记任务结束（结果已通过事件发送，不再保留）"""
+        with self._condition:
+            self.status = 'failed' if error else 'completed'
+            if error and not self._cancelled:
+                self._buffer.append(('failed', {'error': error}))
+            self._condition.notify_all()
+
+    def take_events(self, timeout):
+        """等待并取走缓冲区中的事件，返回 (事件列表, 是否已结束且没有剩余事件)"""
+        with self._condition:
+            if not self._buffer and not self.finished:
+                self._condition.wait(timeout)
+            events = list(self._buffer)
+            self._buffer.clear()
+            self._condition.notify_all()
+            return events, self.finished and not self._buffer
+
+    def cancel(self):
+        """客户端断开：丢弃缓冲的事件并让分析线程停止"""
+        with self._condition:
+            self._cancelled = True
+            self._buffer.clear()
+            self._condition.notify_all()
+
+
+class JobManager:
+    """有界的后台任务执行器：固定数量的工作线程加上长度受限的等待队列"""
+
+    def __init__(self, max_workers=2, max_queued=20, job_ttl=3600):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.job_ttl = job_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, filename, func, *args, cleanup=None, stream=False, **kwargs):
+        """提交任务。func 的 progress_callback 参数会接收进度事件，返回值作为结果
+
+        cleanup 在任务结束后（无论成功与否）调用，用于删除临时文件等。
+        stream 为 True 时创建 StreamJob：与普通任务共用队列和并发上限，但不登记、不能通过 get 查询，
+        事件由调用方取走后即丢弃。
+        """
+        with self._lock:
+            self._purge_expired()
+            if self._pending >= self.max_workers + self.max_queued:
+                raise QueueFullError('任务队列已满，请稍后再试')
+            if stream:
+                job = StreamJob(filename)
+            else:
+                job = Job(filename)
+                self._jobs[job.id] = job
+            self._pending += 1
+
+        self._executor.submit(self._run, job, func, args, kwargs, cleanup)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            statuses = {}
+            for job in self._jobs.values():
+                statuses[job.status] = statuses.get(job.status, 0) + 1
+            return {'pending': self._pending, 'jobs': statuses}
+
+    def _run(self, job, func, args, kwargs, cleanup):
+        try:
+            job.add_event('status', {'status': 'running'})
+            results = func(*args, progress_callback=job.add_event, **kwargs)
+            job.finish(results=results)
+        except JobCancelled:
+            logger.info("任务 %s 已取消：客户端已断开", job.id)
+            job.finish(error='客户端已断开')
+        except Exception as e:
+            logger.exception("任务 %s 执行失败", job.id)
+            job.finish(error=f'处理文件时发生错误: {str(e)}')
+        finally:
+            with self._lock:
+                self._pending -= 1
+            if cleanup is not None:
+                try:
+                    cleanup()
+                except Exception as cleanup_error:
+                    logger.warning("任务清理失败: %s", cleanup_error)
+
+    def _purge_expired(self):
+        """清理已结束且超过保留时间的任务（调用方需持有锁）"""
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job._finished_ts is not None and now - job._finished_ts > self.job_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
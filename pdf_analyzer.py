@@ -1,151 +1,1415 @@
-import PyPDF2
 import cv2
 import numpy as np
-from PIL import Image
 import fitz  # PyMuPDF
-import requests
-from bs4 import BeautifulSoup
+from article_extractor import (ARTICLE_FIELDS, STREAM_CHUNK_SIZE, ArticleExtractor, can_stream, parse_fields,
+                               project_fields)
+from fetch_scheduler import BudgetExhausted, CircuitOpenError, get_fetch_scheduler
+from instrumentation import Timings, configure_logging
+from qr_decoders import (DEFAULT_DECODER, QRCodeCache, content_digest, get_decoder, get_shared_code_cache,
+                         region_digest)
 import re
-import json
-from urllib.parse import urlparse, parse_qs
+import logging
 import time
 from datetime import datetime
-import io
+from collections import OrderedDict
 import os
-import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# 页面渲染缩放倍数
+RENDER_ZOOM = 1.5
+# 页数少于该值时直接串行处理，避免进程调度开销
+PARALLEL_MIN_PAGES = 4
+# 进程池不可用时的异常（子进程崩溃；无法启动子进程，如嵌入到没有 __main__ 保护的程序中时 spawn 抛出的
+# RuntimeError），出现时回退到串行处理尚未完成的页面
+POOL_ERRORS = (BrokenProcessPool, OSError, RuntimeError)
+# 默认的微信文章并发抓取线程数
+DEFAULT_FETCH_WORKERS = 8
+# 默认的单次分析文章抓取时间预算（秒），低于 gunicorn 的超时时间
+DEFAULT_FETCH_BUDGET = 240
+# 超出时间预算而未抓取的文章的错误信息
+BUDGET_EXHAUSTED_ERROR = 'skipped: budget exhausted'
+# 检测模式：full 为整页固定倍数渲染；adaptive 为先低分辨率定位、再对候选区域高分辨率渲染
+DETECTION_MODES = ('full', 'adaptive')
+# adaptive 模式的默认分辨率档位（DPI），第一档用于整页定位，其余依次用于候选区域解码
+DEFAULT_DPI_TIERS = (96, 216, 300)
+# 低分辨率定位时的最大补充定位轮数
+LOCATE_ROUNDS = 4
+# 候选区域向外扩展的比例，保证二维码静区完整
+REGION_PADDING = 0.2
+# 候选区域重新渲染后的最大边长（像素）
+REGION_MAX_SIDE = 600
+# 嵌入图片短边小于该值时不可能包含可识别的二维码（版本1二维码为21个模块）
+MIN_IMAGE_SIDE = 21
+# 嵌入图片解码前四周补充的白边（像素），弥补图片本身缺少的二维码静区
+IMAGE_QUIET_ZONE = 16
+# 页面预判：显示尺寸短边小于该值（pt）的图片按默认缩放渲染后无法识别二维码
+TRIAGE_MIN_QR_SIDE = 18
+# 页面预判：矢量路径元素（线段、矩形、曲线）少于该数量时不可能构成矢量二维码
+TRIAGE_MIN_DRAWING_ITEMS = 24
+# 页面预判：图片区域的总面积超过页面面积的该比例时直接渲染整页
+TRIAGE_MAX_REGION_FRACTION = 0.5
+# 重复二维码的缓存范围：document 在单个文档内复用（并行处理时在每个子进程内按文档复用），
+# shared 在同一进程处理的所有文档间复用，off 不缓存
+CODE_CACHE_MODES = ('document', 'shared', 'off')
+# PDF对象中的间接引用（如 "9 0 R"）及计算图片内容哈希时展开引用的最大层数
+OBJECT_REFERENCE = re.compile(r'\b(\d+) (\d+) R\b')
+OBJECT_REFERENCE_DEPTH = 3
+# 页面预判结果：skip 不渲染也不解码；images 只处理图片区域（先解码嵌入图片，未找到时只渲染图片所在区域）；
+# render 按原流程处理（必要时渲染整页）
+TRIAGE_DECISIONS = ('skip', 'images', 'render')
+
+# 进程池在同一进程内的多次分析之间复用，避免重复启动子进程
+_process_pool = None
+_process_pool_workers = 0
+_process_pool_lock = threading.Lock()
+
+# 子进程内复用的分析器实例，按页面检测配置区分
+_worker_analyzers = {}
+
+# 子进程内按文档保留的检测状态（已解码的嵌入图片和 document 范围的二维码缓存），同一文档的各个区间共用，
+# 按最近使用保留的文档数
+WORKER_DOCUMENT_STATES = 8
+_worker_document_states = OrderedDict()
+
+# 每个线程复用一个二维码检测器
+_detector_local = threading.local()
+
+
+def _get_process_pool(workers):
+    """获取（必要时创建）共享进程池
+
+    进程池只在第一次使用时按 workers 创建，之后一直复用（页数较少的文档只是提交较少的区间）：
+    重新创建需要在新的子进程中再次导入 cv2、fitz 等模块，且其他请求可能仍在使用旧的进程池。
+    """
+    global _process_pool, _process_pool_workers
+    with _process_pool_lock:
+        if _process_pool is None:
+            # 使用 spawn 启动子进程，避免在多线程的 Web 进程中 fork 导致死锁
+            _process_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_pool_worker
+            )
+            _process_pool_workers = workers
+        return _process_pool
+
+
+def _init_pool_worker():
+    """进程池子进程的初始化：配置日志并预热，子进程处理第一个页面区间时不再有导入和初始化的开销"""
+    configure_logging()
+    try:
+        warm_up()
+    except Exception as e:
+        # 初始化函数出错会使整个进程池不可用，预热失败时只记录日志
+        logger.warning("子进程预热失败: %s", e)
+
+
+def _noop():
+    pass
+
+
+def warm_up_process_pool(workers):
+    """创建共享进程池并等待全部子进程启动完成，workers 不大于1（串行处理）时不创建"""
+    if workers <= 1:
+        return
+    pool = _get_process_pool(workers)
+    # 子进程按需启动：同时提交 workers 个任务，在没有空闲子进程时会启动全部子进程
+    for future in [pool.submit(_noop) for _ in range(workers)]:
+        future.result()
+
+
+def _shutdown_process_pool(wait=False):
+    """关闭共享进程池，下次使用时重新创建"""
+    global _process_pool, _process_pool_workers
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=wait)
+        _process_pool = None
+        _process_pool_workers = 0
+
+
+def open_pdf(source):
+    """打开PDF：source 为文件路径，或内存中的PDF数据（bytes / memoryview，不会被复制）"""
+    if isinstance(source, (str, os.PathLike)):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype='pdf')
+
+
+def describe_source(source):
+    """用于日志的PDF来源描述"""
+    if isinstance(source, (str, os.PathLike)):
+        return str(source)
+    return f'<内存数据 {len(source)} 字节>'
+
+
+def document_key(source, content_hash=None):
+    """子进程中区分文档的键：优先使用文件内容的哈希，否则为文件路径、大小和修改时间，内存中的数据计算哈希"""
+    if content_hash:
+        return content_hash
+    if isinstance(source, (str, os.PathLike)):
+        stat = os.stat(source)
+        return os.path.abspath(source), stat.st_size, stat.st_mtime_ns
+    return content_digest(source)
+
+
+def scan_page_list(pdf_source, page_numbers, scan_options=None, doc_key=None):
+    """在子进程中打开文档并检测 page_numbers 中各页的二维码
+
+    doc_key（见 document_key）相同的区间共用按文档缓存的检测结果，为 None 时每个区间单独缓存。
+    返回 ([(page_num, qr_codes, metrics), ...], 耗时统计)，耗时统计由主进程合并。
+    """
+    scan_options = scan_options or {}
+    key = tuple(sorted(scan_options.items()))
+    analyzer = _worker_analyzers.get(key)
+    if analyzer is None:
+        analyzer = _worker_analyzers[key] = PDFAnalyzer(max_workers=1, **scan_options)
+    
+    analyzer.timings = Timings()
+    with analyzer.timings.span('open'):
+        pdf_document = open_pdf(pdf_source)
+    _restore_document_state(analyzer, key, doc_key)
+    try:
+        total_pages = len(pdf_document)
+        scanned = [(page_num, *analyzer.scan_page(pdf_document, page_num, total_pages))
+                   for page_num in page_numbers]
+        return scanned, analyzer.timings.to_dict()
+    finally:
+        pdf_document.close()
+
+
+def _restore_document_state(analyzer, options_key, doc_key):
+    """恢复子进程中该文档之前的区间留下的检测状态，没有时重新开始并保存"""
+    if doc_key is None:
+        analyzer.reset_document_state()
+        return
+    state_key = options_key, doc_key
+    state = _worker_document_states.pop(state_key, None)
+    if state is None:
+        analyzer.reset_document_state()
+        state = analyzer._image_codes, analyzer._code_cache
+    else:
+        analyzer._image_codes, analyzer._code_cache = state
+    _worker_document_states[state_key] = state
+    while len(_worker_document_states) > WORKER_DOCUMENT_STATES:
+        _worker_document_states.popitem(last=False)
+
+
+def get_qr_detector():
+    """返回当前线程复用的 cv2.QRCodeDetector（检测器不是线程安全的），用于定位候选区域"""
+    detector = getattr(_detector_local, 'qr_detector', None)
+    if detector is None:
+        detector = _detector_local.qr_detector = cv2.QRCodeDetector()
+    return detector
+
+
+def warm_up(decoder=None):
+    """初始化解码器以及 OpenCV、PyMuPDF 首次调用时的内部状态，供服务进程启动后预热"""
+    get_decoder(decoder).decode(np.full((64, 64), 255, dtype=np.uint8))
+    with fitz.open() as document:
+        document.new_page(width=72, height=72).get_pixmap(dpi=72, colorspace=fitz.csGRAY)
+
+
+def object_content(pdf_document, xref, depth=0):
+    """PDF对象的内容（对象字典和原始流数据），间接引用的对象（颜色空间、蒙版等）递归展开
+
+    每页单独嵌入的相同图片引用的颜色空间等对象编号不同，展开后内容一致，可以按内容判断是否重复。
+    """
+    parts = []
+    source = pdf_document.xref_object(xref, compressed=True)
+    position = 0
+    for match in OBJECT_REFERENCE.finditer(source):
+        parts.append(source[position:match.start()].encode())
+        if depth < OBJECT_REFERENCE_DEPTH:
+            parts.append(b'<')
+            parts.extend(object_content(pdf_document, int(match.group(1)), depth + 1))
+            parts.append(b'>')
+        else:
+            parts.append(match.group(0).encode())
+        position = match.end()
+    parts.append(source[position:].encode())
+    if pdf_document.xref_is_stream(xref):
+        parts.append(pdf_document.xref_stream_raw(xref) or b'')
+    return parts
+
+
+def pixmap_to_array(pix):
+    """以零拷贝方式把灰度 pixmap 包装为 numpy 数组
+
+    返回的数组直接引用 pix 的内存，调用方在使用数组期间必须保持 pix 存活。
+    """
+    samples = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+    image = samples.reshape(pix.height, pix.stride)[:, :pix.width * pix.n]
+    if pix.n > 1:
+        image = image.reshape(pix.height, pix.width, pix.n)
+    return image
+
+
+def parse_dpi_tiers(value):
+    """解析 "72,216,300" 形式的分辨率档位配置"""
+    if isinstance(value, str):
+        value = [item for item in value.replace(' ', '').split(',') if item]
+    tiers = tuple(int(item) for item in value)
+    if not tiers or any(dpi <= 0 for dpi in tiers):
+        raise ValueError(f'无效的分辨率档位: {value}')
+    return tiers
+
+
+def article_progress(url, article_info, done, total):
+    """文章抓取进度事件的数据"""
+    data = {'url': url, 'done': done, 'total': total}
+    if isinstance(article_info, Exception):
+        data['error'] = f'分析异常: {str(article_info)}'
+    elif article_info:
+        data['title'] = article_info.get('title')
+        if 'error' in article_info:
+            data['error'] = article_info['error']
+    return data
+
+
+def has_article_errors(results):
+    """结果中是否有抓取失败的文章（网络错误、主机熔断、超出时间预算等），这些链接下次需要重新抓取"""
+    return any('error' in item for item in results.get('other_qr_codes', []))
+
+
+def triage_summary(page_metrics):
+    """汇总逐页的预判结果和估算节省的时间，没有预判记录时返回 None
+
+    节省时间按本文档中渲染整页的平均耗时估算：未渲染的页面各节省 平均耗时 - 该页实际耗时。
+    """
+    triaged = [item for item in page_metrics if 'triage' in item]
+    if not triaged:
+        return None
+    pages = dict.fromkeys(TRIAGE_DECISIONS, 0)
+    for item in triaged:
+        pages[item['triage']] += 1
+    rendered = [item['scan_seconds'] for item in page_metrics if item.get('source') == 'render']
+    saved = None
+    if rendered:
+        average = sum(rendered) / len(rendered)
+        saved = round(sum(max(0.0, average - item['scan_seconds'])
+                          for item in triaged if item.get('source') != 'render'), 4)
+    return {
+        'pages': pages,
+        'triage_seconds': round(sum(item['triage_seconds'] for item in triaged), 4),
+        'estimated_seconds_saved': saved
+    }
+
+
+def parse_page_ranges(value):
+    """解析 "1-5,8,20-" 形式的页码范围（1基，含两端，省略结尾表示到最后一页）
+
+    返回 [(first, last), ...]，last 为 None 表示到最后一页。
+    """
+    ranges = []
+    for item in value.replace(' ', '').split(','):
+        if not item:
+            continue
+        first, sep, last = item.partition('-')
+        try:
+            first = int(first) if first else 1
+            last = (int(last) if last else None) if sep else first
+        except ValueError:
+            raise ValueError(f'无效的页码范围: {value}')
+        if first < 1 or (last is not None and last < first):
+            raise ValueError(f'无效的页码范围: {value}')
+        ranges.append((first, last))
+    if not ranges:
+        raise ValueError(f'无效的页码范围: {value}')
+    return ranges
+
+
+class ArticleFetcher:
+    """边检测边抓取微信文章：同一链接只抓取一次，抓取完成后为出现该链接的每一处生成结果"""
+
+    def __init__(self, analyzer, use_cache=True):
+        self.analyzer = analyzer
+        self.use_cache = use_cache
+        self.executor = ThreadPoolExecutor(max_workers=analyzer.resolve_fetch_workers(),
+                                           thread_name_prefix='fetch')
+        # 抓取中的链接 {future: url} 和等待结果的页码 {url: [page_num, ...]}
+        self.futures = {}
+        self.pending = {}
+        # 已完成的抓取结果 {url: article_info}，抓取异常时值为异常对象
+        self.articles = {}
+
+    def request(self, url, page_num):
+        """登记第 page_num 页出现的文章链接，已抓取过的链接直接返回结果事件"""
+        if url in self.articles:
+            return [self.analyzer._article_result(url, page_num, self.articles[url])]
+        self.prefetch(url)
+        self.pending[url].append(page_num)
+        return []
+
+    def prefetch(self, url):
+        """开始抓取文章（已抓取或抓取中的链接不会重复抓取），结果在 completed() 之后从 articles 读取"""
+        if url in self.articles or url in self.pending:
+            return
+        self.pending[url] = []
+        future = self.executor.submit(self.analyzer.analyze_wechat_article, url, self.use_cache)
+        self.futures[future] = url
+
+    def completed(self, wait=False):
+        """产生已完成抓取的进度事件和结果事件，wait 为 True 时等待全部抓取完成"""
+        if wait:
+            futures = as_completed(list(self.futures))
+        else:
+            futures = [future for future in list(self.futures) if future.done()]
+        for future in futures:
+            url = self.futures.pop(future)
+            try:
+                article_info = future.result()
+            except Exception as e:
+                article_info = e
+            self.articles[url] = article_info
+            done = len(self.articles)
+            yield 'article', article_progress(url, article_info, done, done + len(self.futures))
+            for page_num in self.pending.pop(url):
+                yield self.analyzer._article_result(url, page_num, article_info)
+
+    def shutdown(self):
+        """取消尚未开始的抓取（如客户端提前断开）"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ResultCollector:
+    """把 iter_analyze_pdf 的事件汇总为 analyze_pdf 的结果格式"""
 
-class PDFAnalyzer:
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        # 每页检测到的二维码 {page_num: qr_codes}，用于把结果按页码和二维码顺序排列
+        self.pages = {}
+        self.wechat_articles = []
+        self.other_qr_codes = []
+        self.summary = {}
+
+    def add(self, event, data):
+        if event == 'page':
+            self.pages[data['page_number'] - 1] = data['qr_codes']
+        elif event == 'wechat_article':
+            self.wechat_articles.append(data)
+        elif event == 'other_qr_code':
+            self.other_qr_codes.append(data)
+        elif event == 'complete':
+            self.summary = data
+
+    def _position(self, url, page_number):
+        qr_codes = self.pages.get(page_number - 1, [])
+        return page_number, qr_codes.index(url) if url in qr_codes else len(qr_codes)
+
+    def _aggregate(self, items, url_key):
+        """同一链接在多页出现时合并为一条结果：page_number 为首次出现的页码，pages 为出现的全部页码"""
+        merged = {}
+        for item in sorted(items, key=lambda item: self._position(item.get(url_key), item['page_number'])):
+            pages = item.get('pages') or [item['page_number']]
+            entry = merged.get(item.get(url_key))
+            if entry is None:
+                entry = merged[item.get(url_key)] = dict(item, pages=[])
+            entry['pages'].extend(page for page in pages if page not in entry['pages'])
+        for entry in merged.values():
+            entry['pages'].sort()
+        return list(merged.values())
+
+    def results(self):
+        results = {
+            'total_qr_codes': 0,
+            'wechat_articles': self._aggregate(self.wechat_articles, 'qr_url'),
+            'other_qr_codes': self._aggregate(self.other_qr_codes, 'url')
+        }
+        results.update(self.summary)
+        return results
+
+    def page_results(self):
+        """按页码排序的 [(page_num, qr_codes), ...]，即结果缓存中保存的页面检测结果"""
+        return sorted(self.pages.items())
+
+
+class BatchDocument:
+    """批量分析中的一份文档及其检测结果"""
+
+    def __init__(self, index, filename, source, content_hash=None):
+        self.index = index
+        self.filename = filename
+        self.source = source
+        self.content_hash = content_hash
+        self.total_pages = 0
+        # 已检测的页面 {page_num: qr_codes} 和逐页指标
+        self.pages = {}
+        self.page_metrics = []
+        # 命中结果缓存时的完整结果，无需再检测和抓取
+        self.results = None
+        self.error = None
+
+    def add_page(self, page_num, qr_codes, metrics):
+        self.pages[page_num] = qr_codes
+        if metrics is not None:
+            self.page_metrics.append(metrics)
+
+
+class PDFAnalyzer:
+    def __init__(self, max_workers=None, fetch_workers=None, article_cache=None, result_cache=None,
+                 progress_callback=None, detection_mode=None, dpi_tiers=None, scan_images=None,
+                 decoder=None, pages=None, article_fetch=True, fetch_scheduler=None, fetch_budget=None,
+                 article_fields=None, page_triage=None, code_cache=None, article_stream=None):
+        # 页面处理进程数：None 表示读取 PDF_ANALYZER_WORKERS 环境变量或使用CPU核数，1 表示串行
+        self.max_workers = max_workers
+        # 二维码检测模式和分辨率档位：None 表示读取 QR_DETECTION_MODE / QR_DPI_TIERS 环境变量
+        self.detection_mode = detection_mode or os.environ.get('QR_DETECTION_MODE', 'full')
+        if self.detection_mode not in DETECTION_MODES:
+            raise ValueError(f'未知的检测模式: {self.detection_mode}')
+        self.dpi_tiers = parse_dpi_tiers(dpi_tiers or os.environ.get('QR_DPI_TIERS') or DEFAULT_DPI_TIERS)
+        # 是否先直接解码页面中的嵌入图片：None 表示读取 QR_SCAN_EMBEDDED_IMAGES 环境变量（默认开启）
+        if scan_images is None:
+            scan_images = os.environ.get('QR_SCAN_EMBEDDED_IMAGES', '1').lower() not in ('0', 'false', 'no', 'off')
+        self.scan_images = scan_images
+        # 是否先根据页面结构预判，跳过不可能包含二维码的页面：None 表示读取 QR_PAGE_TRIAGE 环境变量（默认开启）
+        if page_triage is None:
+            page_triage = os.environ.get('QR_PAGE_TRIAGE', '1').lower() not in ('0', 'false', 'no', 'off')
+        self.page_triage = page_triage
+        # 重复二维码的缓存范围（见 CODE_CACHE_MODES）：None 表示读取 QR_CODE_CACHE 环境变量（默认 document）
+        self.code_cache_mode = code_cache or os.environ.get('QR_CODE_CACHE', 'document')
+        if self.code_cache_mode not in CODE_CACHE_MODES:
+            raise ValueError(f'未知的二维码缓存模式: {self.code_cache_mode}')
+        # 二维码解码后端配置（见 qr_decoders.get_decoder），None 表示读取 QR_DECODER 环境变量
+        self.decoder_spec = decoder or os.environ.get('QR_DECODER') or DEFAULT_DECODER
+        self.decoder = get_decoder(self.decoder_spec)
+        # 只检测指定的页面（如 "1-5,8"，见 parse_page_ranges），None 表示全部页面
+        self.page_ranges = parse_page_ranges(pages) if isinstance(pages, str) else pages
+        # 是否访问网络抓取微信文章，关闭时只记录文章链接
+        self.article_fetch = article_fetch
+        # 微信文章结果中保留的字段（如 "title,publish_time"，见 article_extractor.parse_fields），
+        # 未列出的字段不会提取；None 表示读取 ARTICLE_FIELDS 环境变量（默认全部字段）
+        if article_fields is None:
+            article_fields = os.environ.get('ARTICLE_FIELDS')
+        self.article_fields = parse_fields(article_fields)
+        # 是否边下载边解析文章，所需字段都找到后停止下载（只在 article_fields 的字段都能提前确定时生效，
+        # 见 article_extractor.can_stream）；None 表示读取 ARTICLE_STREAM 环境变量（默认开启）
+        if article_stream is None:
+            article_stream = os.environ.get('ARTICLE_STREAM', '1').lower() not in ('0', 'false', 'no', 'off')
+        self.article_stream = article_stream
+        # 最近一次页面扫描的逐页指标
+        self.page_metrics = []
+        # 最近一次分析的各阶段耗时和计数
+        self.timings = Timings()
+        # 当前文档中已解码的嵌入图片 {xref: qr_codes}，同一图片在多页出现时只解码一次
+        self._image_codes = {}
+        # 按图像内容哈希缓存的二维码结果（qr_decoders.QRCodeCache），内容相同的图片或区域只解码一次
+        self._code_cache = None
+        self.reset_document_state()
+        # 文章抓取线程数：None 表示读取 ARTICLE_FETCH_WORKERS 环境变量或使用默认值
+        self.fetch_workers = fetch_workers
+        # 文章解析结果缓存（如 cache.ArticleCache），None 表示不使用缓存
+        self.article_cache = article_cache
+        # 整份文件的分析结果缓存（如 cache.ResultCache），以文件内容哈希为键
+        self.result_cache = result_cache
+        # 进度回调 progress_callback(event, data)，event 为 start/page/article
+        self.progress_callback = progress_callback
+        self.article_extractor = ArticleExtractor()
+        # 文章抓取调度器（限速、重试、熔断），None 表示使用进程内共用的调度器
+        self.fetch_scheduler = fetch_scheduler
+        # 单次分析的文章抓取时间预算（秒）：None 表示读取 ARTICLE_FETCH_BUDGET 环境变量，0 表示不限制
+        if fetch_budget is None:
+            fetch_budget = float(os.environ.get('ARTICLE_FETCH_BUDGET', DEFAULT_FETCH_BUDGET))
+        self.fetch_budget = fetch_budget
+        # 本次分析的抓取截止时间（time.monotonic），超过后剩余的文章不再抓取
+        self.fetch_deadline = None
     
-    def analyze_pdf(self, pdf_path):
-        """分析PDF文件，提取二维码并分析微信文章"""
-        import sys
-        print(f"开始分析PDF文件: {pdf_path}", flush=True)
-        sys.stdout.flush()
+    def analyze_pdf(self, pdf_source, content_hash=None, refresh_articles=False):
+        """分析PDF文件，提取二维码并分析微信文章
         
-        results = {
+        iter_analyze_pdf 的包装：收集全部事件后返回完整结果，事件同时转发给 progress_callback。
+        pdf_source 为文件路径或内存中的PDF数据（见 open_pdf）。
+        content_hash 为文件内容的哈希值，配合 result_cache 使用：内容相同的文件直接返回缓存结果；
+        refresh_articles 为 True 时复用缓存的页面检测结果，仅重新抓取微信文章。
+        """
+        collector = ResultCollector()
+        for event, data in self.iter_analyze_pdf(pdf_source, content_hash, refresh_articles):
+            collector.add(event, data)
+            if event != 'complete':
+                self._report_progress(event, data)
+        return collector.results()
+    
+    def iter_analyze_pdf(self, pdf_source, content_hash=None, refresh_articles=False):
+        """逐步分析PDF，按完成顺序产生 (event, data) 事件
+        
+        - start: {'total_pages'}
+        - page: {'page_number', 'total_pages', 'qr_codes'}，并行处理时不保证页码顺序
+        - article: 文章抓取进度 {'url', 'done', 'total', 'title' 或 'error'}
+        - wechat_article / other_qr_code: 一条结果，与 analyze_pdf 结果列表中的条目相同
+        - complete: 汇总 {'total_qr_codes', 'analysis_time', 'page_metrics'}，可能带有 'cached' 或 'error'
+        
+        微信文章在检测到链接后立即开始抓取，与后续页面的检测同时进行。参数同 analyze_pdf。
+        """
+        logger.info("开始分析PDF文件: %s", describe_source(pdf_source))
+        self.timings = Timings()
+        self.timings.inc('documents')
+        self.start_fetch_budget()
+        
+        cached = self._get_cached_result(content_hash)
+        # 缓存的结果中有抓取失败的文章时只复用页面检测结果，重新抓取文章（成功的文章由文章缓存返回）
+        if cached is not None and not refresh_articles and not has_article_errors(cached['results']):
+            logger.info("命中结果缓存", extra={'content_hash': content_hash})
+            yield from self._replay_cached_result(cached)
+            return
+        
+        summary = {
             'total_qr_codes': 0,
-            'wechat_articles': [],
-            'other_qr_codes': [],
             'analysis_time': datetime.now().isoformat()
         }
+        # 需要写入结果缓存时才在内存中保留全部结果
+        collector = ResultCollector() if self._result_cache_enabled(content_hash) else None
+        
+        def emit(event, data):
+            if collector is not None:
+                collector.add(event, data)
+            return event, data
         
+        page_events = fetcher = None
         try:
-            # 使用PyMuPDF打开PDF文件
-            print("正在打开PDF文件...", flush=True)
-            pdf_document = fitz.open(pdf_path)
-            print(f"PDF打开成功，共 {len(pdf_document)} 页", flush=True)
+            if cached is not None:
+                # 复用缓存的页面检测结果，只重新抓取文章
+                logger.info("命中结果缓存，重新抓取文章", extra={'content_hash': content_hash})
+                page_events = self._replay_cached_pages(cached['pages'])
+                page_metrics = cached['results'].get('page_metrics', [])
+            else:
+                # 渲染页面并检测二维码（按完成顺序）
+                page_events = self.iter_scan_pages(pdf_source, content_hash)
+                page_metrics = []
             
-            total_pages = len(pdf_document)
-            for page_num in range(total_pages):
-                print(f"正在处理第 {page_num + 1}/{total_pages} 页...", flush=True)
-                sys.stdout.flush()
-                
-                try:
-                    # 获取页面
-                    page = pdf_document.load_page(page_num)
-                    
-                    # 将页面转换为图像
-                    mat = fitz.Matrix(1.5, 1.5)  # 降低缩放倍数以提高处理速度
-                    pix = page.get_pixmap(matrix=mat)
-                    img_data = pix.tobytes("ppm")
-                    
-                    # 转换为PIL Image
-                    image = Image.open(io.BytesIO(img_data))
-                    
-                    # 检测二维码
-                    qr_codes = self.detect_qr_codes(image)
-                    
-                except Exception as e:
-                    print(f"处理第 {page_num + 1} 页时出错: {str(e)}", flush=True)
+            # 微信文章按URL去重、并发抓取
+            fetcher = ArticleFetcher(self, use_cache=not refresh_articles)
+            total_pages = 0
+            for kind, value in page_events:
+                if kind == 'start':
+                    total_pages = value
+                    yield emit('start', {'total_pages': total_pages})
                     continue
                 
+                page_num, qr_codes, metrics = value
+                if metrics is not None:
+                    page_metrics.append(metrics)
+                yield emit('page', {
+                    'page_number': page_num + 1,
+                    'total_pages': total_pages,
+                    'qr_codes': qr_codes
+                })
+                
                 for qr_data in qr_codes:
-                    results['total_qr_codes'] += 1
-                    print(f"处理二维码: {qr_data}", flush=True)
-                    
+                    summary['total_qr_codes'] += 1
+                    logger.debug("处理二维码: %s", qr_data)
                     if self.is_wechat_article_url(qr_data):
-                        try:
-                            # 分析微信文章
-                            article_info = self.analyze_wechat_article(qr_data)
-                            if article_info and 'error' not in article_info:
-                                article_info['page_number'] = page_num + 1  # 转换为1基索引
-                                article_info['qr_url'] = qr_data
-                                results['wechat_articles'].append(article_info)
-                                print(f"成功分析微信文章: {article_info.get('title', '未知标题')}", flush=True)
-                            else:
-                                print(f"微信文章分析失败: {qr_data}", flush=True)
-                                results['other_qr_codes'].append({
-                                    'url': qr_data,
-                                    'page_number': page_num + 1,
-                                    'error': article_info.get('error', '分析失败') if article_info else '无响应'
-                                })
-                        except Exception as e:
-                            print(f"微信文章分析异常: {qr_data}, 错误: {str(e)}", flush=True)
-                            results['other_qr_codes'].append({
-                                'url': qr_data,
-                                'page_number': page_num + 1,
-                                'error': f'分析异常: {str(e)}'
-                            })
+                        for event in fetcher.request(qr_data, page_num):
+                            yield emit(*event)
                     else:
-                        results['other_qr_codes'].append({
+                        yield emit('other_qr_code', {
                             'url': qr_data,
                             'page_number': page_num + 1  # 转换为1基索引
                         })
+                
+                for event in fetcher.completed():
+                    yield emit(*event)
+            
+            for event in fetcher.completed(wait=True):
+                yield emit(*event)
+            
+            page_metrics.sort(key=lambda item: item['page_number'])
+            self.page_metrics = page_metrics
+            summary['page_metrics'] = page_metrics
+            page_triage = triage_summary(page_metrics)
+            if page_triage is not None:
+                summary['page_triage'] = page_triage
             
+        except Exception as e:
+            logger.exception("PDF分析错误: %s", describe_source(pdf_source))
+            summary['error'] = f'PDF分析错误: {str(e)}'
+        finally:
+            if page_events is not None:
+                page_events.close()
+            if fetcher is not None:
+                fetcher.shutdown()
+        
+        yield emit('complete', summary)
+        
+        if collector is not None and 'error' not in summary:
+            self._store_cached_result(content_hash, collector.page_results(), collector.results())
+        
+        logger.info("PDF分析完成", extra={
+            'qr_codes': summary['total_qr_codes'],
+            'elapsed': self.timings.to_dict()['elapsed_seconds']
+        })
+    
+    def _replay_cached_result(self, cached):
+        """以事件形式输出缓存的完整结果"""
+        results = cached['results']
+        pages = cached['pages']
+        yield 'start', {'total_pages': len(pages)}
+        for page_num, qr_codes in pages:
+            yield 'page', {'page_number': page_num + 1, 'total_pages': len(pages), 'qr_codes': qr_codes}
+        for item in results.get('wechat_articles', []):
+            yield 'wechat_article', item
+        for item in results.get('other_qr_codes', []):
+            yield 'other_qr_code', item
+        summary = {key: value for key, value in results.items()
+                   if key not in ('wechat_articles', 'other_qr_codes')}
+        summary['cached'] = True
+        yield 'complete', summary
+    
+    def _replay_cached_pages(self, pages):
+        """以 iter_scan_pages 的格式输出缓存的页面检测结果（没有逐页指标）"""
+        yield 'start', len(pages)
+        for page_num, qr_codes in pages:
+            yield 'page', (page_num, qr_codes, None)
+    
+    def _article_result(self, qr_data, page_num, article_info):
+        """根据抓取结果生成一条结果：('wechat_article', 文章信息) 或失败时的 ('other_qr_code', ...)"""
+        try:
+            if isinstance(article_info, Exception):
+                raise article_info
+            # 同一链接可能出现在多页，每页使用独立的副本
+            article_info = dict(article_info) if article_info else article_info
+            if article_info and 'error' not in article_info:
+                article_info['page_number'] = page_num + 1  # 转换为1基索引
+                article_info['qr_url'] = qr_data
+                logger.debug("成功分析微信文章: %s", article_info.get('title', '未知标题'))
+                return 'wechat_article', article_info
+            logger.warning("微信文章分析失败: %s", qr_data)
+            return 'other_qr_code', {
+                'url': qr_data,
+                'page_number': page_num + 1,
+                'error': article_info.get('error', '分析失败') if article_info else '无响应'
+            }
+        except Exception as e:
+            logger.warning("微信文章分析异常: %s, 错误: %s", qr_data, e)
+            return 'other_qr_code', {
+                'url': qr_data,
+                'page_number': page_num + 1,
+                'error': f'分析异常: {str(e)}'
+            }
+    
+    
+    def analyze_batch(self, documents, refresh_articles=False):
+        """批量分析多份PDF
+
+        所有文档的页面切分为区间后一起提交到进程池，空闲的进程总能领到其他文档的页面；
+        微信文章在整批范围内去重，同一链接只抓取一次，并与页面检测同时进行。
+        documents 为 [(filename, pdf_source, content_hash), ...]，content_hash 可以为 None。
+        返回 {'documents': [{'filename', 'results'}, ...], 'summary': {...}}，
+        每份文档的 results 与 analyze_pdf 的结果格式相同。
+        进度事件（start/page/article/document）发送给 progress_callback。
+        """
+        logger.info("开始批量分析 %d 份PDF", len(documents))
+        self.timings = Timings()
+        self.start_fetch_budget()
+        batch = [BatchDocument(index, filename, source, content_hash)
+                 for index, (filename, source, content_hash) in enumerate(documents)]
+        
+        fetcher = ArticleFetcher(self, use_cache=not refresh_articles)
+        try:
+            to_scan = []
+            for document in batch:
+                self.timings.inc('documents')
+                self._prepare_batch_document(document, refresh_articles)
+                if document.results is None and document.error is None:
+                    if document.pages:
+                        # 复用缓存的页面检测结果，只重新抓取文章
+                        self._prefetch_articles(fetcher, document.pages.values())
+                    else:
+                        to_scan.append(document)
+            
+            total_pages = sum(len(self.select_pages(document.total_pages)) for document in to_scan)
+            self._report_progress('start', {'documents': len(batch), 'total_pages': total_pages})
+            
+            for document, (page_num, qr_codes, metrics) in self._iter_batch_pages(to_scan, total_pages):
+                document.add_page(page_num, qr_codes, metrics)
+                self._report_progress('page', {
+                    'document': document.filename,
+                    'document_index': document.index,
+                    'page_number': page_num + 1,
+                    'total_pages': document.total_pages,
+                    'qr_codes': qr_codes
+                })
+                self._prefetch_articles(fetcher, [qr_codes])
+                for event, data in fetcher.completed():
+                    if event == 'article':
+                        self._report_progress(event, data)
+            
+            for event, data in fetcher.completed(wait=True):
+                if event == 'article':
+                    self._report_progress(event, data)
+        finally:
+            fetcher.shutdown()
+        
+        results = []
+        for document in batch:
+            if document.results is None:
+                document.results = self._batch_document_results(document, fetcher.articles)
+                if 'error' not in document.results:
+                    self._store_cached_result(document.content_hash, sorted(document.pages.items()),
+                                              document.results)
+            self._report_progress('document', {
+                'index': document.index,
+                'filename': document.filename,
+                'total_qr_codes': document.results.get('total_qr_codes', 0),
+                'error': document.results.get('error')
+            })
+            results.append({'filename': document.filename, 'results': document.results})
+        
+        summary = self._batch_summary(batch, fetcher)
+        logger.info("批量分析完成", extra={
+            'documents': summary['documents'],
+            'pages': summary['total_pages'],
+            'elapsed': summary['elapsed_seconds']
+        })
+        return {'documents': results, 'summary': summary}
+    
+    def _prepare_batch_document(self, document, refresh_articles):
+        """读取结果缓存，未命中时打开文档获取页数"""
+        cached = self._get_cached_result(document.content_hash)
+        if cached is not None:
+            document.total_pages = len(cached['pages'])
+            if not refresh_articles and not has_article_errors(cached['results']):
+                document.results = dict(cached['results'], cached=True)
+                return
+            document.pages = dict(cached['pages'])
+            document.page_metrics = list(cached['results'].get('page_metrics', []))
+            return
+        try:
+            with self.timings.span('open'):
+                pdf_document = open_pdf(document.source)
+            document.total_pages = len(pdf_document)
+            pdf_document.close()
+        except Exception as e:
+            logger.warning("打开PDF失败: %s, 错误: %s", document.filename, e)
+            document.error = f'PDF分析错误: {str(e)}'
+    
+    def _prefetch_articles(self, fetcher, page_codes):
+        for qr_codes in page_codes:
+            for qr_data in qr_codes:
+                if self.is_wechat_article_url(qr_data):
+                    fetcher.prefetch(qr_data)
+    
+    def _iter_batch_pages(self, documents, total_pages):
+        """检测各文档的全部页面，按完成顺序产生 (document, (page_num, qr_codes, metrics))"""
+        done = set()
+        workers = self.resolve_workers(total_pages)
+        if workers > 1:
+            try:
+                for document, page in self._iter_batch_parallel(documents, total_pages, workers):
+                    done.add((document.index, page[0]))
+                    yield document, page
+                return
+            except POOL_ERRORS as e:
+                # 只需串行补做尚未完成的页面
+                logger.warning("并行处理失败，回退到串行模式: %s", e)
+                _shutdown_process_pool()
+        
+        for document in documents:
+            remaining = [page_num for page_num in self.select_pages(document.total_pages)
+                         if (document.index, page_num) not in done]
+            if not remaining or document.error:
+                continue
+            try:
+                with self.timings.span('open'):
+                    pdf_document = open_pdf(document.source)
+            except Exception as e:
+                logger.warning("打开PDF失败: %s, 错误: %s", document.filename, e)
+                document.error = f'PDF分析错误: {str(e)}'
+                continue
+            self.reset_document_state()
+            try:
+                for page_num in remaining:
+                    yield document, (page_num, *self.scan_page(pdf_document, page_num, document.total_pages))
+            finally:
+                pdf_document.close()
+    
+    def _iter_batch_parallel(self, documents, total_pages, workers):
+        """把所有文档的页面区间提交到同一个进程池"""
+        logger.info("使用 %d 个进程并行处理 %d 份文档的 %d 页", workers, len(documents), total_pages)
+        
+        # 按整批的页数统一切分区间，区间足够小时各进程的负载接近均衡
+        chunk_size = max(1, -(-total_pages // (workers * 4)))
+        pool = _get_process_pool(self.configured_workers())
+        futures = {}
+        for document in documents:
+            page_numbers = self.select_pages(document.total_pages)
+            source, size = document.source, chunk_size
+            doc_key = document_key(source, document.content_hash)
+            if not isinstance(source, (str, os.PathLike)):
+                # 内存中的PDF数据随任务发送给子进程，每份文档最多分成 workers 个区间
+                source = bytes(source)
+                size = max(chunk_size, -(-len(page_numbers) // workers))
+            for start in range(0, len(page_numbers), size):
+                future = pool.submit(scan_page_list, source, page_numbers[start:start + size], self.scan_options(),
+                                     doc_key)
+                futures[future] = document
+        
+        try:
+            for future in as_completed(futures):
+                document = futures[future]
+                try:
+                    chunk, timings = future.result()
+                except (BrokenProcessPool, OSError):
+                    raise
+                except Exception as e:
+                    # 单份文档出错（如文件损坏）不影响其他文档
+                    logger.warning("处理PDF失败: %s, 错误: %s", document.filename, e)
+                    document.error = f'PDF分析错误: {str(e)}'
+                    continue
+                self.timings.merge(timings)
+                for page in chunk:
+                    yield document, page
+        finally:
+            for future in futures:
+                future.cancel()
+    
+    def _batch_document_results(self, document, articles):
+        """按 analyze_pdf 的格式生成单份文档的结果"""
+        collector = ResultCollector()
+        summary = {
+            'total_qr_codes': 0,
+            'analysis_time': datetime.now().isoformat()
+        }
+        for page_num, qr_codes in sorted(document.pages.items()):
+            collector.add('page', {'page_number': page_num + 1, 'qr_codes': qr_codes})
+            for qr_data in qr_codes:
+                summary['total_qr_codes'] += 1
+                if self.is_wechat_article_url(qr_data):
+                    collector.add(*self._article_result(qr_data, page_num, articles.get(qr_data)))
+                else:
+                    collector.add('other_qr_code', {'url': qr_data, 'page_number': page_num + 1})
+        summary['page_metrics'] = sorted(document.page_metrics, key=lambda item: item['page_number'])
+        page_triage = triage_summary(summary['page_metrics'])
+        if page_triage is not None:
+            summary['page_triage'] = page_triage
+        if document.error:
+            summary['error'] = document.error
+        collector.add('complete', summary)
+        return collector.results()
+    
+    def _batch_summary(self, batch, fetcher):
+        """整批的汇总信息"""
+        results = [document.results for document in batch]
+        # 按各文档的结果统计（包括命中结果缓存、未重新检测的文档），冷启动和命中缓存时的合计相同
+        article_references = sum(
+            len(item.get('pages') or [item['page_number']])
+            for result in results for key, url_key in (('wechat_articles', 'qr_url'), ('other_qr_codes', 'url'))
+            for item in result.get(key, []) if self.is_wechat_article_url(item.get(url_key) or '')
+        )
+        return {
+            'documents': len(batch),
+            'failed_documents': sum(1 for item in results if 'error' in item),
+            'cached_documents': sum(1 for item in results if item.get('cached')),
+            'total_pages': sum(document.total_pages for document in batch),
+            'total_qr_codes': sum(item.get('total_qr_codes', 0) for item in results),
+            'wechat_articles': sum(len(item.get('wechat_articles', [])) for item in results),
+            'other_qr_codes': sum(len(item.get('other_qr_codes', [])) for item in results),
+            # 整批去重后抓取的文章数，以及这些文章链接在各文档中出现的页数合计
+            'unique_article_urls': len(fetcher.articles),
+            'article_references': article_references,
+            'elapsed_seconds': self.timings.to_dict()['elapsed_seconds'],
+            'analysis_time': datetime.now().isoformat()
+        }
+    
+    def _get_cached_result(self, content_hash):
+        """按文件哈希读取结果缓存，返回 {'pages': ..., 'results': ...} 或 None"""
+        if not self._result_cache_enabled(content_hash):
+            return None
+        try:
+            cached = self.result_cache.get(content_hash)
+        except Exception as e:
+            logger.warning("读取结果缓存失败: %s", e)
+            return None
+        self.timings.inc('result_cache_hits' if cached is not None else 'result_cache_misses')
+        return cached
+    
+    def _result_cache_enabled(self, content_hash):
+        # 只检测部分页面、不抓取文章或只提取部分文章字段时结果不完整，不读写结果缓存
+        return (self.result_cache is not None and bool(content_hash)
+                and not self.page_ranges and self.article_fetch and self.article_fields is None)
+    
+    def _store_cached_result(self, content_hash, page_results, results):
+        """保存页面检测结果和最终结果
+
+        有文章抓取失败时同样保存：页面检测结果仍然有效，命中缓存时只重新抓取文章（见 has_article_errors）。
+        """
+        if not self._result_cache_enabled(content_hash):
+            return
+        try:
+            self.result_cache.set(content_hash, {'pages': page_results, 'results': results})
+        except Exception as e:
+            logger.warning("写入结果缓存失败: %s", e)
+    
+    def iter_scan_pages(self, pdf_source, content_hash=None):
+        """渲染所有页面并检测二维码
+
+        先产生 ('start', 总页数)，之后按完成顺序逐页产生 ('page', (page_num, qr_codes, metrics))。
+        content_hash 用于在并行模式下区分文档（见 document_key），可以为 None。
+        """
+        # 使用PyMuPDF打开PDF文件
+        with self.timings.span('open'):
+            pdf_document = open_pdf(pdf_source)
+        total_pages = len(pdf_document)
+        logger.info("PDF打开成功，共 %d 页", total_pages)
+        yield 'start', total_pages
+        
+        page_numbers = self.select_pages(total_pages)
+        done = set()
+        workers = self.resolve_workers(len(page_numbers))
+        if workers > 1:
+            # 并行模式下由各子进程自行打开文档
+            pdf_document.close()
+            try:
+                for page in self._iter_pages_parallel(pdf_source, page_numbers, workers, content_hash):
+                    done.add(page[0])
+                    yield 'page', page
+                return
+            except POOL_ERRORS as e:
+                # 只需串行补做尚未完成的页面
+                logger.warning("并行处理失败，回退到串行模式: %s", e)
+                _shutdown_process_pool()
+                with self.timings.span('open'):
+                    pdf_document = open_pdf(pdf_source)
+        
+        self.reset_document_state()
+        try:
+            for page_num in page_numbers:
+                if page_num in done:
+                    continue
+                qr_codes, metrics = self.scan_page(pdf_document, page_num, total_pages)
+                yield 'page', (page_num, qr_codes, metrics)
+        finally:
             # 关闭PDF文档
             pdf_document.close()
+    
+    def scan_options(self):
+        """传给子进程的页面检测配置"""
+        return {
+            'detection_mode': self.detection_mode,
+            'dpi_tiers': self.dpi_tiers,
+            'scan_images': self.scan_images,
+            'decoder': self.decoder_spec,
+            'page_triage': self.page_triage,
+            'code_cache': self.code_cache_mode
+        }
+    
+    def select_pages(self, total_pages):
+        """返回需要检测的页码列表（0基）"""
+        if not self.page_ranges:
+            return list(range(total_pages))
+        selected = set()
+        for first, last in self.page_ranges:
+            selected.update(range(first - 1, min(last or total_pages, total_pages)))
+        return sorted(selected)
+    
+    def reset_document_state(self):
+        """开始处理新文档前清空按文档缓存的数据"""
+        self._image_codes = {}
+        if self.code_cache_mode == 'shared':
+            self._code_cache = get_shared_code_cache()
+        elif self.code_cache_mode == 'document':
+            self._code_cache = QRCodeCache()
+        else:
+            self._code_cache = None
+    
+    def scan_page(self, pdf_document, page_num, total_pages):
+        """渲染单个页面并检测二维码，返回 (qr_codes, metrics)，出错时二维码列表为空"""
+        logger.debug("正在处理第 %d/%d 页", page_num + 1, total_pages)
+        started = time.perf_counter()
+        metrics = {
+            'page_number': page_num + 1,
+            'mode': self.detection_mode,
+            'pixels_rendered': 0,
+            'qr_codes_found': 0
+        }
+        
+        try:
+            # 获取页面
+            page = pdf_document.load_page(page_num)
+            
+            # 先根据页面结构预判，纯文本页面不渲染也不解码；关闭预判时 decision 为 None
+            decision, regions = self._triage_page(page, metrics) if self.page_triage else (None, None)
+            if decision == 'skip':
+                metrics['source'] = 'skipped'
+                qr_codes = []
+            else:
+                # 优先直接解码嵌入的图片，未找到二维码时再渲染整页（如矢量绘制的二维码）
+                qr_codes = self._scan_page_images(pdf_document, page, metrics) if self.scan_images else []
+                if qr_codes and decision != 'render':
+                    metrics['source'] = 'images'
+                elif decision == 'images' and regions:
+                    # 页面上没有矢量图形，只需渲染图片所在的区域
+                    metrics['source'] = 'regions'
+                    qr_codes = self._scan_page_regions(page, regions, metrics)
+                else:
+                    # 预判为 render 的页面有较多矢量图形（或注释），即使图片中已找到二维码也渲染整页，
+                    # 以免漏掉图片之外矢量绘制的二维码；结果与图片中的二维码合并
+                    metrics['source'] = 'render'
+                    rendered = self._scan_page_rendered(page, metrics)
+                    qr_codes.extend(code for code in rendered if code not in qr_codes)
             
         except Exception as e:
-            results['error'] = f'PDF分析错误: {str(e)}'
+            logger.warning("处理第 %d 页时出错: %s", page_num + 1, e)
+            metrics['error'] = str(e)
+            qr_codes = []
         
-        return results
+        metrics['qr_codes_found'] = len(qr_codes)
+        metrics['scan_seconds'] = round(time.perf_counter() - started, 4)
+        self.timings.inc('pages')
+        self.timings.inc('qr_codes', len(qr_codes))
+        return qr_codes, metrics
+    
+    def _scan_page_rendered(self, page, metrics):
+        """渲染整页并检测二维码（adaptive 模式先低分辨率定位）"""
+        if self.detection_mode == 'adaptive':
+            return self._scan_page_adaptive(page, metrics)
+        # 将页面转换为图像
+        mat = fitz.Matrix(RENDER_ZOOM, RENDER_ZOOM)  # 降低缩放倍数以提高处理速度
+        with self.timings.span('render'):
+            pix = page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY)
+        metrics['pixels_rendered'] += pix.width * pix.height
+        
+        # 检测二维码
+        return self.detect_qr_codes(pixmap_to_array(pix))
+    
+    def _triage_page(self, page, metrics):
+        """根据页面结构（图片、矢量路径、注释）预判页面的处理方式
+        
+        返回 (TRIAGE_DECISIONS 之一, 需要渲染的图片区域列表)：
+        - 有注释（外观中可能含有二维码）或较多矢量路径元素：render
+        - 只有足够大的图片：images，图片区域较小时附带各区域（渲染坐标），否则区域列表为 None
+        - 其余（纯文本、空白页、只有细小图片或少量线条）：skip
+        """
+        started = time.perf_counter()
+        with self.timings.span('triage'):
+            regions = []
+            for info in page.get_image_info():
+                bbox = fitz.Rect(info['bbox'])
+                if (min(info['width'], info['height']) < MIN_IMAGE_SIDE
+                        or min(bbox.width, bbox.height) < TRIAGE_MIN_QR_SIDE):
+                    continue
+                # get_image_info 的 bbox 为未旋转的页面坐标，get_pixmap 的 clip 为旋转后的页面坐标
+                # （page.rect 的坐标系），用 rotation_matrix 换算；留白保证二维码静区完整
+                pad_x, pad_y = bbox.width * REGION_PADDING, bbox.height * REGION_PADDING
+                region = (bbox + (-pad_x, -pad_y, pad_x, pad_y)) * page.rotation_matrix & page.rect
+                if not region.is_empty:
+                    regions.append(region)
+            drawing_items = sum(len(drawing['items']) for drawing in page.get_cdrawings())
+            has_annots = page.first_annot is not None or page.first_widget is not None
+            
+            if has_annots or drawing_items >= TRIAGE_MIN_DRAWING_ITEMS:
+                decision = 'render'
+            elif regions:
+                decision = 'images'
+            else:
+                decision = 'skip'
+        
+        metrics['triage'] = decision
+        metrics['triage_images'] = len(regions)
+        metrics['triage_drawing_items'] = drawing_items
+        metrics['triage_seconds'] = round(time.perf_counter() - started, 6)
+        if decision == 'skip':
+            self.timings.inc('pages_skipped')
+        elif decision == 'images':
+            self.timings.inc('pages_image_only')
+            # 图片几乎占满页面时分区域渲染没有好处
+            if sum(abs(region) for region in regions) > abs(page.rect) * TRIAGE_MAX_REGION_FRACTION:
+                return decision, None
+        return decision, regions
+    
+    def _scan_page_regions(self, page, regions, metrics):
+        """只渲染图片所在的区域并检测二维码"""
+        qr_codes = []
+        mat = fitz.Matrix(RENDER_ZOOM, RENDER_ZOOM)
+        for region in regions:
+            with self.timings.span('render'):
+                pix = page.get_pixmap(matrix=mat, clip=region, colorspace=fitz.csGRAY)
+            metrics['pixels_rendered'] += pix.width * pix.height
+            decoded = self.detect_qr_codes(pixmap_to_array(pix))
+            qr_codes.extend(code for code in decoded if code not in qr_codes)
+        return qr_codes
+    
+    def _scan_page_images(self, pdf_document, page, metrics):
+        """解码页面中嵌入的图片并检测二维码，按 xref 去重"""
+        qr_codes = []
+        metrics['images_scanned'] = 0
+        metrics['images_reused'] = 0
+        
+        for image_info in page.get_images(full=True):
+            xref, width, height = image_info[0], image_info[2], image_info[3]
+            if min(width, height) < MIN_IMAGE_SIDE:
+                continue
+            
+            if xref in self._image_codes:
+                metrics['images_reused'] += 1
+            else:
+                # 不同 xref 的图片内容可能完全相同（如每页单独嵌入的页脚二维码），按原始数据的哈希复用结果
+                key = self._image_cache_key(pdf_document, xref)
+                codes = self._cached_codes(key)
+                if codes is not None:
+                    metrics['images_reused'] += 1
+                else:
+                    metrics['images_scanned'] += 1
+                    with self.timings.span('render'):
+                        image = self._decode_embedded_image(pdf_document, xref)
+                    metrics['pixels_decoded'] = metrics.get('pixels_decoded', 0) + (image.size if image is not None else 0)
+                    codes = self.detect_qr_codes(image) if image is not None else []
+                    self._store_codes(key, codes)
+                self._image_codes[xref] = codes
+            
+            qr_codes.extend(code for code in self._image_codes[xref] if code not in qr_codes)
+        
+        return qr_codes
+    
+    def _image_cache_key(self, pdf_document, xref):
+        """嵌入图片的缓存键：图片字典（尺寸、颜色空间、编码等）和原始数据的哈希，无需解码图片"""
+        if self._code_cache is None:
+            return None
+        try:
+            digest = content_digest(*object_content(pdf_document, xref))
+        except Exception as e:
+            logger.debug("计算图片 %s 的哈希失败: %s", xref, e)
+            return None
+        return 'image', self.decoder_spec, digest
+    
+    def _cached_codes(self, key):
+        """读取二维码结果缓存，未命中时返回 None"""
+        if key is None:
+            return None
+        codes = self._code_cache.get(key)
+        self.timings.inc('qr_cache_hits' if codes is not None else 'qr_cache_misses')
+        return codes
+    
+    def _store_codes(self, key, codes):
+        if key is not None:
+            self._code_cache.set(key, codes)
+    
+    def _decode_embedded_image(self, pdf_document, xref):
+        """将嵌入图片解码为灰度 numpy 数组，失败时返回 None"""
+        try:
+            extracted = pdf_document.extract_image(xref)
+            image = None
+            if extracted and extracted.get('image'):
+                buffer = np.frombuffer(extracted['image'], dtype=np.uint8)
+                image = cv2.imdecode(buffer, cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                # OpenCV 不支持的编码（如 JBIG2、CMYK JPEG）交给 MuPDF 解码
+                pix = fitz.Pixmap(pdf_document, xref)
+                if pix.colorspace is None or pix.colorspace.n != 1 or pix.alpha:
+                    pix = fitz.Pixmap(fitz.csGRAY, pix)
+                image = pixmap_to_array(pix)
+            # 补白边时会复制数据，之后不再依赖 pix 的内存
+            return cv2.copyMakeBorder(image, IMAGE_QUIET_ZONE, IMAGE_QUIET_ZONE, IMAGE_QUIET_ZONE,
+                                      IMAGE_QUIET_ZONE, cv2.BORDER_CONSTANT, value=255)
+        except Exception as e:
+            logger.warning("解码嵌入图片 %s 失败: %s", xref, e)
+            return None
+    
+    def _scan_page_adaptive(self, page, metrics):
+        """先以最低档分辨率渲染整页定位二维码，再对未能解码的候选区域逐档提高分辨率重新渲染"""
+        coarse_dpi, fine_dpis = self.dpi_tiers[0], self.dpi_tiers[1:]
+        with self.timings.span('render'):
+            pix = page.get_pixmap(dpi=coarse_dpi, colorspace=fitz.csGRAY)
+        metrics['pixels_rendered'] += pix.width * pix.height
+        
+        image = pixmap_to_array(pix)
+        with self.timings.span('decode'):
+            qr_codes, regions = self.locate_qr_codes(image)
+        metrics['candidate_regions'] = len(qr_codes) + len(regions)
+        metrics['regions_rerendered'] = 0
+        metrics['regions_reused'] = 0
+        
+        for quad in regions:
+            clip = self._region_to_clip(page, quad, coarse_dpi)
+            if clip.is_empty:
+                continue
+            # 内容相同的候选区域（如每页页脚的同一个二维码）直接复用之前高分辨率解码的结果
+            key = self._region_cache_key(image, quad, coarse_dpi)
+            codes = self._cached_codes(key)
+            if codes is not None:
+                metrics['regions_reused'] += 1
+                qr_codes.extend(code for code in codes if code not in qr_codes)
+                continue
+            codes = []
+            metrics['regions_rerendered'] += 1
+            # 大尺寸区域无需最高档分辨率：限制区域渲染后的边长，且至少比定位时清晰一倍
+            max_dpi = max(coarse_dpi * 2, 72 * REGION_MAX_SIDE / max(clip.width, clip.height))
+            tiers = sorted({min(dpi, max_dpi) for dpi in fine_dpis})
+            for dpi in tiers:
+                with self.timings.span('render'):
+                    region_pix = page.get_pixmap(dpi=int(dpi), clip=clip, colorspace=fitz.csGRAY)
+                metrics['pixels_rendered'] += region_pix.width * region_pix.height
+                decoded = self.detect_qr_codes(pixmap_to_array(region_pix))
+                if decoded:
+                    codes = decoded
+                    qr_codes.extend(code for code in decoded if code not in qr_codes)
+                    break
+            # 各档分辨率都无法解码的区域同样缓存，避免对重复出现的区域反复尝试
+            self._store_codes(key, codes)
+        
+        return qr_codes
+    
+    def _region_cache_key(self, image, quad, dpi):
+        """低分辨率图像中候选区域的缓存键"""
+        if self._code_cache is None:
+            return None
+        try:
+            digest = region_digest(image, quad)
+        except cv2.error as e:
+            logger.debug("计算候选区域哈希失败: %s", e)
+            return None
+        return 'region', self.decoder_spec, self.dpi_tiers, dpi, digest
+    
+    def _region_to_clip(self, page, quad, dpi):
+        """将低分辨率图像中的二维码角点换算为页面坐标下的裁剪区域（含留白）"""
+        scale = dpi / 72
+        xs = [point[0] for point in quad]
+        ys = [point[1] for point in quad]
+        pad_x = (max(xs) - min(xs)) * REGION_PADDING
+        pad_y = (max(ys) - min(ys)) * REGION_PADDING
+        # 渲染图像的像素坐标除以缩放比例即为旋转后的页面坐标（page.rect 的坐标系），
+        # 与 get_pixmap 的 clip 相同，无需再换算
+        rect = fitz.Rect(min(xs) - pad_x, min(ys) - pad_y, max(xs) + pad_x, max(ys) + pad_y) / scale
+        return rect & page.rect
+    
+    def resolve_fetch_workers(self, url_count=None):
+        """文章抓取线程数：配置值（或默认值），不超过待抓取的链接数"""
+        fetch_workers = self.fetch_workers
+        if fetch_workers is None:
+            fetch_workers = int(os.environ.get('ARTICLE_FETCH_WORKERS', 0)) or DEFAULT_FETCH_WORKERS
+        if url_count is not None:
+            fetch_workers = min(fetch_workers, url_count)
+        return max(1, fetch_workers)
+    
+    def configured_workers(self):
+        """配置的页面处理进程数，即共享进程池的大小"""
+        workers = self.max_workers
+        if workers is None:
+            workers = int(os.environ.get('PDF_ANALYZER_WORKERS', 0)) or os.cpu_count() or 1
+        return max(1, workers)
+    
+    def resolve_workers(self, total_pages):
+        """根据配置和页数决定本次使用的进程数（用于切分页面区间），1 表示串行处理"""
+        if total_pages < PARALLEL_MIN_PAGES:
+            return 1
+        return max(1, min(self.configured_workers(), total_pages))
+    
+    def _iter_pages_parallel(self, pdf_source, page_numbers, workers, content_hash=None):
+        """将页面区间分发到进程池，按完成顺序逐页产生 (page_num, qr_codes, metrics)"""
+        logger.info("使用 %d 个进程并行处理页面", workers)
+        
+        # 同一文档的区间在子进程中共用按文档缓存的结果（如每页页脚的同一个二维码只解码一次）
+        doc_key = document_key(pdf_source, content_hash)
+        if isinstance(pdf_source, (str, os.PathLike)):
+            # 每个进程分到若干个区间，兼顾负载均衡和文档打开开销
+            chunk_size = max(1, -(-len(page_numbers) // (workers * 4)))
+        else:
+            # 内存中的PDF数据需要随任务发送给子进程，每个进程只分一个区间，数据只传一次
+            pdf_source = bytes(pdf_source)
+            chunk_size = max(1, -(-len(page_numbers) // workers))
+        pool = _get_process_pool(self.configured_workers())
+        futures = [
+            pool.submit(scan_page_list, pdf_source, page_numbers[start:start + chunk_size], self.scan_options(), doc_key)
+            for start in range(0, len(page_numbers), chunk_size)
+        ]
+        
+        try:
+            for future in as_completed(futures):
+                chunk, timings = future.result()
+                self.timings.merge(timings)
+                yield from chunk
+        finally:
+            # 调用方提前结束（如客户端断开）时取消尚未开始的区间
+            for future in futures:
+                future.cancel()
+    
+    def _report_progress(self, event, data):
+        """调用进度回调，回调本身的异常不影响分析"""
+        if self.progress_callback is None:
+            return
+        try:
+            self.progress_callback(event, data)
+        except Exception as e:
+            logger.warning("进度回调出错: %s", e)
     
     def detect_qr_codes(self, image):
         """
         检测图像中的二维码（优化版本）
         """
-        import sys
         try:
-            print(f"开始检测二维码，图像尺寸: {image.size}", flush=True)
-            
-            # 转换PIL Image为OpenCV格式
-            opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            
-            # 初始化QR码检测器
-            qr_detector = cv2.QRCodeDetector()
+            if isinstance(image, np.ndarray):
+                # 已是OpenCV格式（灰度渲染结果或解码后的嵌入图片）
+                logger.debug("开始检测二维码，图像尺寸: %s", image.shape[1::-1])
+                opencv_image = image
+            else:
+                logger.debug("开始检测二维码，图像尺寸: %s", image.size)
+                # 转换PIL Image为OpenCV格式
+                opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
             
             results = []
             
-            # 优先尝试多二维码检测（更高效）
+            # 使用配置的解码后端
             try:
-                retval, decoded_info, points, straight_qrcode = qr_detector.detectAndDecodeMulti(opencv_image)
-                if retval and decoded_info:
-                    print(f"检测到 {len(decoded_info)} 个二维码", flush=True)
-                    for i, info in enumerate(decoded_info):
-                        if info and info.strip():  # 确保不是空字符串
-                            results.append(info.strip())
-                else:
-                    # 如果多二维码检测失败，尝试单个二维码检测
-                    data, bbox, rectified_image = qr_detector.detectAndDecode(opencv_image)
-                    if data and data.strip():
-                        print(f"检测到单个二维码: {data}", flush=True)
-                        results.append(data.strip())
-                    else:
-                        print("未检测到二维码", flush=True)
+                with self.timings.span('decode'):
+                    results = self.decoder.decode(opencv_image)
             except Exception as e:
-                print(f"二维码检测异常: {str(e)}", flush=True)
+                logger.warning("二维码检测异常: %s", e)
             
-            print(f"最终检测结果: {len(results)} 个二维码", flush=True)
+            logger.debug("检测结果: %d 个二维码", len(results))
             return results
         except Exception as e:
-            print(f"二维码检测错误: {e}", flush=True)
+            logger.warning("二维码检测错误: %s", e)
             return []
     
+    def locate_qr_codes(self, image):
+        """检测图像中的二维码，返回 (已解码内容列表, 未能解码的候选区域角点列表)
+        
+        每轮定位后把已找到的区域涂白再重新定位，弥补多二维码检测在低分辨率下的漏检。
+        """
+        try:
+            if isinstance(image, np.ndarray):
+                # 定位过程中会涂改图像，不能修改调用方（可能是 pixmap）的内存
+                opencv_image = image.copy()
+            else:
+                opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
+            qr_detector = get_qr_detector()
+            
+            decoded, regions = [], []
+            retval, decoded_info, points, _ = qr_detector.detectAndDecodeMulti(opencv_image)
+            if retval and points is not None:
+                for info, quad in zip(decoded_info, points):
+                    if info and info.strip():
+                        if info.strip() not in decoded:
+                            decoded.append(info.strip())
+                    else:
+                        regions.append(quad.tolist())
+                found = points
+            else:
+                # 多二维码定位失败时尝试单个定位
+                retval, points = qr_detector.detect(opencv_image)
+                found = points.reshape(-1, 4, 2) if retval and points is not None else []
+                regions.extend(quad.tolist() for quad in found)
+            
+            for _ in range(LOCATE_ROUNDS):
+                if len(found) == 0:
+                    break
+                for quad in found:
+                    cv2.fillConvexPoly(opencv_image, np.asarray(quad, dtype=np.int32), 255)
+                retval, points = qr_detector.detectMulti(opencv_image)
+                if not retval or points is None:
+                    retval, points = qr_detector.detect(opencv_image)
+                found = points.reshape(-1, 4, 2) if retval and points is not None else []
+                regions.extend(quad.tolist() for quad in found)
+            
+            logger.debug("定位到 %d 个候选二维码，其中 %d 个需要高分辨率解码",
+                         len(decoded) + len(regions), len(regions))
+            return decoded, regions
+        except Exception as e:
+            logger.warning("二维码定位错误: %s", e)
+            return [], []
+    
     def is_wechat_article_url(self, url):
         """判断是否为微信公众号文章链接"""
         wechat_patterns = [
@@ -159,39 +1423,134 @@ class PDFAnalyzer:
                 return True
         return False
     
-    def analyze_wechat_article(self, url):
-        """分析微信公众号文章"""
+    def start_fetch_budget(self):
+        """开始计算本次分析的文章抓取时间预算"""
+        self.fetch_deadline = time.monotonic() + self.fetch_budget if self.fetch_budget else None
+    
+    def analyze_wechat_article(self, url, use_cache=True):
+        """分析微信公众号文章，use_cache 为 False 时忽略已缓存的结果重新抓取"""
+        fields = self.article_fields
+        if not self.article_fetch or (fields is not None and fields <= {'url'}):
+            # 不访问网络，只记录文章链接
+            return {'url': url}
+        
+        if self.article_cache is not None and use_cache:
+            try:
+                cached = self.article_cache.get(url)
+            except Exception as e:
+                logger.warning("读取文章缓存失败: %s", e)
+                cached = None
+            # 缓存的结果缺少所需字段时（之前只提取了部分字段）重新抓取
+            required = set(ARTICLE_FIELDS) if fields is None else fields
+            if cached is not None and not required <= cached.keys() | {'url'}:
+                cached = None
+            self.timings.inc('article_cache_hits' if cached is not None else 'article_cache_misses')
+            if cached is not None:
+                cached['url'] = url
+                return project_fields(cached, fields)
+        
+        article_info = self._fetch_wechat_article(url)
+        
+        # 只缓存成功解析的结果，失败的链接下次重新抓取
+        if self.article_cache is not None and 'error' not in article_info:
+            try:
+                self.article_cache.set(url, article_info)
+            except Exception as e:
+                logger.warning("写入文章缓存失败: %s", e)
+        
+        return article_info
+    
+    def _fetch_wechat_article(self, url):
+        """抓取并解析微信公众号文章"""
+        scheduler = self.fetch_scheduler or get_fetch_scheduler()
         try:
-            # 减少延时以避免超时，仅在必要时添加短暂延时
-            time.sleep(0.2)
+            # 限速、重试和熔断由调度器处理
+            self.timings.inc('articles_fetched')
+            stream = self.article_stream and can_stream(self.article_fields)
+            with self.timings.span('fetch'):
+                response = scheduler.get(url, deadline=self.fetch_deadline, timings=self.timings, stream=stream)
+            if stream:
+                return self._extract_streamed(response, url)
             
-            response = self.session.get(url, timeout=5)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # 单次遍历提取所有字段
+            start = time.perf_counter()
+            article_info = self.article_extractor.extract(response.content, url, self.article_fields)
+            parse_seconds = time.perf_counter() - start
+            self.timings.add('parse', parse_seconds)
+            self._report_article_stats(url, len(response.content), parse_seconds)
+            return article_info
             
-            article_info = {
+        except BudgetExhausted:
+            self.timings.inc('fetch_skipped')
+            logger.info("超出抓取时间预算，跳过文章: %s", url)
+            return {
                 'url': url,
-                'title': self.extract_title(soup),
-                'publish_time': self.extract_publish_time(soup),
-                'account_name': self.extract_account_name(soup),
-                'author': self.extract_author(soup),
-                'article_link': self.extract_article_link(soup),
-                'copyright': self.extract_copyright(soup),
-                'meta_tags': self.extract_meta_tags(soup),
-                'scripts': self.extract_scripts(soup),
-                'labels': self.extract_labels(soup),
-                'seo_info': self.extract_seo_info(soup)
+                'error': BUDGET_EXHAUSTED_ERROR
+            }
+        except CircuitOpenError as e:
+            self.timings.inc('fetch_rejected')
+            logger.info("主机暂停抓取，跳过文章: %s", url)
+            return {
+                'url': url,
+                'error': f'文章分析错误: {str(e)}'
             }
-            
-            return article_info
-            
         except Exception as e:
+            self.timings.inc('fetch_errors')
+            logger.warning("文章抓取失败: %s, 错误: %s", url, e)
             return {
                 'url': url,
                 'error': f'文章分析错误: {str(e)}'
             }
     
+    def _extract_streamed(self, response, url):
+        """边下载边解析文章，所需字段都找到后关闭连接，不再下载页面的其余部分"""
+        start = time.perf_counter()
+        with response:
+            article_info, stats = self.article_extractor.extract_stream(
+                self._iter_chunks(response), url, self.article_fields)
+        # 下载和解析交替进行，解析以外的时间计入抓取阶段（抓取次数已由请求计入）
+        self.timings.add('fetch', time.perf_counter() - start - stats['parse_seconds'], count=0)
+        self.timings.add('parse', stats['parse_seconds'])
+        if stats['stopped_early']:
+            self.timings.inc('articles_stopped_early')
+        self._report_article_stats(url, stats['bytes'], stats['parse_seconds'], stats['stopped_early'])
+        return article_info
+    
+    def _iter_chunks(self, response):
+        """逐块读取响应体，超出抓取时间预算时抛出 BudgetExhausted
+
+        请求的超时只限制连接和每次读取，响应体的下载时间需要在这里按截止时间检查。
+        """
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            if self.fetch_deadline is not None and time.monotonic() >= self.fetch_deadline:
+                raise BudgetExhausted()
+            yield chunk
+    
+    def _report_article_stats(self, url, size, parse_seconds, stopped_early=False):
+        """记录单篇文章下载的字节数（解压后）和解析耗时"""
+        self.timings.inc('article_bytes', size)
+        logger.debug("文章解析完成: %s", url, extra={
+            'bytes': size,
+            'parse_seconds': round(parse_seconds, 4),
+            'stopped_early': stopped_early
+        })
+    
+    def extract_article_info(self, soup, url):
+        """逐项调用 extract_* 方法提取文章信息（多次遍历的参考实现，输出与 ArticleExtractor 相同）"""
+        return {
+            'url': url,
+            'title': self.extract_title(soup),
+            'publish_time': self.extract_publish_time(soup),
+            'account_name': self.extract_account_name(soup),
+            'author': self.extract_author(soup),
+            'article_link': self.extract_article_link(soup),
+            'copyright': self.extract_copyright(soup),
+            'meta_tags': self.extract_meta_tags(soup),
+            'scripts': self.extract_scripts(soup),
+            'labels': self.extract_labels(soup),
+            'seo_info': self.extract_seo_info(soup)
+        }
+    
     def extract_title(self, soup):
         """提取文章标题"""
         # 首先尝试从JavaScript变量中提取
@@ -0,0 +1,295 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 默认解码后端
+DEFAULT_DECODER = 'opencv'
+
+# 二维码结果缓存的默认条数
+DEFAULT_CODE_CACHE_SIZE = 2048
+# 计算区域哈希时，候选区域透视校正后的边长（像素）
+REGION_HASH_SIZE = 64
+
+# race 模式共用的线程池
+_race_executor = None
+_race_executor_lock = threading.Lock()
+
+# 按配置缓存的解码器（解码器本身无状态，检测器按线程复用），同一配置在进程内只创建一次
+_decoders = {}
+_decoders_lock = threading.Lock()
+
+# 进程内跨文档共用的二维码结果缓存
+_shared_code_cache = None
+_shared_code_cache_lock = threading.Lock()
+
+
+class QRDecoder:
+    """二维码解码后端接口：输入灰度图像（numpy数组），返回解码出的字符串列表"""
+
+    name = None
+
+    @classmethod
+    def available(cls):
+        """当前环境是否可以使用该后端"""
+        return True
+
+    def decode(self, image):
+        raise NotImplementedError
+
+
+class OpenCVDecoder(QRDecoder):
+    """cv2.QRCodeDetector：优先多二维码检测，失败时退回单二维码检测"""
+
+    name = 'opencv'
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def detector(self):
+        """返回当前线程复用的检测器（检测器不是线程安全的）"""
+        detector = getattr(self._local, 'detector', None)
+        if detector is None:
+            detector = self._local.detector = cv2.QRCodeDetector()
+        return detector
+
+    def decode(self, image):
+        detector = self.detector()
+        retval, decoded_info, _, _ = detector.detectAndDecodeMulti(image)
+        if retval and decoded_info:
+            return [info.strip() for info in decoded_info if info and info.strip()]
+        # 如果多二维码检测失败，尝试单个二维码检测
+        data, _, _ = detector.detectAndDecode(image)
+        return [data.strip()] if data and data.strip() else []
+
+
+class WeChatDecoder(QRDecoder):
+    """opencv-contrib 中的微信二维码检测器（CNN定位 + 超分辨率）
+
+    模型文件目录由 WECHAT_QRCODE_MODEL_DIR 指定（detect.prototxt、detect.caffemodel、
+    sr.prototxt、sr.caffemodel），未指定时使用不带模型的传统定位方式。
+    """
+
+    name = 'wechat'
+    model_files = ('detect.prototxt', 'detect.caffemodel', 'sr.prototxt', 'sr.caffemodel')
+
+    def __init__(self, model_dir=None):
+        self.model_dir = model_dir or os.environ.get('WECHAT_QRCODE_MODEL_DIR')
+        self._local = threading.local()
+
+    @classmethod
+    def available(cls):
+        return hasattr(cv2, 'wechat_qrcode_WeChatQRCode')
+
+    def detector(self):
+        detector = getattr(self._local, 'detector', None)
+        if detector is None:
+            if self.model_dir:
+                paths = [os.path.join(self.model_dir, name) for name in self.model_files]
+                detector = cv2.wechat_qrcode_WeChatQRCode(*paths)
+            else:
+                detector = cv2.wechat_qrcode_WeChatQRCode()
+            self._local.detector = detector
+        return detector
+
+    def decode(self, image):
+        decoded_info, _ = self.detector().detectAndDecode(image)
+        return [info.strip() for info in decoded_info if info and info.strip()]
+
+
+class ZBarDecoder(QRDecoder):
+    """pyzbar/zbar 解码（需要系统安装 libzbar）"""
+
+    name = 'zbar'
+
+    @classmethod
+    def available(cls):
+        try:
+            from pyzbar import pyzbar  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def decode(self, image):
+        from pyzbar import pyzbar
+        results = []
+        for symbol in pyzbar.decode(image, symbols=[pyzbar.ZBarSymbol.QRCODE]):
+            try:
+                data = symbol.data.decode('utf-8')
+            except UnicodeDecodeError:
+                data = symbol.data.decode('latin-1')
+            if data.strip() and data.strip() not in results:
+                results.append(data.strip())
+        return results
+
+
+class CascadeDecoder(QRDecoder):
+    """依次尝试多个后端，返回第一个有结果的后端的输出（通常把最快的后端放在前面）"""
+
+    name = 'cascade'
+
+    def __init__(self, backends):
+        self.backends = backends
+
+    def decode(self, image):
+        for backend in self.backends:
+            try:
+                results = backend.decode(image)
+            except Exception as e:
+                # 某个后端出错（如 zbar 无法处理的图像）时继续尝试下一个后端
+                logger.warning("二维码解码后端 %s 出错: %s", backend.name, e)
+                continue
+            if results:
+                return results
+        return []
+
+
+class RaceDecoder(QRDecoder):
+    """多个后端并行解码，返回最先得到结果的后端的输出
+
+    落后的后端不会被中断，会在后台执行完毕，因此会占用额外的CPU。
+    """
+
+    name = 'race'
+
+    def __init__(self, backends):
+        self.backends = backends
+
+    def decode(self, image):
+        pending = {_get_race_executor().submit(backend.decode, image) for backend in self.backends}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.warning("二维码解码后端出错: %s", e)
+                    continue
+                if results:
+                    return results
+        return []
+
+
+BACKENDS = {backend.name: backend for backend in (OpenCVDecoder, WeChatDecoder, ZBarDecoder)}
+
+
+def _get_race_executor():
+    global _race_executor
+    with _race_executor_lock:
+        if _race_executor is None:
+            _race_executor = ThreadPoolExecutor(max_workers=len(BACKENDS) * 2, thread_name_prefix='qr-race')
+        return _race_executor
+
+
+def available_backends():
+    """返回当前环境可用的后端名称"""
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+def get_decoder(spec=None):
+    """根据配置获取解码器（同一配置在进程内共用一个实例）
+
+    spec 可以是单个后端（opencv / wechat / zbar），也可以是组合模式，
+    如 "cascade:zbar,opencv" 或 "race:opencv,wechat"（只写 "zbar,opencv" 等同于 cascade）。
+    None 表示读取 QR_DECODER 环境变量。不可用的后端会被跳过，全部不可用时退回 OpenCV。
+    """
+    spec = (spec or os.environ.get('QR_DECODER') or DEFAULT_DECODER).strip().lower()
+    with _decoders_lock:
+        decoder = _decoders.get(spec)
+        if decoder is None:
+            decoder = _decoders[spec] = create_decoder(spec)
+        return decoder
+
+
+def create_decoder(spec):
+    """按 get_decoder 的配置格式创建新的解码器"""
+    mode, _, names = spec.partition(':')
+    if mode not in ('cascade', 'race'):
+        mode, names = None, spec
+
+    backends = []
+    for name in (item.strip() for item in names.split(',') if item.strip()):
+        backend = BACKENDS.get(name)
+        if backend is None:
+            raise ValueError(f'未知的二维码解码后端: {name}')
+        if not backend.available():
+            logger.warning("二维码解码后端 %s 不可用，已跳过", name)
+            continue
+        backends.append(backend())
+
+    if not backends:
+        backends.append(OpenCVDecoder())
+    if len(backends) == 1:
+        return backends[0]
+    # 未指定模式的多个后端按 cascade 处理
+    return RaceDecoder(backends) if mode == 'race' else CascadeDecoder(backends)
+
+
+class QRCodeCache:
+    """按二维码图像内容的哈希缓存解码结果（LRU，线程安全）
+
+    同一个二维码在文档中重复出现（如每页页脚的公众号二维码）时只解码一次。
+    """
+
+    def __init__(self, max_entries=DEFAULT_CODE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """返回缓存的解码结果列表，未缓存时返回 None"""
+        with self._lock:
+            codes = self._entries.get(key)
+            if codes is None:
+                return None
+            self._entries.move_to_end(key)
+            return list(codes)
+
+    def set(self, key, codes):
+        with self._lock:
+            self._entries[key] = tuple(codes)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+def content_digest(*parts):
+    """字节串内容的哈希"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def region_digest(image, quad):
+    """图像中二维码候选区域的内容哈希
+
+    按四个角点把区域透视校正为 REGION_HASH_SIZE 见方并二值化后计算哈希，与区域在页面上的位置无关；
+    二值化结果有任何差异都得到不同的哈希：宁可漏掉重复，也不把不同的二维码当成同一个。
+    """
+    size = REGION_HASH_SIZE
+    corners = np.float32([[0, 0], [size - 1, 0], [size - 1, size - 1], [0, size - 1]])
+    transform = cv2.getPerspectiveTransform(np.asarray(quad, dtype=np.float32), corners)
+    warped = cv2.warpPerspective(image, transform, (size, size), borderValue=255)
+    _, binary = cv2.threshold(warped, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return content_digest(np.packbits(binary > 127).tobytes())
+
+
+def get_shared_code_cache():
+    """获取（必要时创建）进程内跨文档共用的二维码结果缓存，条数上限读取 QR_CODE_CACHE_SIZE 环境变量"""
+    global _shared_code_cache
+    with _shared_code_cache_lock:
+        if _shared_code_cache is None:
+            _shared_code_cache = QRCodeCache(int(os.environ.get('QR_CODE_CACHE_SIZE', DEFAULT_CODE_CACHE_SIZE)))
+        return _shared_code_cache
@@ -91,9 +91,10 @@ function handleFile(file) {
         return;
     }
     
-    // 验证文件大小 (16MB)
-    if (file.size > 16 * 1024 * 1024) {
-        showError('文件大小不能超过16MB');
+    // 验证文件大小（上限由服务端配置）
+    const maxSize = parseInt(uploadArea.dataset.maxSize, 10) || 16 * 1024 * 1024;
+    if (file.size > maxSize) {
+        showError(`文件大小不能超过${Math.floor(maxSize / 1024 / 1024)}MB`);
         return;
     }
     
@@ -111,44 +112,285 @@ function uploadAndAnalyze(file) {
     hideError();
     hideResults();
     
-    // 模拟进度更新
-    let progress = 0;
-    const progressInterval = setInterval(() => {
-        progress += Math.random() * 15;
-        if (progress > 90) {
-            progress = 90;
-        }
-        updateProgress(progress);
-    }, 500);
-    
-    // 发送请求
-    fetch('/upload', {
+    // 浏览器支持流式读取响应时逐行接收分析结果，否则提交后台任务
+    if (window.ReadableStream && window.TextDecoder) {
+        streamAnalysis(formData);
+    } else {
+        submitJob(formData);
+    }
+}
+
+// 提交后台任务
+function submitJob(formData) {
+    fetch('/jobs', {
         method: 'POST',
         body: formData
     })
     .then(response => response.json())
     .then(data => {
-        clearInterval(progressInterval);
-        updateProgress(100);
-        
-        setTimeout(() => {
+        if (!data.success) {
             hideProgress();
-            
-            if (data.success) {
-                analysisResults = data.results;
-                displayResults(data.results);
-            } else {
+            showError(data.error || '分析失败');
+            return;
+        }
+        updateProgress(5);
+        watchJob(data.job_id);
+    })
+    .catch(error => {
+        hideProgress();
+        showError('网络错误: ' + error.message);
+    });
+}
+
+// 以NDJSON流接收分析事件，逐条显示结果
+function streamAnalysis(formData) {
+    let finished = false;
+    const handleEvent = (event, data) => {
+        if (event === 'complete') {
+            finished = true;
+            finishJob(liveResults.complete(data));
+        } else if (event === 'error') {
+            finished = true;
+            hideProgress();
+            showError(data.error || '分析失败');
+        } else {
+            handleProgressEvent(event, data);
+        }
+    };
+    
+    fetch('/analyze/stream', {
+        method: 'POST',
+        body: formData
+    })
+    .then(response => {
+        if (!response.ok || !response.body) {
+            // 校验失败等错误以普通JSON返回
+            return response.json().then(data => {
+                finished = true;
+                hideProgress();
                 showError(data.error || '分析失败');
+            });
+        }
+        
+        updateProgress(5);
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        const read = () => reader.read().then(({ done, value }) => {
+            buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.filter(line => line.trim()).forEach(line => {
+                const message = JSON.parse(line);
+                handleEvent(message.event, message.data);
+            });
+            if (!done) {
+                return read();
+            }
+            if (buffer.trim()) {
+                const message = JSON.parse(buffer);
+                handleEvent(message.event, message.data);
+            }
+            if (!finished) {
+                hideProgress();
+                showError('分析中断，请重试');
             }
-        }, 500);
+        });
+        return read();
     })
     .catch(error => {
-        clearInterval(progressInterval);
         hideProgress();
         showError('网络错误: ' + error.message);
     });
 }
 
+// 处理进度事件（事件流和NDJSON流共用），结果条目到达时立即显示
+function handleProgressEvent(event, data) {
+    if (event === 'start') {
+        liveResults.start(data.total_pages || 0);
+    } else if (event === 'page') {
+        liveResults.addPage(data);
+        // 页面检测占进度的前80%
+        if (liveResults.totalPages > 0) {
+            updateProgress(5 + liveResults.pagesDone / liveResults.totalPages * 75);
+        }
+    } else if (event === 'article') {
+        // 文章与页面检测同时抓取，抓取完成后再计入剩余的进度
+        if (data.total > 0 && liveResults.pagesDone >= liveResults.totalPages) {
+            updateProgress(80 + data.done / data.total * 19);
+        }
+    } else if (event === 'wechat_article') {
+        liveResults.addWechatArticle(data);
+    } else if (event === 'other_qr_code') {
+        liveResults.addOtherQrCode(data);
+    }
+}
+
+// 分析过程中逐条显示的结果
+const liveResults = {
+    totalPages: 0,
+    pagesDone: 0,
+    pages: {},
+    wechatArticles: [],
+    otherQrCodes: [],
+    
+    // 开始新的分析：清空结果列表并显示结果区域
+    start(totalPages) {
+        this.totalPages = totalPages;
+        this.pagesDone = 0;
+        this.pages = {};
+        this.wechatArticles = [];
+        this.otherQrCodes = [];
+        analysisResults = null;
+        
+        document.getElementById('totalQrCodes').textContent = 0;
+        document.getElementById('wechatArticles').textContent = 0;
+        document.getElementById('otherLinks').textContent = 0;
+        document.getElementById('articlesList').innerHTML = '';
+        document.getElementById('otherQrCodesList').innerHTML = '';
+        resultsContainer.classList.remove('d-none');
+    },
+    
+    addPage(page) {
+        this.pagesDone += 1;
+        this.pages[page.page_number] = page.qr_codes || [];
+        const totalQrCodes = Object.values(this.pages).reduce((sum, codes) => sum + codes.length, 0);
+        document.getElementById('totalQrCodes').textContent = totalQrCodes;
+    },
+    
+    addWechatArticle(article) {
+        this.addItem(this.wechatArticles, article, article.qr_url, 'articlesList', 'wechatArticles', createArticleCard);
+    },
+    
+    addOtherQrCode(qr) {
+        this.addItem(this.otherQrCodes, qr, qr.url, 'otherQrCodesList', 'otherLinks', createOtherQrItem);
+    },
+    
+    // 同一链接在多页出现时只显示一条结果，后续出现的页码合并到已显示的条目中
+    addItem(entries, item, url, listId, counterId, render) {
+        const existing = entries.find(entry => entry.url === url);
+        if (existing) {
+            mergePages(existing.item, item);
+            existing.element.querySelectorAll('.pages-label').forEach(label => {
+                label.textContent = formatPages(existing.item);
+            });
+            return;
+        }
+        
+        const entry = { url: url, item: Object.assign({}, item, { pages: [] }) };
+        mergePages(entry.item, item);
+        entries.push(entry);
+        document.getElementById(counterId).textContent = entries.length;
+        const list = document.getElementById(listId);
+        list.insertAdjacentHTML('beforeend', render(entry.item, entries.length - 1));
+        entry.element = list.lastElementChild;
+    },
+    
+    // 结果条目按页码和二维码在页面中的顺序排列，与一次性返回的结果一致
+    position(url, pageNumber) {
+        const codes = this.pages[pageNumber] || [];
+        const index = codes.indexOf(url);
+        return pageNumber * 10000 + (index >= 0 ? index : codes.length);
+    },
+    
+    // 分析结束：合并汇总信息，返回与 /upload 相同格式的结果
+    complete(summary) {
+        return Object.assign({
+            total_qr_codes: 0,
+            wechat_articles: this.wechatArticles.map(entry => entry.item).sort((a, b) =>
+                this.position(a.qr_url, a.page_number) - this.position(b.qr_url, b.page_number)),
+            other_qr_codes: this.otherQrCodes.map(entry => entry.item).sort((a, b) =>
+                this.position(a.url, a.page_number) - this.position(b.url, b.page_number))
+        }, summary);
+    }
+};
+
+// 把 item 出现的页码合并到 entry.pages 中，page_number 为首次出现的页码
+function mergePages(entry, item) {
+    (item.pages || [item.page_number]).forEach(page => {
+        if (!entry.pages.includes(page)) {
+            entry.pages.push(page);
+        }
+    });
+    entry.pages.sort((a, b) => a - b);
+    entry.page_number = entry.pages[0];
+}
+
+// 页码说明，如 "第3页"、"第3、5、8页"，页数较多时只列出前几页
+function formatPages(item) {
+    const pages = item.pages || [item.page_number || '?'];
+    const shown = pages.slice(0, 5).join('、');
+    return pages.length > 5 ? `第${shown}等${pages.length}页` : `第${shown}页`;
+}
+
+// 通过事件流跟踪任务进度，浏览器不支持时改为轮询
+function watchJob(jobId) {
+    if (!window.EventSource) {
+        pollJob(jobId);
+        return;
+    }
+    
+    const source = new EventSource(`/jobs/${jobId}/events`);
+    
+    ['start', 'page', 'article', 'wechat_article', 'other_qr_code'].forEach(name => {
+        source.addEventListener(name, event => {
+            handleProgressEvent(name, JSON.parse(event.data));
+        });
+    });
+    
+    source.addEventListener('completed', event => {
+        source.close();
+        finishJob(JSON.parse(event.data).results);
+    });
+    
+    source.addEventListener('failed', event => {
+        source.close();
+        hideProgress();
+        showError(JSON.parse(event.data).error || '分析失败');
+    });
+    
+    source.onerror = () => {
+        // 事件流中断时改为轮询任务状态
+        source.close();
+        pollJob(jobId);
+    };
+}
+
+// 轮询任务状态
+function pollJob(jobId) {
+    fetch(`/jobs/${jobId}`)
+    .then(response => response.json())
+    .then(job => {
+        if (job.status === 'completed') {
+            finishJob(job.results);
+        } else if (job.status === 'failed' || job.error) {
+            hideProgress();
+            showError(job.error || '分析失败');
+        } else {
+            const progress = job.progress || {};
+            if (progress.total_pages) {
+                updateProgress(5 + progress.pages_done / progress.total_pages * 75);
+            }
+            setTimeout(() => pollJob(jobId), 1000);
+        }
+    })
+    .catch(error => {
+        hideProgress();
+        showError('网络错误: ' + error.message);
+    });
+}
+
+// 任务完成，显示结果
+function finishJob(results) {
+    updateProgress(100);
+    
+    setTimeout(() => {
+        hideProgress();
+        analysisResults = results;
+        displayResults(results);
+    }, 500);
+}
+
 // 显示进度条
 function showProgress() {
     progressContainer.classList.remove('d-none');
@@ -234,7 +476,7 @@ function createArticleCard(article, index) {
                 <a href="${article.url}" target="_blank" class="article-title">
                     ${title}
                 </a>
-                <span class="badge bg-primary">第${article.page_number || '?'}页</span>
+                <span class="badge bg-primary pages-label">${formatPages(article)}</span>
             </div>
             
             ${hasError ? `
@@ -257,7 +499,7 @@ function createArticleCard(article, index) {
                             <i class="fas fa-user"></i>作者: ${author}
                         </div>
                         <div class="col-md-6">
-                            <i class="fas fa-link"></i>页面位置: 第${article.page_number || '?'}页
+                            <i class="fas fa-link"></i>页面位置: <span class="pages-label">${formatPages(article)}</span>
                         </div>
                     </div>
                     ${articleLink && articleLink !== article.url ? `
@@ -402,16 +644,21 @@ function displayOtherQrCodes(qrCodes) {
         return;
     }
     
-    container.innerHTML = qrCodes.map(qr => `
+    container.innerHTML = qrCodes.map(createOtherQrItem).join('');
+}
+
+// 创建其他二维码条目
+function createOtherQrItem(qr) {
+    return `
         <div class="other-qr-item">
             <div class="d-flex justify-content-between align-items-center">
                 <div class="flex-grow-1">
                     <a href="${qr.url}" target="_blank">${qr.url}</a>
                 </div>
-                <span class="badge bg-warning text-dark ms-2">第${qr.page_number}页</span>
+                <span class="badge bg-warning text-dark ms-2 pages-label">${formatPages(qr)}</span>
             </div>
         </div>
-    `).join('');
+    `;
 }
 
 // 初始化切换按钮
@@ -0,0 +1,33 @@
+import fitz
+import numpy as np
+
+from pdf_analyzer import PDFAnalyzer
+
+
+def rotated_page_with_block():
+    """旋转90度的页面，未旋转坐标 (50, 100, 150, 200) 处有一个黑色方块"""
+    doc = fitz.open()
+    page = doc.new_page(width=600, height=800)
+    block = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 50, 50), False)
+    block.clear_with(0)
+    page.insert_image(fitz.Rect(50, 100, 150, 200), pixmap=block)
+    page.set_rotation(90)
+    return doc, page
+
+
+def dark_fraction(page, clip):
+    pix = page.get_pixmap(clip=clip, colorspace=fitz.csGRAY)
+    pixels = np.frombuffer(pix.samples, dtype=np.uint8)
+    return (pixels < 128).mean()
+
+
+def test_region_clip_on_rotated_page_covers_rendered_region():
+    doc, page = rotated_page_with_block()
+    pix = page.get_pixmap(colorspace=fitz.csGRAY)
+    image = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+    ys, xs = np.where(image < 128)
+    quad = [(xs.min(), ys.min()), (xs.max(), ys.min()), (xs.max(), ys.max()), (xs.min(), ys.max())]
+
+    clip = PDFAnalyzer(article_fetch=False)._region_to_clip(page, quad, 72)
+    assert dark_fraction(page, clip) > 0.4
+    doc.close()
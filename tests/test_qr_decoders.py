@@ -0,0 +1,32 @@
+import numpy as np
+
+from qr_decoders import CascadeDecoder, QRDecoder
+
+
+class FailingDecoder(QRDecoder):
+    name = 'failing'
+
+    def decode(self, image):
+        raise RuntimeError('无法解码')
+
+
+class FixedDecoder(QRDecoder):
+    name = 'fixed'
+
+    def __init__(self, results):
+        self.results = results
+
+    def decode(self, image):
+        return list(self.results)
+
+
+def test_cascade_skips_failing_backend(caplog):
+    image = np.full((64, 64), 255, dtype=np.uint8)
+    decoder = CascadeDecoder([FailingDecoder(), FixedDecoder(['https://example.com'])])
+    assert decoder.decode(image) == ['https://example.com']
+    assert 'failing' in caplog.text
+
+
+def test_cascade_all_backends_failing_returns_empty():
+    image = np.full((64, 64), 255, dtype=np.uint8)
+    assert CascadeDecoder([FailingDecoder(), FailingDecoder()]).decode(image) == []
@@ -0,0 +1,186 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import zipfile
+
+from flask import Request, current_app
+
+logger = logging.getLogger(__name__)
+
+# 默认的内存上传上限：不超过该大小的文件直接在内存中打开，不落盘
+DEFAULT_MEMORY_LIMIT = 16 * 1024 * 1024
+# 解压ZIP时每次读写的块大小
+EXTRACT_CHUNK_SIZE = 1024 * 1024
+
+
+class SpooledUpload:
+    """接收上传文件的缓冲区，在数据写入的同时计算SHA-256
+
+    文件不超过 memory_limit 时保存在内存中，超过后分块转存到上传目录下的临时文件，
+    因此无论文件多大，进程内存占用都是有界的。
+    """
+
+    def __init__(self, memory_limit=DEFAULT_MEMORY_LIMIT, directory=None):
+        self.memory_limit = memory_limit
+        self.directory = directory or tempfile.gettempdir()
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.path = None
+        self.retained = False
+        self._buffer = io.BytesIO()
+        self._file = None
+        self._view = None
+
+    @property
+    def in_memory(self):
+        return self._file is None
+
+    @property
+    def content_hash(self):
+        return self.sha256.hexdigest()
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        if self._file is None and self._buffer.tell() + len(data) > self.memory_limit:
+            self._rollover()
+        return (self._file or self._buffer).write(data)
+
+    def _rollover(self):
+        """超过内存上限，把已接收的数据转存到磁盘"""
+        fd, self.path = tempfile.mkstemp(prefix='upload-', suffix='.pdf', dir=self.directory)
+        self._file = os.fdopen(fd, 'w+b')
+        self._file.write(self._buffer.getbuffer())
+        self._buffer = None
+        logger.debug("上传文件超过内存上限，转存到: %s", self.path)
+
+    # 以下方法供 werkzeug 和 FileStorage 使用
+    def seek(self, offset, whence=io.SEEK_SET):
+        return (self._file or self._buffer).seek(offset, whence)
+
+    def tell(self):
+        return (self._file or self._buffer).tell()
+
+    def read(self, size=-1):
+        return (self._file or self._buffer).read(size)
+
+    def readline(self, size=-1):
+        return (self._file or self._buffer).readline(size)
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def source(self):
+        """返回可交给 PDFAnalyzer 的PDF来源：磁盘文件的路径，或内存数据的只读视图（不复制）"""
+        if self._file is not None:
+            self._file.flush()
+            return self.path
+        if self._view is None:
+            self._view = self._buffer.getbuffer().toreadonly()
+        return self._view
+
+    def retain(self):
+        """请求结束后继续保留数据（交给后台任务使用），之后需调用 release() 释放"""
+        self.retained = True
+
+    def close(self):
+        # 请求结束时 werkzeug 会关闭上传文件；被后台任务保留时忽略
+        if not self.retained:
+            self.release()
+
+    def release(self):
+        """释放内存或删除磁盘上的临时文件"""
+        self.retained = False
+        if self._view is not None:
+            try:
+                self._view.release()
+            except BufferError:
+                pass
+            self._view = None
+        if self._buffer is not None:
+            try:
+                self._buffer.close()
+            except BufferError:
+                # 仍有对象引用内存数据时交给垃圾回收
+                pass
+            self._buffer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path and os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+                logger.debug("已清理临时文件: %s", self.path)
+            except OSError as e:
+                logger.warning("清理临时文件失败: %s", e)
+        self.path = None
+
+
+class UploadRequest(Request):
+    """上传文件直接写入 SpooledUpload，不经过 werkzeug 默认的临时文件"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SpooledUpload(
+            memory_limit=current_app.config.get('UPLOAD_MEMORY_LIMIT', DEFAULT_MEMORY_LIMIT),
+            directory=current_app.config.get('UPLOAD_FOLDER')
+        )
+
+
+def extract_pdfs(archive, directory, max_files, max_size, max_total_size=None):
+    """把ZIP压缩包中的PDF文件解压到 directory，同时计算SHA-256
+
+    返回 [(filename, path, content_hash), ...]。PDF数量超过 max_files、单个文件解压后超过 max_size
+    或全部文件解压后的总大小超过 max_total_size（None 表示不限制）时抛出 ValueError，
+    压缩包损坏时抛出 zipfile.BadZipFile。
+    """
+    extracted = []
+    total_written = 0
+    with zipfile.ZipFile(archive) as zf:
+        members = [
+            info for info in zf.infolist()
+            if not info.is_dir()
+            and info.filename.lower().endswith('.pdf')
+            # 跳过 macOS 压缩时附带的资源文件
+            and not info.filename.startswith('__MACOSX/')
+            and not os.path.basename(info.filename).startswith('._')
+        ]
+        if len(members) > max_files:
+            raise ValueError(f'压缩包中的PDF文件不能超过{max_files}个')
+        if max_total_size is not None and sum(info.file_size for info in members) > max_total_size:
+            raise ValueError('压缩包中的PDF文件解压后的总大小超过限制')
+        
+        for index, info in enumerate(members):
+            if info.file_size > max_size:
+                raise ValueError(f'压缩包中的文件 {info.filename} 超过大小限制')
+            path = os.path.join(directory, f'{index:05d}.pdf')
+            sha256 = hashlib.sha256()
+            written = 0
+            with zf.open(info) as source, open(path, 'wb') as target:
+                while True:
+                    chunk = source.read(EXTRACT_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    # 压缩包中记录的大小不可信，按实际解压的数据量再检查一次
+                    written += len(chunk)
+                    total_written += len(chunk)
+                    if written > max_size:
+                        raise ValueError(f'压缩包中的文件 {info.filename} 超过大小限制')
+                    if max_total_size is not None and total_written > max_total_size:
+                        raise ValueError('压缩包中的PDF文件解压后的总大小超过限制')
+                    sha256.update(chunk)
+                    target.write(chunk)
+            extracted.append((os.path.basename(info.filename), path, sha256.hexdigest()))
+    logger.debug("已解压 %d 个PDF文件到: %s", len(extracted), directory)
+    return extracted